@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# -*- coding: iso-8859-1 -*-
+#
+#
+# METRo : Model of the Environment and Temperature of Roads
+# METRo is Free and is proudly provided by the Government of Canada
+# Copyright (C) Her Majesty The Queen in Right of Canada, Environment Canada, 2006
+
+#  Questions or bugs report: metro@ec.gc.ca
+#  METRo repository: https://framagit.org/metroprojects/metro
+#  Documentation: https://framagit.org/metroprojects/metro/wikis/home
+#
+#
+#  $LastChangedDate$
+#  $LastChangedRevision$
+#
+########################################################################
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+
+"""
+
+ Name:        benchmark_collection_memory
+
+ Description: Keep N station collections resident, each one an
+   OBSERVATION infdata holding a data collection with the observation
+   attributes, and print their memory size and the time taken to read
+   their attributes.  The slot-based Metro_infdata and
+   Metro_data_collection are compared with the previous layout, a
+   dictionary of items for the infdata and parallel lists of attribute
+   names and values for the collection.
+
+ Usage:       python benchmark_collection_memory.py [-n stations]
+
+"""
+
+import os
+import sys
+import time
+import getopt
+
+# metro.py sets its import paths from sys.path[0]
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'src', 'frontend'))
+import metro
+from data_module import metro_infdata
+from data_module import metro_data_collection
+
+# DATA_ATTRIBUTE_OBSERVATION_STANDARD of metro_config
+lATTRIBUTE = ["SST_VALID", "AT_VALID", "TD_VALID", "WS_VALID",
+              "SST_VALID_INTERPOLATED", "AT_VALID_INTERPOLATED",
+              "TD_VALID_INTERPOLATED", "WS_VALID_INTERPOLATED",
+              "DELTA_T", "NO_OBS"]
+
+
+class Dict_infdata:
+    """Metro_infdata with its items in a dictionary."""
+
+    def __init__( self, sName, iData_type ):
+        self.dItems = {'NAME' : sName,
+                       'XML_FORMAT' : None,
+                       'INPUT_INFORMATION' : None,
+                       'OUTPUT_INFORMATION' : None,
+                       'DATA' : None
+                       }
+        self.iData_type = iData_type
+
+    def get_data_collection( self ):
+        if self.iData_type == metro_infdata.DATATYPE_METRO_DATA_COLLECTION:
+            return self.dItems['DATA_COLLECTION']
+        else:
+            raise TypeError(self.iData_type)
+
+    def set_data_collection( self, value ):
+        if self.iData_type == metro_infdata.DATATYPE_METRO_DATA_COLLECTION:
+            self.dItems['DATA_COLLECTION'] = value
+        else:
+            raise TypeError(self.iData_type)
+
+
+class List_data_collection:
+    """Metro_data_collection with parallel attribute lists."""
+
+    def __init__( self, lData_attribute=[] ):
+        self.lAttribute_list =  lData_attribute
+        self.lAttribute = [None]*len(self.lAttribute_list)
+        self.dAttribute_index = {}
+        for i in range(len(self.lAttribute_list)-1,-1,-1):
+            self.dAttribute_index[self.lAttribute_list[i]] = i
+
+    def get_attribute( self, sAttribute_name ):
+        if sAttribute_name in self.dAttribute_index:
+            iAttribute = self.dAttribute_index[sAttribute_name]
+            return self.lAttribute[iAttribute]
+        else:
+            raise KeyError(sAttribute_name)
+
+    def set_attribute( self, sAttribute_name, value ):
+        if sAttribute_name in self.dAttribute_index:
+            iAttribute = self.dAttribute_index[sAttribute_name]
+            self.lAttribute[iAttribute] = value
+        else:
+            raise KeyError(sAttribute_name)
+
+
+def usage():
+    print 'Usage: ' + sys.argv[0] + ' [-n stations]'
+
+def get_size( object, dSeen ):
+    """
+    Size in bytes of object and of the containers and objects it refers
+    to, each object being counted once.
+    """
+    if id(object) in dSeen:
+        return 0
+    dSeen[id(object)] = True
+
+    iSize = sys.getsizeof(object)
+    if isinstance(object, dict):
+        for (key, value) in object.items():
+            iSize = iSize + get_size(key, dSeen) + get_size(value, dSeen)
+    elif isinstance(object, (list, tuple)):
+        for item in object:
+            iSize = iSize + get_size(item, dSeen)
+
+    if hasattr(object, '__dict__'):
+        iSize = iSize + get_size(object.__dict__, dSeen)
+    for cls in getattr(type(object), '__mro__', ()):
+        for sSlot in getattr(cls, '__slots__', ()):
+            if hasattr(object, sSlot):
+                iSize = iSize + get_size(getattr(object, sSlot), dSeen)
+    return iSize
+
+def create_stations( infdata_class, collection_class, iNb_stations ):
+    lStation = []
+    for i in range(0, iNb_stations):
+        collection = collection_class(list(lATTRIBUTE))
+        collection.set_attribute('DELTA_T', 30.0)
+        infdata = infdata_class('OBSERVATION',
+                                metro_infdata.DATATYPE_METRO_DATA_COLLECTION)
+        infdata.set_data_collection(collection)
+        lStation.append(infdata)
+    return lStation
+
+def read_attributes( lStation ):
+    fStart = time.time()
+    for infdata in lStation:
+        collection = infdata.get_data_collection()
+        for sAttribute in lATTRIBUTE:
+            collection.get_attribute(sAttribute)
+    return time.time() - fStart
+
+def benchmark( sLabel, infdata_class, collection_class, iNb_stations ):
+    fStart = time.time()
+    lStation = create_stations(infdata_class, collection_class, iNb_stations)
+    fCreate = time.time() - fStart
+
+    # The attribute names are shared by all the stations
+    dSeen = {}
+    for sAttribute in lATTRIBUTE:
+        dSeen[id(sAttribute)] = True
+    iSize = get_size(lStation, dSeen)
+
+    fRead = read_attributes(lStation)
+    print '%-6s: %6.1f MB, %5d bytes/station, created in %.3f s, ' \
+          'attributes read in %.3f s' % \
+          (sLabel, iSize/1048576.0, iSize/iNb_stations, fCreate, fRead)
+    return iSize
+
+def main():
+    try:
+        (lOpts, lArgs) = getopt.getopt(sys.argv[1:], 'n:h')
+    except getopt.GetoptError:
+        usage()
+        sys.exit(2)
+
+    iNb_stations = 10000
+    for (o, a) in lOpts:
+        if o == '-n':
+            iNb_stations = int(a)
+        elif o == '-h':
+            usage()
+            return
+
+    print '%d station collections resident' % (iNb_stations)
+    iDict_size = benchmark('dict', Dict_infdata,
+                           List_data_collection, iNb_stations)
+    iSlot_size = benchmark('slots', metro_infdata.Metro_infdata,
+                           metro_data_collection.Metro_data_collection,
+                           iNb_stations)
+    print 'memory ratio dict/slots: %.2f' % \
+          (float(iDict_size)/iSlot_size)
+
+
+if __name__ == "__main__":
+    main()
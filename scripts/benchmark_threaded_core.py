@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: iso-8859-1 -*-
+#
+#
+# METRo : Model of the Environment and Temperature of Roads
+# METRo is Free and is proudly provided by the Government of Canada
+# Copyright (C) Her Majesty The Queen in Right of Canada, Environment Canada, 2006
+
+#  Questions or bugs report: metro@ec.gc.ca
+#  METRo repository: https://framagit.org/metroprojects/metro
+#  Documentation: https://framagit.org/metroprojects/metro/wikis/home
+#
+#
+#  $LastChangedDate$
+#  $LastChangedRevision$
+#
+########################################################################
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+
+"""
+
+ Name:        benchmark_threaded_core
+
+ Description: Run METRo core on the selftest station N times, first
+   sequentially and then with a pool of python threads, and print the
+   speedup.  The input stage and the preprocessing are done only once,
+   only the physical model is timed.
+
+ Usage:       python benchmark_threaded_core.py [-n runs] [-t threads]
+
+"""
+
+import os
+import sys
+import time
+import getopt
+
+from multiprocessing.pool import ThreadPool
+
+# metro.py sets its import paths from sys.path[0]
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'src', 'frontend'))
+import metro
+
+
+def usage():
+    print 'Usage: ' + sys.argv[0] + ' [-n runs] [-t threads]'
+
+def prepare_selftest():
+    """
+    Execute the METRo sequence on the selftest station until the
+    physical model.  Return the model object and its input data.
+    """
+    sys.argv = [sys.argv[0], '--selftest', '--silent']
+    lExec_sequence = metro.metro_init()
+
+    lModule_names = [object.__module__ for object in lExec_sequence]
+    iModel = lModule_names.index('metro_model')
+    infdata_container = metro.metro_execute_module(lExec_sequence[:iModel])
+
+    model = lExec_sequence[iModel]
+    model.receive_data(infdata_container)
+
+    forecast = model.get_infdata_reference('FORECAST').get_data_collection()
+    observation = model.get_infdata_reference('OBSERVATION')\
+                  .get_data_collection()
+    station = model.get_infdata_reference('STATION').get_data()
+
+    return (model, forecast, observation, station)
+
+def run_sequential(model, tInput, iNb_runs):
+    fStart = time.time()
+    for i in range(0, iNb_runs):
+        model.compute_roadcast(*tInput)
+    return time.time() - fStart
+
+def run_threaded(model, tInput, iNb_runs, iNb_threads):
+    pool = ThreadPool(iNb_threads)
+    fStart = time.time()
+    pool.map(lambda i: model.compute_roadcast(*tInput), range(0, iNb_runs))
+    fElapsed = time.time() - fStart
+    pool.close()
+    pool.join()
+    return fElapsed
+
+def main():
+    try:
+        (lOpts, lArgs) = getopt.getopt(sys.argv[1:], 'n:t:h')
+    except getopt.GetoptError:
+        usage()
+        sys.exit(2)
+
+    iNb_runs = 16
+    iNb_threads = 4
+    for (o, a) in lOpts:
+        if o == '-n':
+            iNb_runs = int(a)
+        elif o == '-t':
+            iNb_threads = int(a)
+        elif o == '-h':
+            usage()
+            return
+
+    (model, forecast, observation, station) = prepare_selftest()
+    tInput = (forecast, observation, station)
+
+    # Warm up, the first run pays for the page faults of the core.
+    model.compute_roadcast(*tInput)
+
+    fSequential = run_sequential(model, tInput, iNb_runs)
+    print 'sequential: %d runs in %.2f s (%.3f s/run)' % \
+          (iNb_runs, fSequential, fSequential/iNb_runs)
+
+    for iThreads in range(1, iNb_threads+1):
+        fThreaded = run_threaded(model, tInput, iNb_runs, iThreads)
+        print '%2d threads: %d runs in %.2f s, speedup %.2f' % \
+              (iThreads, iNb_runs, fThreaded, fSequential/fThreaded)
+
+    metro.metro_stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding: iso-8859-1 -*-
+#
+#
+# METRo : Model of the Environment and Temperature of Roads
+# METRo is Free and is proudly provided by the Government of Canada
+# Copyright (C) Her Majesty The Queen in Right of Canada, Environment Canada, 2006
+
+#  Questions or bugs report: metro@ec.gc.ca
+#  METRo repository: https://framagit.org/metroprojects/metro
+#  Documentation: https://framagit.org/metroprojects/metro/wikis/home
+#
+#
+#  $LastChangedDate$
+#  $LastChangedRevision$
+#
+########################################################################
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+
+"""
+
+ Name:        check_batch_isolation
+
+ Description: Check that the stations of a batch run done by the same
+   worker do not share their roadcast dates.  Two stations are made
+   from the selftest files, the second one with its last observations
+   removed, and are computed one at a time and then by a batch run
+   with one worker.  The first roadcast date and the first and last
+   roadcast times of each station must be the same in both runs.
+
+ Usage:       python check_batch_isolation.py [-k]
+              -k keeps the work directory
+
+"""
+
+import os
+import re
+import sys
+import getopt
+import shutil
+import tempfile
+import subprocess
+
+from xml.dom import minidom
+
+sMetro_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sMetro = os.path.join(sMetro_root, 'src', 'frontend', 'metro.py')
+sSelftest = os.path.join(sMetro_root, 'usr', 'share', 'metro', 'data',
+                         'selftest')
+
+# Options of both runs, the roadcast end date depends on the station
+lRUN_OPTIONS = ['--roadcast-max-horizon', '12', '--silent']
+
+# Observations removed from the second station, about 4 hours
+iNB_REMOVED_OBSERVATIONS = 12
+
+
+def usage():
+    print 'Usage: ' + sys.argv[0] + ' [-k]'
+
+def create_stations(sWork_dir):
+    """
+    Write the observation files of the two stations.  Return the list
+    of the (forecast, observation, station) filenames of each one.
+    """
+    sForecast = os.path.join(sSelftest, 'forecast.xml')
+    sStation = os.path.join(sSelftest, 'station.xml')
+    sObservation = os.path.join(sSelftest, 'observation.xml')
+
+    sContent = open(sObservation).read()
+    lMeasures = re.findall(r'\s*<measure>.*?</measure>', sContent, re.S)
+    sShort_content = sContent.replace(
+        ''.join(lMeasures[-iNB_REMOVED_OBSERVATIONS:]), '')
+    sShort_observation = os.path.join(sWork_dir, 'observation_short.xml')
+    open(sShort_observation, 'w').write(sShort_content)
+
+    return [(sForecast, sObservation, sStation),
+            (sForecast, sShort_observation, sStation)]
+
+def run_metro(lArgs, sLog_filename):
+    iStatus = subprocess.call([sys.executable, sMetro] + lArgs +
+                              lRUN_OPTIONS + ['--log-file', sLog_filename])
+    if iStatus != 0:
+        print 'metro.py %s failed with status %d' % \
+              (' '.join(lArgs), iStatus)
+        sys.exit(1)
+
+def get_roadcast_dates(sFilename):
+    """
+    Return the first roadcast date and the first and last roadcast
+    times of a roadcast file.
+    """
+    domRoadcast = minidom.parse(sFilename)
+    sFirst_roadcast = domRoadcast.getElementsByTagName('first-roadcast')[0]\
+                      .firstChild.data
+    lTimes = [node.firstChild.data for node in
+              domRoadcast.getElementsByTagName('roadcast-time')]
+    return (sFirst_roadcast, lTimes[0], lTimes[-1])
+
+def main():
+    try:
+        (lOpts, lArgs) = getopt.getopt(sys.argv[1:], 'kh')
+    except getopt.GetoptError:
+        usage()
+        sys.exit(2)
+
+    bKeep = False
+    for (o, a) in lOpts:
+        if o == '-k':
+            bKeep = True
+        elif o == '-h':
+            usage()
+            return
+
+    sWork_dir = tempfile.mkdtemp(prefix='metro_batch_')
+    try:
+        lStations = create_stations(sWork_dir)
+
+        # Reference, one METRo run for each station
+        lReference = []
+        lManifest = []
+        for i in range(0, len(lStations)):
+            (sForecast, sObservation, sStation) = lStations[i]
+            sReference = os.path.join(sWork_dir, 'reference_%d.xml' % (i))
+            run_metro(['--input-forecast', sForecast,
+                       '--input-observation', sObservation,
+                       '--input-station', sStation,
+                       '--output-roadcast', sReference],
+                      os.path.join(sWork_dir, 'reference_%d.log' % (i)))
+            lReference.append(get_roadcast_dates(sReference))
+
+            sRoadcast = os.path.join(sWork_dir, 'batch_%d.xml' % (i))
+            lManifest.append('%s %s %s %s\n' % (sForecast, sObservation,
+                                                sStation, sRoadcast))
+
+        if lReference[0] == lReference[1]:
+            print 'The two stations have the same roadcast dates, ' + \
+                  'the check can not tell them apart.'
+            sys.exit(1)
+
+        # Batch run, both stations done by the same worker
+        sManifest = os.path.join(sWork_dir, 'manifest')
+        open(sManifest, 'w').writelines(lManifest)
+        run_metro(['--batch', sManifest, '--batch-workers', '1',
+                   '--batch-chunksize', str(len(lStations))],
+                  os.path.join(sWork_dir, 'batch.log'))
+
+        bSuccess = True
+        for i in range(0, len(lStations)):
+            sRoadcast = os.path.join(sWork_dir, 'batch_%d.xml' % (i))
+            if not os.path.exists(sRoadcast):
+                print 'station %d: no roadcast, see batch*.log' % (i)
+                bSuccess = False
+                continue
+            tDates = get_roadcast_dates(sRoadcast)
+            if tDates != lReference[i]:
+                print 'station %d: batch %s, expected %s' % \
+                      (i, tDates, lReference[i])
+                bSuccess = False
+            else:
+                print 'station %d: ok, first roadcast %s, %s to %s' % \
+                      ((i,) + tDates)
+    finally:
+        if bKeep:
+            print 'work directory: ' + sWork_dir
+        else:
+            shutil.rmtree(sWork_dir)
+
+    if not bSuccess:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -73,6 +73,7 @@ src/frontend/data_module/metro_infdata_container.py
 src/frontend/data_module/__init__.py
 
 src/frontend/executable_module/metro_dom2metro.py
+src/frontend/executable_module/metro_dom2metro_forecast.py
 src/frontend/executable_module/metro_metro2dom.py
 src/frontend/executable_module/metro_model.py
 src/frontend/executable_module/metro_module.py
@@ -89,6 +90,7 @@ src/frontend/executable_module/metro_preprocess_qa_qc_forecast.py
 src/frontend/executable_module/metro_preprocess_qa_qc_station.py
 src/frontend/executable_module/metro_preprocess_sunshadw.py
 src/frontend/executable_module/metro_preprocess_validate_input.py
+src/frontend/executable_module/metro_preprocess_trim_forecast.py
 src/frontend/executable_module/metro_read.py
 src/frontend/executable_module/metro_read_forecast.py
 src/frontend/executable_module/metro_read_observation.py
@@ -34,10 +34,13 @@
 #
 
 
+import copy
+
 import numpy
 
 import metro_logger
 import metro_error
+import metro_config
 from toolbox import metro_constant
 from toolbox import metro_util
 
@@ -103,8 +106,24 @@ class Metro_data:
                          determined by len(lStdData_types) + len(lExtData_types).                         
         """
         self.bRead_only = False
+        # True when the header, the column names and the matrix are shared
+        #  with other objects made by copy_on_write.
+        self.bShared = False
         self.dHeader = {}
-        self.npMatrix = numpy.array([], dtype=numpy.float)
+        # With the compact storage the matrix is kept in float32, each
+        #  column relative to a float64 origin (NaN until the column gets
+        #  a value) so the dates keep their resolution.  The values are
+        #  always read back in float64.
+        self.bCompact = metro_config.get_value('DATA_COMPACT_STORAGE')
+        self.npCol_origin = numpy.array([], dtype=numpy.float)
+        self.npMatrix = numpy.array([], dtype=self.__get_storage_dtype())
+        # Rows appended with append_matrix_row are written in this buffer,
+        #  self.npMatrix is then a view of its filled rows.
+        self.npRow_buffer = None
+        # Same for the columns appended with append_matrix_col once room
+        #  was reserved with reserve_columns.
+        self.npCol_buffer = None
+        self.iNb_col_reserved = 0
 
         # Name of the columns of the matrix
         self.lMatrix_std_col_name = []
@@ -123,11 +142,38 @@ class Metro_data:
         for i in range(0,len(self.lMatrix_col_name)):
             self.lMatrix_col_usage.append([i])
 
+        # Column index of each column name, kept in sync with
+        #  lMatrix_col_name and lMatrix_col_usage.
+        self.dMatrix_col_index = {}
+        for i in range(len(self.lMatrix_col_name)-1,-1,-1):
+            self.dMatrix_col_index[self.lMatrix_col_name[i]] = \
+                self.lMatrix_col_usage[i]
+
     def __str__( self ):
         header = "===============================BEGIN Metro_data object==============================="
         footer = "================================END Metro_data object================================"
         return "\n%s\nread only=%s\ndHeader=%s\nColumn name=%s\nColumn index=%s\nMatrix=\n%s\n%s\n" % \
-               (header,self.bRead_only,self.dHeader,self.lMatrix_col_name,self.lMatrix_col_usage,self.npMatrix,footer)
+               (header,self.bRead_only,self.dHeader,self.lMatrix_col_name,self.lMatrix_col_usage,self.get_matrix(),footer)
+
+    def __getstate__( self ):
+        # The spare rows and columns of the buffers are not copied, the
+        #  copy gets its own buffers on its first append.
+        dState = self.__dict__.copy()
+        dState['npRow_buffer'] = None
+        dState['npCol_buffer'] = None
+        return dState
+
+    def copy_on_write( self ):
+        """
+        Return a copy of this object sharing its header, its column names
+        and its matrix.  Both objects get their own copy of the data on
+        their first modification, the data is never copied for objects
+        that are only read.
+        """
+        data = copy.copy(self)
+        self.bShared = True
+        data.bShared = True
+        return data
 
     def set_readonly( self, bIs_read_only ):
         """
@@ -157,6 +203,7 @@ class Metro_data:
 
         """
         if not self.is_readonly():
+            self.__unshare()
             self.dHeader[sKey] = value
         else:
             metro_logger.print_message(metro_logger.LOGGER_MSG_DEBUG,
@@ -188,8 +235,8 @@ class Metro_data:
         
         """
         if not self.is_readonly():
-            self.npMatrix = numpy.zeros((iNb_row,iNb_col))
-            self.npMatrix = self.npMatrix + fVal
+            npMatrix = numpy.zeros((iNb_row,iNb_col))
+            self.npMatrix = self.__encode_matrix(npMatrix + fVal)
         else:
             metro_logger.print_message(metro_logger.LOGGER_MSG_DEBUG,
                                        MESSAGE_READONLY)
@@ -204,7 +251,7 @@ class Metro_data:
         will be the only way to access column of the new one.
         """
         if not self.is_readonly():
-            self.npMatrix = npMatrix
+            self.npMatrix = self.__encode_matrix(npMatrix)
         else:
             metro_logger.print_message(metro_logger.LOGGER_MSG_DEBUG,
                                        MESSAGE_READONLY)
@@ -225,6 +272,7 @@ class Metro_data:
         iCol = self.index_of_matrix_col(sCol_name)[0]
 
         if not self.is_readonly():
+            self.__unshare()
             if iCol > len(self.npMatrix[0,:]):
                sOutOfBoundError = _("Array does not contain this indice: %d") \
                                   % iCol
@@ -235,7 +283,7 @@ class Metro_data:
                                _("Matrix length: %d \n") % len(self.npMatrix[:,iCol])
                 raise metro_error.Metro_data_error(sLengthError)
             else:
-                self.npMatrix[:,iCol] = npCol
+                self.npMatrix[:,iCol] = self.__encode_col(npCol, iCol)
         else:
             metro_logger.print_message(metro_logger.LOGGER_MSG_DEBUG,
                                        MESSAGE_READONLY)
@@ -261,6 +309,7 @@ class Metro_data:
         lCol_list = self.index_of_matrix_col(sCol_name)
 
         if not self.is_readonly():
+            self.__unshare()
             if lCol_list[-1] > len(self.npMatrix[0,:]):
                sOutOfBoundError = _("Array does not contain this indice: %s") \
                                   % str(lCol_list)
@@ -274,7 +323,8 @@ class Metro_data:
             else:
                 iInCol = 0
                 for iCol in lCol_list:
-                    self.npMatrix[:,iCol] = lColOfList[iInCol]
+                    self.npMatrix[:,iCol] = \
+                        self.__encode_col(lColOfList[iInCol], iCol)
                     iInCol+=1
         else:
             metro_logger.print_message(metro_logger.LOGGER_MSG_DEBUG,
@@ -293,11 +343,12 @@ class Metro_data:
         Descriptions: Append a new row of data to the matrix.
         """
         if not self.is_readonly():
+            self.__unshare()
             # Replace the None by metro_constant.NaN 
             while None in lData_row:
                 iIndex = lData_row.index(None)
                 lData_row[iIndex] = metro_constant.NaN
-            self.npMatrix = self.__append_row_to_matrix(self.npMatrix,lData_row)
+            self.__append_row_to_buffer(lData_row)
         else:
             metro_logger.print_message(metro_logger.LOGGER_MSG_DEBUG,
                                        MESSAGE_READONLY)
@@ -319,7 +370,8 @@ class Metro_data:
         
         """
         if not self.is_readonly():
-            if sCol_name not in self.lMatrix_col_name:
+            self.__unshare()
+            if sCol_name not in self.dMatrix_col_index:
                 self.lMatrix_col_name.append(sCol_name)
                 if self.lMatrix_col_usage == []:
                     nextCol = 0
@@ -327,12 +379,12 @@ class Metro_data:
                     nextCol = self.lMatrix_col_usage[-1][-1] + 1
                     
                 self.lMatrix_col_usage.append(range(nextCol,nextCol+1))
+                self.dMatrix_col_index[sCol_name] = self.lMatrix_col_usage[-1]
                 self.lMatrix_ext_col_name.append(sCol_name)
                 
 
                 # Append column in the matrix
-                self.npMatrix = self.__append_col_to_matrix(self.npMatrix,\
-                                                            npData_col)
+                self.__append_col_to_buffer(npData_col)
             else:
                 sError = _("Cant append column '%s'.%s") % (sCol_name,
                                                             MESSAGE_COL_EXIST)
@@ -358,7 +410,8 @@ class Metro_data:
         
         """
         if not self.is_readonly():
-            if sCol_name not in self.lMatrix_col_name:
+            self.__unshare()
+            if sCol_name not in self.dMatrix_col_index:
                 self.lMatrix_col_name.append(sCol_name)
                 if self.lMatrix_col_usage == []:
                     nextCol = 0
@@ -368,17 +421,19 @@ class Metro_data:
                 nbCol = len(lColOfList[0])
                     
                 self.lMatrix_col_usage.append(range(nextCol,nextCol+nbCol))
+                self.dMatrix_col_index[sCol_name] = self.lMatrix_col_usage[-1]
                 self.lMatrix_ext_col_name.append(sCol_name)
                 
 
-                # Append column in the matrix
+                # Append column in the matrix, widened once for all the
+                #  real columns
+                self.reserve_columns(max(self.iNb_col_reserved, nbCol))
                 for i in range(0,nbCol):
                     colToInsert = []
                     for col in lColOfList:
                         colToInsert.append(col[i])
                     
-                    self.npMatrix = self.__append_col_to_matrix(self.npMatrix,\
-                                                                colToInsert)
+                    self.__append_col_to_buffer(colToInsert)
                     
             else:
                 sError = _("Cant append column '%s'.%s") % (sCol_name,
@@ -391,6 +446,42 @@ class Metro_data:
             raise  metro_error.Metro_data_error(MESSAGE_READONLY)
 
 
+    def reserve_columns( self, iNb_col ):
+        """
+        Name:         reserve_columns
+
+        Parameters:   I iNb_col : number of columns that will be appended
+
+        Descriptions: Reserve room in the matrix for iNb_col new columns.
+                      The next iNb_col calls to append_matrix_col fill this
+                      room instead of copying the whole matrix for each
+                      new column.
+        """
+        self.iNb_col_reserved = iNb_col
+
+    def append_matrix_cols( self, dData_col ):
+        """
+        Name:         append_matrix_cols
+
+        Parameters:   I dData_col : dictionary of the columns to insert in
+                                    the matrix, by column name.
+
+        Descriptions: Append several new columns of data to the matrix.
+                      The matrix is widened only once.  Columns will be
+                      treated as extended.
+        """
+        for sCol_name in dData_col.keys():
+            if sCol_name in self.dMatrix_col_index:
+                sError = _("Cant append column '%s'.%s") % (sCol_name,
+                                                            MESSAGE_COL_EXIST)
+                raise  metro_error.Metro_data_error(sError)
+
+        self.reserve_columns(max(self.iNb_col_reserved, len(dData_col)))
+        lCol_name = dData_col.keys()
+        lCol_name.sort()
+        for sCol_name in lCol_name:
+            self.append_matrix_col(sCol_name, dData_col[sCol_name])
+
     def get_header( self ):
         """
         Get the complete header dictionary. Dictionnary could be empty if it is not
@@ -423,7 +514,7 @@ class Metro_data:
         Get a copy of the whole matrix. Matrix is empty if not set before.
 
         """
-        return self.npMatrix.copy()
+        return self.__decode_matrix()
 
 
     def is_multi_col( self, sCol_name ):
@@ -440,26 +531,165 @@ class Metro_data:
         Descriptions: Get a copy of a matrix column identified by sCol_name.
         """
 
+        lIndex = self.index_of_matrix_col(sCol_name)
+
         # FFTODO get multi col
-        if self.is_multi_col(sCol_name):
-            begin = self.index_of_matrix_col(sCol_name)[0]
-            end = self.index_of_matrix_col(sCol_name)[-1]
+        if len(lIndex) > 1:
+            begin = lIndex[0]
+            end = lIndex[-1]
             returnList = []
             for i in range(begin,end+1):
-                returnList.append(self.npMatrix[:,i].copy())
+                returnList.append(self.__decode_col(i))
             return returnList
         else:
-            iCol = self.index_of_matrix_col(sCol_name)[0]
+            iCol = lIndex[0]
 
-            return self.npMatrix[:,iCol].copy()
+            return self.__decode_col(iCol)
+
+    def get_matrix_view( self ):
+        """
+        Get a read-only view of the whole matrix, without copy.
+
+        The view follows the in-place modifications done on this object
+        (set_matrix_col, ...) and must not be kept after the matrix is
+        replaced or reshaped.  Use get_matrix to get a writable copy.
+        With the compact storage, the values are decoded in a new array.
+        """
+        if self.bCompact:
+            return self.__readonly_view(self.__decode_matrix())
+        else:
+            return self.__readonly_view(self.npMatrix)
+
+    def get_matrix_col_view( self, sCol_name ):
+        """
+        Name:         get_matrix_col_view
+
+        Parameters:   I sCol_name : name of the column to return.
+
+        Returns:      Read-only view of the column of the matrix.
+
+        Descriptions: Same as get_matrix_col but without copy.  The
+                      returned array is not writeable and is not
+                      contiguous, it must be copied before being given
+                      to the physical model or modified.  With the
+                      compact storage, the values are decoded in a new
+                      array.
+        """
+
+        lIndex = self.index_of_matrix_col(sCol_name)
+
+        if len(lIndex) > 1:
+            return [self.__col_view(i)
+                    for i in range(lIndex[0],lIndex[-1]+1)]
+        else:
+            return self.__col_view(lIndex[0])
+
+    def __col_view( self, iCol ):
+        if self.bCompact:
+            return self.__readonly_view(self.__decode_col(iCol))
+        else:
+            return self.__readonly_view(self.npMatrix[:,iCol])
+
+    def __readonly_view( self, npArray ):
+        npView = npArray.view()
+        npView.flags.writeable = False
+        return npView
+
+    def to_recarray( self ):
+        """
+        Name:         to_recarray
+
+        Returns:      numpy record array of the matrix.
+
+        Descriptions: Return a copy of the matrix as a record array with
+                      one field per column name, in the order of the
+                      columns.  A column using several columns of the
+                      matrix (TL) is a field of shape (n,).  Only the
+                      first of two columns with the same name is exported.
+        """
+        lDtype = []
+        lCol_index = []
+        for i in range(0,len(self.lMatrix_col_name)):
+            sCol_name = self.lMatrix_col_name[i]
+            if self.dMatrix_col_index[sCol_name] is not \
+                   self.lMatrix_col_usage[i]:
+                continue
+            lIndex = self.lMatrix_col_usage[i]
+            if len(lIndex) > 1:
+                lDtype.append((sCol_name, numpy.float, (len(lIndex),)))
+            else:
+                lDtype.append((sCol_name, numpy.float))
+            lCol_index.append((sCol_name, lIndex))
+
+        npMatrix = self.get_matrix_view()
+        if npMatrix.ndim != 2:
+            return numpy.zeros(0, lDtype).view(numpy.recarray)
+
+        npRecord = numpy.empty(len(npMatrix), lDtype)
+        for (sCol_name, lIndex) in lCol_index:
+            if len(lIndex) > 1:
+                npRecord[sCol_name] = npMatrix[:,lIndex[0]:lIndex[-1]+1]
+            else:
+                npRecord[sCol_name] = npMatrix[:,lIndex[0]]
+        return npRecord.view(numpy.recarray)
+
+    def from_recarray( self, npRecord ):
+        """
+        Name:         from_recarray
+
+        Parameters:   I npRecord : numpy record (structured) array
+
+        Descriptions: Replace the columns and the matrix by those of a
+                      record array made by to_recarray.  Each field
+                      becomes a column, a field of shape (n,) a column
+                      using n columns of the matrix.  The fields that are
+                      not standard columns of this object are extended
+                      columns.
+        """
+        if self.is_readonly():
+            metro_logger.print_message(metro_logger.LOGGER_MSG_DEBUG,
+                                       MESSAGE_READONLY)
+            raise  metro_error.Metro_data_error(MESSAGE_READONLY)
+
+        lStd_col_name = []
+        lExt_col_name = []
+        lCol_usage = []
+        lCol = []
+        iNext_col = 0
+        for sCol_name in npRecord.dtype.names:
+            iNb_col = int(numpy.prod(npRecord.dtype[sCol_name].shape))
+            npField = numpy.asarray(npRecord[sCol_name], numpy.float)
+            npField = npField.reshape((len(npRecord), iNb_col))
+            lCol_usage.append(range(iNext_col, iNext_col+iNb_col))
+            iNext_col = iNext_col + iNb_col
+            lCol.append(npField)
+            if sCol_name in self.lMatrix_std_col_name:
+                lStd_col_name.append(sCol_name)
+            else:
+                lExt_col_name.append(sCol_name)
+
+        self.lMatrix_std_col_name = lStd_col_name
+        self.lMatrix_ext_col_name = lExt_col_name
+        self.lMatrix_col_name = list(npRecord.dtype.names)
+        self.lMatrix_col_usage = lCol_usage
+        self.dMatrix_col_index = {}
+        for i in range(0,len(self.lMatrix_col_name)):
+            self.dMatrix_col_index[self.lMatrix_col_name[i]] = lCol_usage[i]
+        self.npRow_buffer = None
+        self.npCol_buffer = None
+        self.iNb_col_reserved = 0
+
+        if lCol == []:
+            self.npMatrix = self.__encode_matrix(numpy.array([],
+                                                             numpy.float))
+        else:
+            self.npMatrix = self.__encode_matrix(numpy.hstack(lCol))
 
 
     def index_of_matrix_col( self, sCol_name ):
         """Get index value of a matrix column identified by sCol_name."""
-        if sCol_name in self.lMatrix_col_name:
-            index = self.lMatrix_col_name.index(sCol_name)
-            
-            return self.lMatrix_col_usage[index]
+        if sCol_name in self.dMatrix_col_index:
+            return self.dMatrix_col_index[sCol_name]
         else:
             sMatrix_col_list = metro_util.list2string(self.lMatrix_col_name)
             sError = _("%s is not a valid column name. Valid column name ") \
@@ -471,6 +701,13 @@ class Metro_data:
         """Get list of all the matrix column name."""
         return self.lMatrix_col_name
 
+    def get_nb_matrix_row( self ):
+        """Get number of matrix row."""
+        if self.npMatrix.ndim == 2:
+            return len(self.npMatrix)
+        else:
+            return 0
+
     def get_nb_matrix_col( self ):
         """Get number of matrix column."""
         return len(self.lMatrix_col_name)
@@ -493,32 +730,151 @@ class Metro_data:
         npIndiceToRemove (numpy) of indices to remove.
                           Indices must be in increasing order.
         """
-        if not self.is_readonly():
-            for i in range(len(npIndiceToRemove)-1,-1,-1):
-                nIndice = npIndiceToRemove[i]                
-                sMessage =  "removing %d" % ((nIndice))
-                metro_logger.print_message(metro_logger.LOGGER_MSG_DEBUG,\
-                                   sMessage)
-                npFirstPart = self.npMatrix[0:nIndice,:]
-                sMessage = "len(%s)" % (len(self.npMatrix))
-                metro_logger.print_message(metro_logger.LOGGER_MSG_DEBUG,\
-                                   sMessage)
-                if nIndice+1 < len(self.npMatrix) :
-                    npSecondPart = self.npMatrix[nIndice+1:len(self.npMatrix),:]
-                    self.npMatrix = numpy.concatenate((npFirstPart,
-                                                          npSecondPart))
-                else:
-                    self.npMatrix = npFirstPart
-                # Check if there at least one element left
-                if len(self.npMatrix) ==0:
-                    sEmptyMatrixError = _("All the data are invalid")
-                    metro_logger.print_message(metro_logger.LOGGER_MSG_WARNING,\
-                                               sMessage)
-                    raise  metro_error.Metro_data_error(sEmptyMatrixError)
-                
-        else:
+        self.delete_rows(npIndiceToRemove)
+
+    def delete_rows(self, npIndices):
+        """
+        Delete the rows identified by indices, in one copy of the matrix.
+
+        Arguments:
+        npIndices (numpy) of indices to remove, in any order.
+        """
+        npKeep = numpy.ones(self.get_nb_matrix_row(), numpy.bool_)
+        npKeep[numpy.asarray(npIndices, numpy.int_)] = False
+        self.keep_rows(npKeep)
+
+    def keep_rows(self, npMask):
+        """
+        Keep only the rows where npMask is True, in one copy of the matrix.
+        Raise a Metro_data_error if no row is left.
+
+        Arguments:
+        npMask (numpy) of booleans, one per row of the matrix.
+        """
+        if self.is_readonly():
             raise  metro_error.Metro_data_error(MESSAGE_READONLY)
 
+        npMask = numpy.asarray(npMask, numpy.bool_)
+        if npMask.all():
+            return
+
+        sMessage = "removing %d of %d rows" % \
+                   (len(npMask) - npMask.sum(), len(npMask))
+        metro_logger.print_message(metro_logger.LOGGER_MSG_DEBUG, sMessage)
+
+        if not npMask.any():
+            sEmptyMatrixError = _("All the data are invalid")
+            metro_logger.print_message(metro_logger.LOGGER_MSG_WARNING,\
+                                       sEmptyMatrixError)
+            raise  metro_error.Metro_data_error(sEmptyMatrixError)
+
+        self.npMatrix = self.npMatrix[npMask]
+
+    def __unshare( self ):
+        """
+        Copy the data shared with the objects made by copy_on_write, before
+        it is modified in place.
+        """
+        if not self.bShared:
+            return
+
+        self.dHeader = copy.deepcopy(self.dHeader)
+        self.npMatrix = self.npMatrix.copy()
+        self.npCol_origin = self.npCol_origin.copy()
+        self.npRow_buffer = None
+        self.npCol_buffer = None
+        self.lMatrix_std_col_name = list(self.lMatrix_std_col_name)
+        self.lMatrix_ext_col_name = list(self.lMatrix_ext_col_name)
+        self.lMatrix_col_name = list(self.lMatrix_col_name)
+        self.lMatrix_col_usage = [list(lUsage) for lUsage in
+                                  self.lMatrix_col_usage]
+        self.dMatrix_col_index = {}
+        for i in range(len(self.lMatrix_col_name)-1,-1,-1):
+            self.dMatrix_col_index[self.lMatrix_col_name[i]] = \
+                self.lMatrix_col_usage[i]
+        self.bShared = False
+
+    def __get_storage_dtype( self ):
+        if self.bCompact:
+            return numpy.float32
+        else:
+            return numpy.float
+
+    def __encode_col( self, npCol, iCol ):
+        """
+        Return the values of the column iCol in the storage format.  With
+        the compact storage, the origin of the column is its first value.
+        """
+        if not self.bCompact:
+            return npCol
+
+        npCol = numpy.asarray(npCol, numpy.float)
+        if numpy.isnan(self.npCol_origin[iCol]):
+            npFinite = npCol[numpy.isfinite(npCol)]
+            if len(npFinite) > 0:
+                self.npCol_origin[iCol] = npFinite[0]
+        return (npCol - self.npCol_origin[iCol]).astype(numpy.float32)
+
+    def __encode_new_col( self, npCol ):
+        if not self.bCompact:
+            return npCol
+
+        if self.npMatrix.ndim == 2:
+            iCol = self.npMatrix.shape[1]
+        else:
+            iCol = 0
+        self.npCol_origin = numpy.concatenate((self.npCol_origin[:iCol],
+                                               [metro_constant.NaN]))
+        return self.__encode_col(npCol, iCol)
+
+    def __encode_row( self, lData_row ):
+        if not self.bCompact:
+            return lData_row
+
+        npRow = numpy.asarray(lData_row, numpy.float)
+        if len(self.npCol_origin) != len(npRow):
+            self.npCol_origin = numpy.empty(len(npRow))
+            self.npCol_origin.fill(metro_constant.NaN)
+        npNew = numpy.isnan(self.npCol_origin) & numpy.isfinite(npRow)
+        self.npCol_origin[npNew] = npRow[npNew]
+        return npRow - self.npCol_origin
+
+    def __encode_matrix( self, npMatrix ):
+        """
+        Return npMatrix in the storage format.  With the compact storage,
+        the origins of the columns are taken again from npMatrix.
+        """
+        if not self.bCompact:
+            return npMatrix
+
+        npMatrix = numpy.asarray(npMatrix, numpy.float)
+        if npMatrix.ndim != 2:
+            self.npCol_origin = numpy.array([], dtype=numpy.float)
+            return npMatrix.astype(numpy.float32)
+
+        self.npCol_origin = numpy.empty(npMatrix.shape[1])
+        self.npCol_origin.fill(metro_constant.NaN)
+        npStored = numpy.empty(npMatrix.shape, numpy.float32)
+        for iCol in range(0, npMatrix.shape[1]):
+            npStored[:,iCol] = self.__encode_col(npMatrix[:,iCol], iCol)
+        return npStored
+
+    def __decode_col( self, iCol ):
+        if not self.bCompact:
+            return self.npMatrix[:,iCol].copy()
+
+        return self.npMatrix[:,iCol].astype(numpy.float) + \
+               self.npCol_origin[iCol]
+
+    def __decode_matrix( self ):
+        if not self.bCompact:
+            return self.npMatrix.copy()
+
+        npMatrix = self.npMatrix.astype(numpy.float)
+        if npMatrix.ndim == 2:
+            npMatrix = npMatrix + self.npCol_origin[:npMatrix.shape[1]]
+        return npMatrix
+
     def __append_row_to_matrix( self, npMatrix, npRow ):
         iCol = len(npRow)
         iRow = len(npMatrix)
@@ -526,6 +882,74 @@ class Metro_data:
         npMatrix[iRow:] = npRow
         return npMatrix
 
+    def __append_row_to_buffer( self, lData_row ):
+        """
+        Append a row to the matrix in amortized constant time.
+
+        The capacity of the row buffer doubles when it is full, so building
+        a matrix row by row is linear in the number of rows.  The buffer is
+        rebuilt from the matrix when the matrix was replaced since the last
+        append (set_matrix, del_matrix_row, append_matrix_col, ...).
+        """
+        if self.npMatrix.ndim == 2:
+            iNb_row = len(self.npMatrix)
+            dtype = self.npMatrix.dtype
+        else:
+            iNb_row = 0
+            dtype = self.__get_storage_dtype()
+
+        if self.npRow_buffer is None \
+               or self.npMatrix.base is not self.npRow_buffer \
+               or self.npRow_buffer.shape[1] != len(lData_row) \
+               or iNb_row == len(self.npRow_buffer):
+            npRow_buffer = numpy.empty((max(2*iNb_row, 16), len(lData_row)),
+                                       dtype)
+            if iNb_row > 0:
+                npRow_buffer[:iNb_row] = self.npMatrix
+            self.npRow_buffer = npRow_buffer
+
+        self.npRow_buffer[iNb_row] = self.__encode_row(lData_row)
+        self.npMatrix = self.npRow_buffer[:iNb_row+1]
+
+    def __append_col_to_buffer( self, npData_col ):
+        """
+        Append a column to the matrix, in the room reserved with
+        reserve_columns if there is some.  Without reserved room the
+        matrix is copied with its new column as it always was.
+        """
+        npData_col = self.__encode_new_col(numpy.asarray(npData_col))
+        iNb_row = len(npData_col)
+        if self.npMatrix.ndim == 2 and len(self.npMatrix) == iNb_row:
+            iNb_col = self.npMatrix.shape[1]
+            dtype = self.npMatrix.dtype
+        elif self.npMatrix.size == 0:
+            iNb_col = 0
+            dtype = self.__get_storage_dtype()
+        else:
+            self.npMatrix = self.__append_col_to_matrix(self.npMatrix,
+                                                        npData_col)
+            return
+
+        if self.npCol_buffer is None \
+               or self.npMatrix.base is not self.npCol_buffer \
+               or len(self.npCol_buffer) != iNb_row \
+               or self.npCol_buffer.shape[1] == iNb_col:
+            if self.iNb_col_reserved <= 0:
+                self.npMatrix = self.__append_col_to_matrix(self.npMatrix,
+                                                            npData_col)
+                return
+            npCol_buffer = numpy.empty((iNb_row,
+                                        iNb_col + self.iNb_col_reserved),
+                                       dtype)
+            if iNb_col > 0:
+                npCol_buffer[:,:iNb_col] = self.npMatrix
+            self.npCol_buffer = npCol_buffer
+
+        self.npCol_buffer[:,iNb_col] = npData_col
+        self.npMatrix = self.npCol_buffer[:,:iNb_col+1]
+        if self.iNb_col_reserved > 0:
+            self.iNb_col_reserved = self.iNb_col_reserved - 1
+
     def __append_col_to_matrix( self, npMatrix, npCol ):
         npMatrix = npMatrix.transpose()
         npMatrix = self.__append_row_to_matrix(npMatrix, npCol)
@@ -56,37 +56,52 @@ _ = metro_util.init_translation('metro_data_collection')
 
 ERROR_ATTRIBUTE = "Attribute_error"
 
-class Metro_data_collection:
+class Metro_data_collection(object):
     """
     Basic class for data collection
     Provide the method to manipulate attributes. Attributes are stored into a
-    list.
+    dictionary, their names in a list.
     """
+
+    # Thousands of collections are kept alive in batch mode, the
+    #  collections have no instance dictionary.  The subclasses must
+    #  declare their own slots.
+    __slots__ = ('lAttribute_list', 'dAttribute')
+
     def __init__( self, lData_attribute=[] ):
 
         # nom des attributs
-        self.lAttribute_list =  lData_attribute
-        
+        self.lAttribute_list = list(lData_attribute)
+
         # valeur des attributs
-        self.lAttribute = [None]*len(self.lAttribute_list)
+        self.dAttribute = dict.fromkeys(self.lAttribute_list)
+
+    def __getstate__( self ):
+        dState = {}
+        for cls in self.__class__.__mro__:
+            for sSlot in getattr(cls, '__slots__', ()):
+                dState[sSlot] = getattr(self, sSlot)
+        return dState
+
+    def __setstate__( self, dState ):
+        for sSlot in dState.keys():
+            setattr(self, sSlot, dState[sSlot])
         
     #------------------
     # Attribute method
     #------------------
 
     def get_attribute( self, sAttribute_name ):
-        if sAttribute_name in self.lAttribute_list:
-            iAttribute = self.lAttribute_list.index(sAttribute_name)
-            return self.lAttribute[iAttribute]
+        if sAttribute_name in self.dAttribute:
+            return self.dAttribute[sAttribute_name]
         else:
             sMessage = _("Invalid attribute name. Valid attribute name are:\n%s") \
                        % (str(self.lAttribute_list))
             raise ERROR_ATTRIBUTE, sMessage
 
     def set_attribute( self, sAttribute_name, value ):
-        if sAttribute_name in self.lAttribute_list:
-            iAttribute = self.lAttribute_list.index(sAttribute_name)
-            self.lAttribute[iAttribute] = value
+        if sAttribute_name in self.dAttribute:
+            self.dAttribute[sAttribute_name] = value
         else:
             sMessage = _("Invalid attribute name. Valid attribute name are:\n%s") \
                        % (str(self.lAttribute_list))
@@ -94,10 +109,10 @@ class Metro_data_collection:
 
     def append_attribute( self, sAttribute_name, value ):
 
-        if sAttribute_name not in self.lAttribute_list:
+        if sAttribute_name not in self.dAttribute:
             
             # valeur presente = value
-            self.lAttribute.append(value)
+            self.dAttribute[sAttribute_name] = value
             
             # Ajout a la liste des options disponnibles
             self.lAttribute_list.append(sAttribute_name)
@@ -33,8 +33,6 @@
 #
 #
 
-import copy
-
 import metro_data
 from metro_data_collection import Metro_data_collection
 
@@ -57,24 +55,29 @@ from metro_data_collection import Metro_data_collection
 
 class Metro_data_collection_input(Metro_data_collection):
 
+    __slots__ = ('original_data', 'controlled_data', 'interpolated_data')
+
     def __init__( self, data, lData_attribute=[] ):
         Metro_data_collection.__init__(self,lData_attribute)
-        self.original_data     = copy.deepcopy(data)
+        # The original and controlled data share the same matrix until
+        #  the controlled data is modified.
+        self.original_data     = data.copy_on_write()
         self.original_data.set_readonly(True)
         
-        self.controlled_data   = copy.deepcopy(data)
+        self.controlled_data   = data.copy_on_write()
         
         self.interpolated_data = metro_data.Metro_data()
         self.interpolated_data.set_header(self.original_data.get_header())
 
     def set_original_data( self, data ):
-        self.original_data = copy.deepcopy(data)
+        self.original_data = data.copy_on_write()
+        self.original_data.set_readonly(True)
 
     def set_controlled_data( self, data ):
-        self.controlled_data = copy.deepcopy(data)
+        self.controlled_data = data.copy_on_write()
 
     def set_interpolated_data( self, data ):
-        self.interpolated_data = copy.deepcopy(data)
+        self.interpolated_data = data.copy_on_write()
 
     def get_original_data( self ):
         return self.original_data
@@ -56,6 +56,8 @@ from metro_data_collection import Metro_data_collection
 
 class Metro_data_collection_output(Metro_data_collection):
 
+    __slots__ = ('raw_data', 'controlled_data', 'subsampled_data')
+
     def __init__( self, data, lData_attribute=[] ):
         Metro_data_collection.__init__(self,lData_attribute)
 
@@ -87,3 +89,10 @@ class Metro_data_collection_output(Metro_data_collection):
 
     def get_subsampled_data( self ):
         return self.subsampled_data
+
+    def to_recarray( self ):
+        """
+        Return the subsampled roadcast, as written in the roadcast file,
+        in a numpy record array.  See Metro_data.to_recarray.
+        """
+        return self.subsampled_data.to_recarray()
@@ -45,46 +45,71 @@ DATATYPE_METRO_DATA = 0
 DATATYPE_METRO_DATA_COLLECTION = 1
 
 
-class Metro_infdata:
+class Metro_infdata(object):
+
+    # Thousands of these are kept alive in batch mode, the items are
+    #  stored in slots rather than in a dictionary.
+    __slots__ = ('sName', 'xml_format', 'input_information',
+                 'output_information', 'data', 'iData_type',
+                 'bInput_borrowed')
 
     def __init__( self, sName, iData_type ):
-        self.dItems = {'NAME' : sName,
-                       'XML_FORMAT' : None,
-                       'INPUT_INFORMATION' : None,
-                       'OUTPUT_INFORMATION' : None,
-                       'DATA' : None
-                       }
+        self.sName = sName
+        self.xml_format = None
+        self.input_information = None
+        self.output_information = None
+        # Metro_data or Metro_data_collection, depending on iData_type
+        self.data = None
         self.iData_type = iData_type
+        # The input information belongs to the caller of run_roadcast
+        #  and must not be freed
+        self.bInput_borrowed = False
+
+    def __getstate__( self ):
+        return (self.sName, self.xml_format, self.input_information,
+                self.output_information, self.data, self.iData_type,
+                self.bInput_borrowed)
+
+    def __setstate__( self, tState ):
+        (self.sName, self.xml_format, self.input_information,
+         self.output_information, self.data, self.iData_type,
+         self.bInput_borrowed) = tState
 
     # NAME
     def get_name( self ):
-        return self.dItems['NAME']
+        return self.sName
 
     # XML FORMAT
     def get_xml_format( self ):
-        return self.dItems['XML_FORMAT']
+        return self.xml_format
 
     def set_xml_format( self, value ):
-        self.dItems['XML_FORMAT'] = value
+        self.xml_format = value
 
     # INPUT INFORMATION
     def get_input_information( self ):
-        return self.dItems['INPUT_INFORMATION']
+        return self.input_information
 
     def set_input_information( self, value ):
-        self.dItems['INPUT_INFORMATION'] = value
+        self.input_information = value
+
+    def is_input_borrowed( self ):
+        return self.bInput_borrowed
+
+    def set_input_borrowed( self, bBorrowed ):
+        self.bInput_borrowed = bBorrowed
 
     # OUTPUT INFORMATION
     def get_output_information( self ):
-        return self.dItems['OUTPUT_INFORMATION']
+        return self.output_information
 
     def set_output_information( self, value ):
-        self.dItems['OUTPUT_INFORMATION'] = value
+        self.output_information = value
 
     # DATA
     def get_data( self ):
         if self.iData_type == DATATYPE_METRO_DATA:
-            return self.dItems['DATA']
+            return self.data
         else:
             sMessage = _("%s object doesn't have a Metro_data item. ") \
                        % (str(self.__class__))+\
@@ -93,7 +118,7 @@ class Metro_infdata:
         
     def set_data( self, value ):
         if self.iData_type == DATATYPE_METRO_DATA:
-            self.dItems['DATA'] = value
+            self.data = value
         else:
             sMessage = _("%s object doesn't have a Metro_data item. ") \
                        % (str(self.__class__)) +\
@@ -104,7 +129,7 @@ class Metro_infdata:
     # DATA COLLECTION
     def get_data_collection( self ):
         if self.iData_type == DATATYPE_METRO_DATA_COLLECTION:
-            return self.dItems['DATA_COLLECTION']
+            return self.data
         else:
             sMessage = _("%s object doesn't have a Metro_data_collection ") \
                        % (str(self.__class__)) +\
@@ -113,7 +138,7 @@ class Metro_infdata:
 
     def set_data_collection( self, value ):
         if self.iData_type == DATATYPE_METRO_DATA_COLLECTION:
-            self.dItems['DATA_COLLECTION'] = value
+            self.data = value
         else:
             sMessage = _("%s object doesn't have a Metro_data_collection ") \
                          % (str(self.__class__)) +\
@@ -45,6 +45,14 @@ class Metro_infdata_container:
 
     def __init__( self ):
         self.dContainer = {}
+        # Configuration of the run, None for the one of metro_config
+        self.dConfig = None
+
+    def set_config( self, dConfig ):
+        self.dConfig = dConfig
+
+    def get_config( self ):
+        return self.dConfig
 
     def __getitem__( self, index ):
         return self.dContainer[self.dContainer.keys()[index]]
@@ -97,86 +97,12 @@ class Metro_dom2metro(Metro_module):
             pHorizon = None
 
 
-        #
-        # construct dictionnary of read handler
-        #
-        
-        import toolbox.metro_dom2metro_handler 
-
-        # Retrieve the informations about the data type
-        dStandard_data_type = metro_config.get_value('XML_DATATYPE_STANDARD')
-        dExtended_data_type = metro_config.get_value('XML_DATATYPE_EXTENDED')
-
-        dData_type = metro_util.join_dictionaries(dStandard_data_type,
-                                                  dExtended_data_type)
-
-        dReadHandlers = {}
+        dReadHandlers = self.get_read_handlers()
 
-        # construct dictionnary of read handlers (only done once so not expensive)
-        sMessage = _("-------------------------- Read handlers available --------------------------\n")
-        for dType in dData_type:
-            if dData_type[dType]['READ'] != "":
-                sCode = "handler = " + dData_type[dType]['READ']
-                exec sCode
-                dReadHandlers[dType] = handler
-                sMessage += _("TYPE: %s , HANDLER: %s\n") % (dType.ljust(15),dData_type[dType]['READ'])
-        sMessage += "-----------------------------------------------------------------------------"
-        metro_logger.print_message(metro_logger.LOGGER_MSG_DEBUG,
-                                   sMessage)           
-        
         #
         # Forecast extraction
         #
-
-        # validate version number
-        sFilename = metro_config.get_value('FILE_FORECAST_IN_FILENAME')
-        sFile_version = metro_xml.xpath(self.domForecast,"//version")
-
-        sMin_version = metro_config.get_value('FILE_FORECAST_IN_MIN_VERSION')
-        sMax_version = metro_config.get_value('FILE_FORECAST_IN_MAX_VERSION')
-        self.validate_file_version_number(sFilename, sFile_version,
-                                       sMin_version, sMax_version)
-            
-        try:
-            # concatenation of all the keys of the header
-            lHeader_keys = \
-                metro_config.get_value('XML_FORECAST_HEADER_STANDARD_ITEMS') + \
-                metro_config.get_value('XML_FORECAST_HEADER_EXTENDED_ITEMS')
-
-            # xpath building
-            sHeader_xpath = metro_config.get_value('XML_FORECAST_XPATH_HEADER')
-            sData_xpath = \
-                metro_config.get_value('XML_FORECAST_XPATH_PREDICTION')
-            
-            # concatenation of all forecast types
-            lStandard_forecast = \
-                metro_config.get_value('XML_FORECAST_PREDICTION_STANDARD_ITEMS')
-            lExtended_forecast = \
-                metro_config.get_value('XML_FORECAST_PREDICTION_EXTENDED_ITEMS')
-            forecast_data = metro_data.Metro_data(lStandard_forecast,\
-                                             lExtended_forecast)
-
-            forecast_data = self.__extract_data_from_dom(forecast_data,
-                                                         self.domForecast,
-                                                         lHeader_keys,
-                                                         sHeader_xpath,
-                                                         lStandard_forecast,
-                                                         lExtended_forecast,
-                                                         dReadHandlers,
-                                                         sData_xpath)
-        except metro_error.Metro_xml_error:
-            sXmlError = _("XML error in file '%s'.") % (sFilename)
-            raise metro_error.Metro_xml_error(sXmlError)
-
-        # create forecast collection
-        lForecast_standard_attribute = metro_config.get_value(
-            'DATA_ATTRIBUTE_FORECAST_STANDARD')
-        lForecast_extended_attribute = metro_config.get_value(
-            'DATA_ATTRIBUTE_FORECAST_EXTENDED')
-        lForecast_attribute = lForecast_standard_attribute \
-                              + lForecast_extended_attribute
-        forecast = metro_data_collection_input.Metro_data_collection_input(
-            forecast_data, lForecast_attribute)
+        forecast = self.extract_forecast(self.domForecast, dReadHandlers)
 
         #
         # Observations extraction
@@ -394,12 +320,22 @@ class Metro_dom2metro(Metro_module):
 
     def stop(self):
         Metro_module.stop(self)
-        # Free all the memory used by DOM
-        metro_xml.free_dom(self.domForecast)
-        metro_xml.free_dom(self.domObservation)
-        if self.domObservation_ref != None:
-            metro_xml.free_dom(self.domObservation_ref)
-        metro_xml.free_dom(self.domStation)
+        # Free all the memory used by DOM, except the documents given
+        #  already parsed to run_roadcast
+        for sName in ['FORECAST', 'OBSERVATION', 'OBSERVATION_REF',
+                      'STATION']:
+            if not self.infdata_exist(sName):
+                continue
+            pInfdata = self.get_infdata_reference(sName)
+            if pInfdata.get_input_information() != None and \
+               not pInfdata.is_input_borrowed():
+                metro_xml.free_dom(pInfdata.get_input_information())
+            pInfdata.set_input_information(None)
+        self.domForecast = None
+        self.domObservation = None
+        self.domObservation_ref = None
+        self.domStation = None
+        self.domHorizon = None
 
     def get_receive_type(self):
         return Metro_module.DATATYPE_INPUT
@@ -408,6 +344,102 @@ class Metro_dom2metro(Metro_module):
         return Metro_module.DATATYPE_DATA_IN
 
 
+    def get_read_handlers(self):
+        """
+        Name: get_read_handlers
+
+        Returns: dictionnary of the read handler of each data type.
+
+        Description: Construct the dictionnary of read handlers used to
+                     extract the data from the DOM.
+        """
+        import toolbox.metro_dom2metro_handler 
+
+        # Retrieve the informations about the data type
+        dStandard_data_type = metro_config.get_value('XML_DATATYPE_STANDARD')
+        dExtended_data_type = metro_config.get_value('XML_DATATYPE_EXTENDED')
+
+        dData_type = metro_util.join_dictionaries(dStandard_data_type,
+                                                  dExtended_data_type)
+
+        dReadHandlers = {}
+
+        # construct dictionnary of read handlers (only done once so not expensive)
+        sMessage = _("-------------------------- Read handlers available --------------------------\n")
+        for dType in dData_type:
+            if dData_type[dType]['READ'] != "":
+                sCode = "handler = " + dData_type[dType]['READ']
+                exec sCode
+                dReadHandlers[dType] = handler
+                sMessage += _("TYPE: %s , HANDLER: %s\n") % (dType.ljust(15),dData_type[dType]['READ'])
+        sMessage += "-----------------------------------------------------------------------------"
+        metro_logger.print_message(metro_logger.LOGGER_MSG_DEBUG,
+                                   sMessage)
+
+        return dReadHandlers
+
+    def extract_forecast(self, domForecast, dReadHandlers):
+        """
+        Name: extract_forecast
+
+        Arguments:  [I] domForecast: DOM of the forecast file.
+                    [I] dReadHandlers: read handlers, see get_read_handlers.
+
+        Returns: Metro_data_collection_input of the forecast.
+        """
+
+        # validate version number
+        sFilename = metro_config.get_value('FILE_FORECAST_IN_FILENAME')
+        sFile_version = metro_xml.xpath(domForecast,"//version")
+
+        sMin_version = metro_config.get_value('FILE_FORECAST_IN_MIN_VERSION')
+        sMax_version = metro_config.get_value('FILE_FORECAST_IN_MAX_VERSION')
+        self.validate_file_version_number(sFilename, sFile_version,
+                                       sMin_version, sMax_version)
+            
+        try:
+            # concatenation of all the keys of the header
+            lHeader_keys = \
+                metro_config.get_value('XML_FORECAST_HEADER_STANDARD_ITEMS') + \
+                metro_config.get_value('XML_FORECAST_HEADER_EXTENDED_ITEMS')
+
+            # xpath building
+            sHeader_xpath = metro_config.get_value('XML_FORECAST_XPATH_HEADER')
+            sData_xpath = \
+                metro_config.get_value('XML_FORECAST_XPATH_PREDICTION')
+            
+            # concatenation of all forecast types
+            lStandard_forecast = \
+                metro_config.get_value('XML_FORECAST_PREDICTION_STANDARD_ITEMS')
+            lExtended_forecast = \
+                metro_config.get_value('XML_FORECAST_PREDICTION_EXTENDED_ITEMS')
+            forecast_data = metro_data.Metro_data(lStandard_forecast,\
+                                             lExtended_forecast)
+
+            forecast_data = self.__extract_data_from_dom(forecast_data,
+                                                         domForecast,
+                                                         lHeader_keys,
+                                                         sHeader_xpath,
+                                                         lStandard_forecast,
+                                                         lExtended_forecast,
+                                                         dReadHandlers,
+                                                         sData_xpath)
+        except metro_error.Metro_xml_error:
+            sXmlError = _("XML error in file '%s'.") % (sFilename)
+            raise metro_error.Metro_xml_error(sXmlError)
+
+        # create forecast collection
+        lForecast_standard_attribute = metro_config.get_value(
+            'DATA_ATTRIBUTE_FORECAST_STANDARD')
+        lForecast_extended_attribute = metro_config.get_value(
+            'DATA_ATTRIBUTE_FORECAST_EXTENDED')
+        lForecast_attribute = lForecast_standard_attribute \
+                              + lForecast_extended_attribute
+        forecast = metro_data_collection_input.Metro_data_collection_input(
+            forecast_data, lForecast_attribute)
+
+        return forecast
+
     def __extract_data_from_dom(self, metro_data, domDom,
                                 ldHeader_keys, sHeader_xpath,
                                 lStdData_keys, lExtData_keys,
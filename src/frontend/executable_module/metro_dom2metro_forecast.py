@@ -0,0 +1,70 @@
+#
+# METRo : Model of the Environment and Temperature of Roads
+# METRo is Free and is proudly provided by the Government of Canada
+# Copyright (C) Her Majesty The Queen in Right of Canada, Environment Canada, 2006
+
+#  Questions or bugs report: metro@ec.gc.ca
+#  METRo repository: https://framagit.org/metroprojects/metro
+#  Documentation: https://framagit.org/metroprojects/metro/wikis/home
+#
+#
+# Code contributed by:
+#  Miguel Tremblay - Canadian meteorological center
+#  Francois Fortin - Canadian meteorological center
+#
+#  $LastChangedDate$
+#  $LastChangedRevision$
+#
+########################################################################
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#
+#
+
+"""
+Name:          metro_dom2metro_forecast
+Description:   Convert only the forecast DOM into a metro data collection.
+                Used by the ensemble mode where the observation and the
+                station are extracted once and shared by all the members.
+"""
+
+from metro_module import Metro_module
+from metro_dom2metro import Metro_dom2metro
+
+from toolbox import metro_xml
+from toolbox import metro_util
+
+_ = metro_util.init_translation('metro_dom2metro_forecast')
+
+class Metro_dom2metro_forecast(Metro_dom2metro):
+
+    ##
+    # Overwritten methodes
+    ##
+    def start(self):
+        Metro_module.start(self)
+
+        pForecast = self.get_infdata_reference('FORECAST')
+        self.domForecast = pForecast.get_input_information()
+
+        dReadHandlers = self.get_read_handlers()
+        forecast = self.extract_forecast(self.domForecast, dReadHandlers)
+
+        pForecast.set_data_collection(forecast)
+
+    def stop(self):
+        Metro_module.stop(self)
+        # Free the memory used by the forecast DOM
+        metro_xml.free_dom(self.domForecast)
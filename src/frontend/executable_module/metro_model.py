@@ -35,12 +35,17 @@
 
 from metro_module import Metro_module
 
+import os
+import copy
 import string
 import time
+import threading
 import numpy
+from multiprocessing.pool import ThreadPool
 
 import metro_logger
 import metro_config
+import metro_error
 from toolbox import metro_util
 from toolbox import metro_date
 from toolbox import metro_constant
@@ -55,6 +60,12 @@ from model import macadam
 
 class Metro_model(Metro_module):
 
+    # Road grids built by METRo core, by station configuration.  The
+    #  configuration of a station rarely changes from one run to the
+    #  next, the grid is built once and shared by all its roadcasts.
+    dGrid_cache = {}
+    lockGrid_cache = threading.Lock()
+
     def get_receive_type( self ):
         return Metro_module.DATATYPE_DATA_IN
 
@@ -72,14 +83,12 @@ class Metro_model(Metro_module):
         station_data = pStation.get_data()
 
         if metro_config.get_value('T_BYPASS_CORE') == False:
-
-            self.__send_data_to_metro_core(forecast_data,
-                                           observation_data,
-                                           station_data )
-            
-            roadcast_data = self.__create_roadcast_collection(forecast_data,
-                                                              observation_data,
-                                                              station_data)
+            sWarm_start_filename = \
+                metro_config.get_value('FILE_WARM_START_FILENAME')
+            roadcast_data = self.compute_roadcast(forecast_data,
+                                                  observation_data,
+                                                  station_data,
+                                                  sWarm_start_filename)
         else:
             roadcast_data = None
             metro_logger.print_message(
@@ -101,22 +110,378 @@ class Metro_model(Metro_module):
     def stop( self ):
         Metro_module.stop(self)
 
+    def compute_roadcast( self, forecast, observation, station,
+                          sWarm_start_filename=None ):
+        """
+        Run METRo core for one station and return the roadcast collection.
+
+        Each call has its own context in the core and the GIL is released
+        during the computation: several stations can be computed
+        concurrently by python threads.
+
+        If sWarm_start_filename is given, the run starts from the
+        temperature profile saved in this file by the previous run of
+        the station and the profile of this run is saved in it.
+        """
+        dCore_input = self.__get_core_input(forecast, observation, station)
+        fForecast_start = forecast.get_controlled_data().\
+                          get_matrix_col('FORECAST_TIME')[0]
+
+        sStation_name = station.get_station_name()
+
+        pContext = macadam.new_context()
+        try:
+            macadam.set_grid_context(pContext, self.get_grid(dCore_input))
+            if sWarm_start_filename:
+                self.__read_warm_start(pContext, sWarm_start_filename,
+                                       sStation_name, dCore_input,
+                                       fForecast_start)
+            self.__send_data_to_metro_core(pContext, dCore_input)
+            if sWarm_start_filename:
+                self.__write_warm_start(pContext, sWarm_start_filename,
+                                        sStation_name, dCore_input,
+                                        fForecast_start)
+
+            # Extraction of roadcast data computed by metro_core, one column
+            #  per field of macadam.lRESULTS_FIELDS.
+            iNb_timesteps = self.__get_nb_timesteps(forecast)
+            npResults = macadam.get_results(pContext, iNb_timesteps)
+
+            if metro_config.get_value('TL') == True:
+                # Temperature of levels under the ground.
+                nNbrVerticalLevel = macadam.get_nbr_levels_context(pContext)
+                lDepth = (macadam.get_depth_context(pContext))\
+                         [:nNbrVerticalLevel]
+                npTL = macadam.get_results_lt(pContext, iNb_timesteps)
+            else:
+                lDepth = None
+                npTL = None
+        finally:
+            macadam.free_context(pContext)
+
+        roadcast_data = self.__create_roadcast_collection(npResults,
+                                                          npTL, lDepth,
+                                                          forecast,
+                                                          observation,
+                                                          station)
+        return roadcast_data
+
+    def get_grid( self, dCore_input ):
+        """
+        Return the road grid of the station configuration given in
+        dCore_input (see __get_core_input).  The grid is built by METRo
+        core on the first request for this configuration and comes from
+        the cache afterwards.
+        """
+        tKey = self.__get_grid_key(dCore_input)
+
+        Metro_model.lockGrid_cache.acquire()
+        try:
+            if tKey not in Metro_model.dGrid_cache:
+                Metro_model.dGrid_cache[tKey] = macadam.new_grid(
+                    dCore_input['bFlat'], dCore_input['npLayerThick'],
+                    dCore_input['nNbrOfLayer'], dCore_input['npLayerType'],
+                    dCore_input['dSstDepth'], dCore_input['bSilent'])
+            pGrid = Metro_model.dGrid_cache[tKey]
+        finally:
+            Metro_model.lockGrid_cache.release()
+
+        return pGrid
+
+    def __get_grid_key( self, dCore_input ):
+        """
+        Station configuration the road grid depends on.
+        """
+        iNbr_layer = dCore_input['nNbrOfLayer']
+        return (int(dCore_input['bFlat']),
+                tuple(dCore_input['npLayerType'][:iNbr_layer].tolist()),
+                tuple(dCore_input['npLayerThick'][:iNbr_layer].tolist()),
+                float(dCore_input['dSstDepth']))
+
+    def __read_warm_start( self, pContext, sFilename, sStation_name,
+                           dCore_input, fForecast_start ):
+        """
+        Give to the core the temperature profile saved by the previous
+        run of the station.  The profile of another station is refused.
+        The core makes a cold start if the profile is too old or if the
+        coupling from this profile fails.
+        """
+        if not os.path.exists(sFilename):
+            sMessage = _("No warm start state in '%s', cold start") \
+                       % (sFilename)
+            metro_logger.print_message(metro_logger.LOGGER_MSG_INFORMATIVE,
+                                       sMessage)
+            return
+
+        try:
+            fState = open(sFilename, 'rb')
+            try:
+                dState = numpy.load(fState)
+                npItp = dState['profile']
+                fTime = float(dState['time'])
+                sState_station = str(dState['station'])
+                tKey = (int(dState['flat']),
+                        tuple(dState['layer_type'].tolist()),
+                        tuple(dState['layer_thick'].tolist()),
+                        float(dState['sst_depth']))
+            finally:
+                fState.close()
+        except Exception, inst:
+            sMessage = _("Cannot read warm start state '%s': %s\n") \
+                       % (sFilename, inst) + _("Cold start")
+            metro_logger.print_message(metro_logger.LOGGER_MSG_WARNING,
+                                       sMessage)
+            return
+
+        if sState_station != sStation_name:
+            sMessage = _("The warm start state '%s' is the one of the ") \
+                       % (sFilename) + \
+                       _("station '%s', not of '%s', cold start") \
+                       % (sState_station, sStation_name)
+            metro_logger.print_message(metro_logger.LOGGER_MSG_WARNING,
+                                       sMessage)
+            return
+
+        if tKey != self.__get_grid_key(dCore_input):
+            sMessage = _("The station configuration changed since the ") +\
+                       _("warm start state was saved, cold start")
+            metro_logger.print_message(metro_logger.LOGGER_MSG_INFORMATIVE,
+                                       sMessage)
+            return
+
+        nStep = int(round((fTime - fForecast_start)/metro_constant.fTimeStep))
+        macadam.set_warm_start_context(pContext, npItp, len(npItp), nStep)
+
+        sMessage = _("Warm start from the profile of %s") \
+                   % (metro_date.seconds2iso8601(fTime))
+        metro_logger.print_message(metro_logger.LOGGER_MSG_INFORMATIVE,
+                                   sMessage)
+
+    def __write_warm_start( self, pContext, sFilename, sStation_name,
+                            dCore_input, fForecast_start ):
+        """
+        Save the temperature profile at the start of the roadcast, with
+        its date, the station and the configuration of its grid.
+        """
+        npItp = numpy.array(macadam.get_itp_context(pContext))
+        if len(npItp) == 0:
+            return
+        fTime = fForecast_start + \
+                macadam.get_itp_step_context(pContext)*metro_constant.fTimeStep
+        (bFlat, tLayer_type, tLayer_thick, fSst_depth) = \
+                self.__get_grid_key(dCore_input)
+
+        try:
+            fState = open(sFilename, 'wb')
+            try:
+                numpy.savez(fState, profile=npItp, time=fTime,
+                            station=sStation_name, flat=bFlat,
+                            layer_type=numpy.array(tLayer_type, numpy.int_),
+                            layer_thick=numpy.array(tLayer_thick),
+                            sst_depth=fSst_depth)
+            finally:
+                fState.close()
+        except (IOError, OSError), inst:
+            sMessage = _("Cannot write warm start state '%s': %s") \
+                       % (sFilename, inst)
+            metro_logger.print_message(metro_logger.LOGGER_MSG_WARNING,
+                                       sMessage)
+
+    def clear_grid_cache( self ):
+        """
+        Release the road grids of the cache.  Must not be called while
+        roadcasts are computed.
+        """
+        Metro_model.lockGrid_cache.acquire()
+        try:
+            for pGrid in Metro_model.dGrid_cache.values():
+                macadam.free_grid(pGrid)
+            Metro_model.dGrid_cache.clear()
+        finally:
+            Metro_model.lockGrid_cache.release()
+
+    def compute_roadcast_batch( self, lStation_input, iNb_threads=1 ):
+        """
+        Run METRo core for several stations in one call and return the
+        list of roadcast collections.
+
+        lStation_input is a list of tuples (forecast, observation,
+        station).  The stations are computed in C by iNb_threads threads.
+        The roadcast of a station whose computation failed is None.
+
+        The batch does not return the temperature of the grid levels:
+        when TL is requested, the stations are computed with
+        compute_roadcast by iNb_threads python threads.
+        """
+        if metro_config.get_value('TL') == True:
+            return self.__compute_roadcast_threads(lStation_input,
+                                                   iNb_threads)
+
+        iNb_stations = len(lStation_input)
+        lCore_input = [self.__get_core_input(forecast, observation, station)
+                       for (forecast, observation, station) in lStation_input]
+
+        # Every forecast is computed up to the longest horizon. The
+        #  shorter ones are padded with their last value, the results
+        #  after their own horizon are dropped.
+        iNb_timesteps = max([dInput['nNbrTimeSteps'] for dInput
+                             in lCore_input])
+        iObs_stride = max([len(dInput['npTime_obs']) for dInput
+                           in lCore_input])
+        iZone_stride = max([len(dInput['npLayerType']) for dInput
+                            in lCore_input])
+        iSwo_stride = max([len(dInput['npSWO']) for dInput
+                           in lCore_input])
+
+        def stack(sKey, iLength, dtype=numpy.float64, bPad=True):
+            npStack = numpy.zeros((iNb_stations, iLength), dtype)
+            for i in range(0, iNb_stations):
+                npRow = lCore_input[i][sKey]
+                npStack[i,:len(npRow)] = npRow
+                if bPad and len(npRow) > 0:
+                    npStack[i,len(npRow):] = npRow[-1]
+            return npStack
+
+        def gather(sKey, dtype=numpy.float64):
+            return numpy.array([dInput[sKey] for dInput in lCore_input],
+                               dtype)
+
+        npResults = numpy.empty((iNb_stations, iNb_timesteps,
+                                 len(macadam.lRESULTS_FIELDS)))
+        npEchec = numpy.ones(iNb_stations, numpy.int_)
+
+        metro_logger.print_message(metro_logger.LOGGER_MSG_EXECPRIMARY,
+                                   _("Start sending data to METRo core"))
+
+        macadam.Do_Metro_batch(iNb_stations, gather('bFlat', numpy.int_),
+                               gather('fLat'), gather('fLon'),
+                               stack('npLayerThick', iZone_stride,
+                                     bPad=False),
+                               gather('nNbrOfLayer', numpy.int_),
+                               stack('npLayerType', iZone_stride, numpy.int_,
+                                     bPad=False),
+                               iZone_stride,
+                               stack('npAT', iNb_timesteps),
+                               stack('npQP', iNb_timesteps),
+                               stack('npWS', iNb_timesteps),
+                               stack('npAP', iNb_timesteps),
+                               stack('npSF', iNb_timesteps),
+                               stack('npIR', iNb_timesteps),
+                               stack('npFA', iNb_timesteps),
+                               stack('npPI', iNb_timesteps, numpy.int_),
+                               stack('npSC', iNb_timesteps, numpy.int_),
+                               stack('npAH', iNb_timesteps),
+                               iNb_timesteps,
+                               stack('npAT_obs', iObs_stride),
+                               stack('npST_obs', iObs_stride),
+                               stack('npSST_obs', iObs_stride),
+                               stack('npTime_obs', iObs_stride),
+                               gather('nLenObservation', numpy.int_),
+                               iObs_stride,
+                               stack('npSWO', iSwo_stride, numpy.int_,
+                                     bPad=False),
+                               iSwo_stride,
+                               numpy.array([dInput['bNoObs'][:2] for dInput
+                                            in lCore_input],
+                                           numpy.int_).ravel(),
+                               gather('fDeltaTMetroObservation'),
+                               gather('dSstDepth'),
+                               lCore_input[0]['bDeepTemp'],
+                               lCore_input[0]['dDeepTemp'],
+                               lCore_input[0]['bSilent'],
+                               iNb_threads, npResults, npEchec)
+
+        metro_logger.print_message(metro_logger.LOGGER_MSG_EXECPRIMARY,
+                                   _("End of METRo core"))
+
+        lRoadcast = []
+        for i in range(0, iNb_stations):
+            (forecast, observation, station) = lStation_input[i]
+            if npEchec[i] != 0:
+                sMessage = _("Fatal error in METRo physical model ") + \
+                           _("for station %s.") % (station.get_station_name())
+                metro_logger.print_message(metro_logger.LOGGER_MSG_WARNING,
+                                           sMessage)
+                lRoadcast.append(None)
+            else:
+                iStation_timesteps = lCore_input[i]['nNbrTimeSteps']
+                lRoadcast.append(self.__create_roadcast_collection(
+                    npResults[i,:iStation_timesteps], None, None,
+                    forecast, observation, station))
+
+        return lRoadcast
+
+    def __compute_roadcast_threads( self, lStation_input, iNb_threads ):
+        """
+        compute_roadcast_batch done with compute_roadcast, which
+        releases the GIL, in a pool of threads.
+        """
+        # The threads of the pool use the configuration of this one
+        dRun_config = metro_config.get_run_config()
+
+        def compute(tStation_input):
+            (forecast, observation, station) = tStation_input
+            metro_config.set_run_config(dRun_config)
+            try:
+                try:
+                    return self.compute_roadcast(forecast, observation,
+                                                 station)
+                except metro_error.Metro_stop_error:
+                    # Reported by compute_roadcast
+                    return None
+            finally:
+                metro_config.set_run_config(None)
+
+        pool = ThreadPool(max(1, min(iNb_threads, len(lStation_input))))
+        try:
+            return pool.map(compute, lStation_input)
+        finally:
+            pool.close()
+            pool.join()
+
+    def compute_percentile_roadcast( self, lRoadcast, fPercentile ):
+        """
+        Return a roadcast collection whose values are, at each time step,
+        the fPercentile percentile of the roadcasts of lRoadcast.
+
+        The roadcasts must have the same time steps.  The time columns
+        and the road condition, which is a category, are taken from the
+        first roadcast.
+        """
+        roadcast = copy.deepcopy(lRoadcast[0])
+        roadcast_data = roadcast.get_controlled_data()
+
+        npFirst = roadcast_data.get_matrix()
+        npStack = numpy.array([member.get_controlled_data().get_matrix()
+                               for member in lRoadcast])
+        npRoadcast = numpy.percentile(npStack, fPercentile, axis=0)
+        for sCol in ['ROADCAST_TIME', 'HH', 'RC']:
+            for iCol in roadcast_data.index_of_matrix_col(sCol):
+                npRoadcast[:,iCol] = npFirst[:,iCol]
+        roadcast_data.set_matrix(npRoadcast)
+
+        return roadcast
+
     def __get_nb_timesteps( self, forecast ):
         wf_data = forecast.get_interpolated_data()
-        npFT = wf_data.get_matrix_col('Time')
+        npFT = wf_data.get_matrix_col_view('Time')
 
         return len(npFT)
 
 
     def __get_observation_lenght( self, observation ):
         obs_data = observation.get_interpolated_data()
-        lTime_obs = obs_data.get_matrix_col('Time').tolist()
-        return len(lTime_obs)        
+        npTime_obs = obs_data.get_matrix_col_view('Time')
+        return len(npTime_obs)
 
     def __get_observation_delta_t( self, observation ):
         return observation.get_attribute('DELTA_T')        
         
-    def __send_data_to_metro_core( self, forecast, observation, station ):
+    def __get_core_input( self, forecast, observation, station ):
+        """
+        Extract from the data of a station all the arguments of the core.
+        Return a dictionary whose keys are the names of the arguments.
+        """
 
         wf_data = forecast.get_interpolated_data()
         ro_data = observation.get_interpolated_data()
@@ -172,23 +537,24 @@ class Metro_model(Metro_module):
 
         # start roadlayer MATRIX
         npLayerType  = cs_data.get_matrix_col('TYPE')
-        lLayerType = npLayerType.astype(numpy.int32).tolist()
-        lLayerThick = cs_data.get_matrix_col('THICKNESS').tolist()
-        nNbrOfLayer = len(lLayerType)
+        npLayerThick = cs_data.get_matrix_col('THICKNESS')
+        nNbrOfLayer = len(npLayerType)
 
         sMessage = _("Number of layer=") +  str(nNbrOfLayer)
         metro_logger.print_message(metro_logger.LOGGER_MSG_DEBUG,
                                    sMessage)
 
-        # Append an empty box for the manuel mode
-        lLayerType.append(0)
-        lLayerThick.append(0.0)
+        # Append an empty box for the manuel mode.
+        #  The arrays are given without copy to the core: C long for
+        #  the integers and float64 for the reals.
+        npLayerType = numpy.append(npLayerType, 0).astype(numpy.int_)
+        npLayerThick = numpy.append(npLayerThick, 0.0)
         
 
-        sMessage = _("roadlayer type=") + str(lLayerType)
+        sMessage = _("roadlayer type=") + str(npLayerType.tolist())
         metro_logger.print_message(metro_logger.LOGGER_MSG_DEBUG,
                                    sMessage)
-        sMessage = _("roadlayer thick=") + str(lLayerThick)
+        sMessage = _("roadlayer thick=") + str(npLayerThick.tolist())
         metro_logger.print_message(metro_logger.LOGGER_MSG_DEBUG,
                                    sMessage)
         # end roadlayer MATRIX
@@ -209,7 +575,7 @@ class Metro_model(Metro_module):
         
         wforiginal = forecast.get_original_data()
 
-        ft = wforiginal.get_matrix_col('FORECAST_TIME')
+        ft = wforiginal.get_matrix_col_view('FORECAST_TIME')
 
 
         ##################################################################
@@ -217,32 +583,27 @@ class Metro_model(Metro_module):
         #  Get the interpolated values.
         wf_interpolated_data =  forecast.get_interpolated_data()
         npAT =  wf_interpolated_data.get_matrix_col('AT')
-        lAT = npAT.tolist()
-        lQP = wf_interpolated_data.get_matrix_col('QP').tolist()
+        npQP = wf_interpolated_data.get_matrix_col('QP')
         npWS = wf_interpolated_data.get_matrix_col('WS')
-        lWS = npWS.tolist()
-        npTD = wf_interpolated_data.get_matrix_col('TD') 
-        lTD = npTD.tolist()
-        lAP = wf_interpolated_data.get_matrix_col('AP').tolist()
-        lSF = wf_interpolated_data.get_matrix_col('SF').tolist()
-        lIR = wf_interpolated_data.get_matrix_col('IR').tolist()
+        npAP = wf_interpolated_data.get_matrix_col('AP')
+        npSF = wf_interpolated_data.get_matrix_col('SF')
+        npIR = wf_interpolated_data.get_matrix_col('IR')
         npFA = wf_interpolated_data.get_matrix_col('FA')
-        lFA = npFA.tolist()
-        lPI = wf_interpolated_data.get_matrix_col('PI').astype(numpy.int32).tolist()
-        lSC = wf_interpolated_data.get_matrix_col('SC').astype(numpy.int32).tolist()
+        npPI = wf_interpolated_data.get_matrix_col('PI').astype(numpy.int_)
+        npSC = wf_interpolated_data.get_matrix_col('SC').astype(numpy.int_)
         
 
         # Number of 30 seconds step.
         npFT = wf_interpolated_data.get_matrix_col('Time')
         nNbrTimeSteps = self.__get_nb_timesteps(forecast)
-        lAH = wf_interpolated_data.get_matrix_col('AH').tolist()
+        npAH = wf_interpolated_data.get_matrix_col('AH')
 
         # Observation data ###############################################
         ro_interpolated_data = observation.get_interpolated_data()
-        lAT_obs = ro_interpolated_data.get_matrix_col('AT').tolist()
-        lST_obs =  ro_interpolated_data.get_matrix_col('ST').tolist()
-        lSST_obs =  ro_interpolated_data.get_matrix_col('SST').tolist()
-        lTime_obs = ro_interpolated_data.get_matrix_col('Time').tolist()
+        npAT_obs = ro_interpolated_data.get_matrix_col('AT')
+        npST_obs =  ro_interpolated_data.get_matrix_col('ST')
+        npSST_obs =  ro_interpolated_data.get_matrix_col('SST')
+        npTime_obs = ro_interpolated_data.get_matrix_col('Time')
         # Deep soil value given in command line
         bDeepTemp = metro_config.get_value('DEEP_SOIL_TEMP')
         dDeepTemp =  float(metro_config.get_value('DEEP_SOIL_TEMP_VALUE'))
@@ -251,22 +612,21 @@ class Metro_model(Metro_module):
         fDeltaTMetroObservation = self.__get_observation_delta_t(observation)
         
         # Concatenate the information to send it to C.
-        npSWO1 = observation.get_attribute('SST_VALID_INTERPOLATED')\
-                 .astype(numpy.int32)
-        npSWO2 = observation.get_attribute('AT_VALID_INTERPOLATED')\
-                 .astype(numpy.int32)
-        npSWO3 = observation.get_attribute('TD_VALID_INTERPOLATED')\
-                 .astype(numpy.int32)
-        npSWO4 = observation.get_attribute('WS_VALID_INTERPOLATED')\
-                 .astype(numpy.int32)
-        npSWO = numpy.zeros(4*metro_constant.nNL)
-        # Put all the arrays in one for the fortran code.
-        for i in range(0,len(npSWO1)):
-            npSWO[4*i] = npSWO1[i]
-            npSWO[4*i+1] = npSWO2[i]
-            npSWO[4*i+2] = npSWO3[i] 
-            npSWO[4*i+3] = npSWO4[i] 
-        lSWO = npSWO.astype(numpy.int32).tolist()
+        npSWO1 = observation.get_attribute('SST_VALID_INTERPOLATED')
+        npSWO2 = observation.get_attribute('AT_VALID_INTERPOLATED')
+        npSWO3 = observation.get_attribute('TD_VALID_INTERPOLATED')
+        npSWO4 = observation.get_attribute('WS_VALID_INTERPOLATED')
+        # Put all the arrays in one for the fortran code, interleaved:
+        #  SWO1[0], SWO2[0], SWO3[0], SWO4[0], SWO1[1], ...
+        #  One row for each observation, the core reads no further.
+        iLen_swo = len(npSWO1)
+        npSWO = numpy.zeros((max(nLenObservation, iLen_swo, 1), 4),
+                            numpy.int_)
+        npSWO[:iLen_swo,0] = npSWO1
+        npSWO[:iLen_swo,1] = npSWO2
+        npSWO[:iLen_swo,2] = npSWO3
+        npSWO[:iLen_swo,3] = npSWO4
+        npSWO = npSWO.ravel()
         
         bNoObs = observation.get_attribute('NO_OBS')
         
@@ -302,21 +662,44 @@ class Metro_model(Metro_module):
         
         bSilent = not metro_config.get_value('INIT_LOGGER_SHELL_DISPLAY')
 
+        return {'bFlat':bFlat, 'fLat':fLat, 'fLon':fLon,
+                'npLayerThick':npLayerThick, 'nNbrOfLayer':nNbrOfLayer,
+                'npLayerType':npLayerType, 'npAT':npAT, 'npQP':npQP,
+                'npWS':npWS, 'npAP':npAP, 'npSF':npSF, 'npIR':npIR,
+                'npFA':npFA, 'npPI':npPI, 'npSC':npSC,
+                'npAT_obs':npAT_obs, 'npST_obs':npST_obs,
+                'npSST_obs':npSST_obs, 'npAH':npAH,
+                'npTime_obs':npTime_obs, 'npSWO':npSWO, 'bNoObs':bNoObs,
+                'fDeltaTMetroObservation':fDeltaTMetroObservation,
+                'nLenObservation':nLenObservation,
+                'nNbrTimeSteps':nNbrTimeSteps, 'bSilent':bSilent,
+                'dSstDepth':dSstDepth, 'bDeepTemp':bDeepTemp,
+                'dDeepTemp':dDeepTemp}
+
+    def __send_data_to_metro_core( self, pContext, dInput ):
+
         metro_logger.print_message(metro_logger.LOGGER_MSG_EXECPRIMARY,
                                    _("Start sending data to METRo core"))
 
-        bEchec = []
-
-        macadam.Do_Metro(bFlat, fLat, fLon, lLayerThick, \
-                         nNbrOfLayer, lLayerType, lAT, lQP, \
-                         lWS, lAP, lSF, lIR, \
-                         lFA, lPI, lSC, lAT_obs, \
-                         lST_obs, lSST_obs, lAH, lTime_obs, \
-                         lSWO, bNoObs, fDeltaTMetroObservation, \
-                         nLenObservation, nNbrTimeSteps, bSilent, \
-                         dSstDepth, bDeepTemp, dDeepTemp)
-        bEchec = (macadam.get_echec())[0]
+        macadam.Do_Metro_context(pContext, dInput['bFlat'], dInput['fLat'],
+                                 dInput['fLon'], dInput['npLayerThick'],
+                                 dInput['nNbrOfLayer'], dInput['npLayerType'],
+                                 dInput['npAT'], dInput['npQP'],
+                                 dInput['npWS'], dInput['npAP'],
+                                 dInput['npSF'], dInput['npIR'],
+                                 dInput['npFA'], dInput['npPI'],
+                                 dInput['npSC'], dInput['npAT_obs'],
+                                 dInput['npST_obs'], dInput['npSST_obs'],
+                                 dInput['npAH'], dInput['npTime_obs'],
+                                 dInput['npSWO'], dInput['bNoObs'],
+                                 dInput['fDeltaTMetroObservation'],
+                                 dInput['nLenObservation'],
+                                 dInput['nNbrTimeSteps'], dInput['bSilent'],
+                                 dInput['dSstDepth'], dInput['bDeepTemp'],
+                                 dInput['dDeepTemp'])
+        bEchec = (macadam.get_echec_context(pContext))[0]
         # Check if the execution of the model was a succes:
+        # The context is freed by compute_roadcast
         if bEchec != 0:
             sError_message = _("Fatal error in METRo physical model.") 
             metro_logger.print_message(metro_logger.LOGGER_MSG_STOP,
@@ -325,7 +708,8 @@ class Metro_model(Metro_module):
             metro_logger.print_message(metro_logger.LOGGER_MSG_EXECPRIMARY,
                                        _("End of METRo core"))
 
-    def __create_roadcast_collection( self, forecast, observation, station ):
+    def __create_roadcast_collection( self, npResults, npTL, lDepth,
+                                      forecast, observation, station ):
         
 
         # Creation of the Metro_data object for the roadcast
@@ -362,31 +746,6 @@ class Metro_model(Metro_module):
         iNb_timesteps = self.__get_nb_timesteps(forecast)
 
 
-        # Extraction of roadcast data computed by metro_core
-        lRA = (macadam.get_ra())[:iNb_timesteps]
-        lSN = (macadam.get_sn())[:iNb_timesteps]
-        lRC = (macadam.get_rc())[:iNb_timesteps]
-        lST = (macadam.get_rt())[:iNb_timesteps]
-        lFV = (macadam.get_fv())[:iNb_timesteps]
-        lSF = (macadam.get_sf())[:iNb_timesteps]
-        lIR = (macadam.get_ir())[:iNb_timesteps]
-        lFC = (macadam.get_fc())[:iNb_timesteps]
-        lFG = (macadam.get_g())[:iNb_timesteps]
-        lBB = (macadam.get_bb())[:iNb_timesteps]
-        lFP = (macadam.get_fp())[:iNb_timesteps]
-        lSST =  (macadam.get_sst())[:iNb_timesteps]
-
-        if metro_config.get_value('TL') == True:
-            # Temperature of levels under the ground.
-            nNbrVerticalLevel = macadam.get_nbr_levels()
-            lDepth = (macadam.get_depth())[:nNbrVerticalLevel]
-            lTmpTL = (macadam.get_lt())[:nNbrVerticalLevel*iNb_timesteps]
-            lTL = []        
-            for i in range(0,iNb_timesteps):
-                begin = i * nNbrVerticalLevel
-                end = begin + nNbrVerticalLevel
-                lTL.append(lTmpTL[begin:end])
-           
         # Adding the informations to the header
         roadcast.set_header_value('VERSION',sRoadcast_version)
         roadcast.set_header_value('ROAD_STATION',sRoadcast_station)
@@ -397,7 +756,7 @@ class Metro_model(Metro_module):
                                   ['COORDINATE'][1])
         roadcast.set_header_value('FILETYPE','roadcast')
 
-        if metro_config.get_value('TL') == True:
+        if npTL is not None:
             roadcast.set_header_value('VERTICAL_LEVELS',lDepth)
   
 
@@ -405,46 +764,51 @@ class Metro_model(Metro_module):
         #  Il y a eu un probleme dans la conversion entre le C et le fortran
         #  qui fait en sorte qu'il y a un decalage d'un indice.  Il faudra que
         #  ce soit corrige.
-        npRT = wf_data.get_matrix_col('FORECAST_TIME')[:iNb_timesteps]
+        npRT = wf_data.get_matrix_col_view('FORECAST_TIME')[:iNb_timesteps]
         npRT = npRT + 30
-        npHH = wf_data.get_matrix_col('Time')[:iNb_timesteps]
-        npAT = wf_data.get_matrix_col('AT')[:iNb_timesteps]
-        npFA = wf_data.get_matrix_col('FA')[:iNb_timesteps]
+        npHH = wf_data.get_matrix_col_view('Time')[:iNb_timesteps]
+        npAT = wf_data.get_matrix_col_view('AT')[:iNb_timesteps]
+        npFA = wf_data.get_matrix_col_view('FA')[:iNb_timesteps]
         # 3.6 is to convert from m/s to km/h
-        npWS = wf_data.get_matrix_col('WS')[:iNb_timesteps]*3.6
-        npTD = wf_data.get_matrix_col('TD')[:iNb_timesteps]
-        npQP_SN = wf_data.get_matrix_col('SN')[:iNb_timesteps]
-        npQP_RA = wf_data.get_matrix_col('RA')[:iNb_timesteps]
-        npCC = wf_data.get_matrix_col('CC')[:iNb_timesteps]
-
-
-        roadcast.init_matrix(iNb_timesteps, roadcast.get_real_nb_matrix_col())
-
-        # Data added to the roadcast matrix
-        roadcast.set_matrix_col('RA', lRA)
-        roadcast.set_matrix_col('SN', lSN)
-        roadcast.set_matrix_col('RC', lRC)
-        roadcast.set_matrix_col('ST', lST)
-        roadcast.set_matrix_col('ROADCAST_TIME', npRT)
-        roadcast.set_matrix_col('HH', npHH)
-        roadcast.set_matrix_col('AT', npAT)
-        roadcast.set_matrix_col('WS', npWS)
-        roadcast.set_matrix_col('TD', npTD)
-        roadcast.set_matrix_col('QP-SN', npQP_SN)
-        roadcast.set_matrix_col('QP-RA', npQP_RA)
-        roadcast.set_matrix_col('IR', lIR)
-        roadcast.set_matrix_col('SF', lSF)
-        roadcast.set_matrix_col('FV', lFV)
-        roadcast.set_matrix_col('FC', lFC)
-        roadcast.set_matrix_col('FG', lFG)
-        roadcast.set_matrix_col('FA', npFA.tolist())
-        roadcast.set_matrix_col('BB', lBB)
-        roadcast.set_matrix_col('FP', lFP)
-        roadcast.set_matrix_col('CC', npCC)
-        roadcast.set_matrix_col('SST', lSST)
-
-        if metro_config.get_value('TL') == True:
-            roadcast.append_matrix_multiCol('TL', lTL)
+        npWS = wf_data.get_matrix_col_view('WS')[:iNb_timesteps]*3.6
+        npTD = wf_data.get_matrix_col_view('TD')[:iNb_timesteps]
+        npQP_SN = wf_data.get_matrix_col_view('SN')[:iNb_timesteps]
+        npQP_RA = wf_data.get_matrix_col_view('RA')[:iNb_timesteps]
+        npCC = wf_data.get_matrix_col_view('CC')[:iNb_timesteps]
+
+
+        # Roadcast column: (source array, column of the source array)
+        dRoadcast_col = {'ROADCAST_TIME' : (npRT, None),
+                         'HH'            : (npHH, None),
+                         'AT'            : (npAT, None),
+                         'TD'            : (npTD, None),
+                         'WS'            : (npWS, None),
+                         'QP-SN'         : (npQP_SN, None),
+                         'QP-RA'         : (npQP_RA, None),
+                         'CC'            : (npCC, None),
+                         'FA'            : (npFA, None)}
+        for (sCol, sField) in [('RA','RA'), ('SN','SN'), ('RC','RC'),
+                               ('ST','RT'), ('IR','IR'), ('SF','SF'),
+                               ('FV','FV'), ('FC','FC'), ('FG','G'),
+                               ('BB','BB'), ('FP','FP'), ('SST','SST')]:
+            dRoadcast_col[sCol] = \
+                (npResults, macadam.lRESULTS_FIELDS.index(sField))
+
+        # Whole roadcast matrix built at once
+        npRoadcast = numpy.empty((iNb_timesteps,
+                                  roadcast.get_real_nb_matrix_col()))
+        npRoadcast.fill(metro_constant.NaN)
+        for sCol in dRoadcast_col.keys():
+            (npSource, iField) = dRoadcast_col[sCol]
+            iCol = roadcast.index_of_matrix_col(sCol)[0]
+            if iField == None:
+                npRoadcast[:,iCol] = npSource
+            else:
+                npRoadcast[:,iCol] = npSource[:,iField]
+        roadcast.set_matrix(npRoadcast)
+
+        if npTL is not None:
+            roadcast.append_matrix_multiCol('TL', npTL)
 
         
         # Creation of the object Metro_data_collection for the roadcast
@@ -36,7 +36,6 @@
 import string
 
 import metro_logger
-from data_module import metro_infdata_container
 from data_module import metro_infdata
 from toolbox import metro_util
 
@@ -52,8 +51,10 @@ class Metro_module:
     DATATYPE_DOM_OUT  = 4
     lData_type_txtid = ["NONE","INPUT", "DATA_IN", "DATA_OUT", "DOM_OUT"]
 
-    # infdata container
-    infdata_container = metro_infdata_container.Metro_infdata_container()
+    # infdata container of the run, given to the first module of the
+    #  execution sequence by metro_execute_module and then passed from
+    #  module to module by send_data_to.
+    infdata_container = None
 
     # infdata datatype
     INFDATATYPE_DATA = metro_infdata.DATATYPE_METRO_DATA
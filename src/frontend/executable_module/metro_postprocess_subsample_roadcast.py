@@ -157,6 +157,11 @@ class Metro_postprocess_subsample_roadcast(Metro_postprocess):
         sStartDate = metro_config.get_value('INIT_ROADCAST_START_DATE')
 
         fStartDate = metro_date.parse_date_string(sStartDate)
+        sEndDate = metro_config.get_value('INIT_ROADCAST_END_DATE')
+        if sEndDate != "":
+            fEndDate = metro_date.parse_date_string(sEndDate)
+        else:
+            fEndDate = None
         
         sMessage = _("Output file roadcast start date: '%s'") % (sStartDate)
         metro_logger.print_message(metro_logger.LOGGER_MSG_INFORMATIVE,
@@ -170,6 +175,11 @@ class Metro_postprocess_subsample_roadcast(Metro_postprocess):
         for i in range(nFirstRoundTimestep, iNb_timesteps):
             fCurrentTime = dElement_Array['HH'][i]*3600
 
+            # Nothing is written after the roadcast end date
+            if fEndDate != None and \
+                   dElement_Array['ROADCAST_TIME'][i] > fEndDate:
+                break
+
             # Forecast at every 20 minutes, i.e. 1200 seconds  
             lRCvect = [0]*rc_subsampled.get_real_nb_matrix_col()
             lMatrix_line = [None]*rc_subsampled.get_real_nb_matrix_col()
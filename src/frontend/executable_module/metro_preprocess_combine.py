@@ -72,6 +72,9 @@ class Metro_preprocess_combine(Metro_preprocess):
         observation_data = pObservation.get_data_collection()
         
         self.__set_attribute(observation_data)
+        # SC and AH
+        forecast_data.get_interpolated_data().reserve_columns(2)
+
         self.__combine_AT(forecast_data.get_interpolated_data(),
                           observation_data.get_interpolated_data(),
                           observation_data)
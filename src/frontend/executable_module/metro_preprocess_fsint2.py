@@ -116,6 +116,9 @@ class Metro_preprocess_fsint2(Metro_preprocess):
                              forecast_data.get_interpolated_data(), \
                              station_data)
         self.__print_info()
+        # SF and IR
+        forecast_data.get_controlled_data().reserve_columns(2)
+        forecast_data.get_interpolated_data().reserve_columns(2)
         # SF
         self.__set_sf(forecast_data.get_controlled_data(),\
                      forecast_data.get_interpolated_data() )
@@ -70,6 +70,12 @@ class Metro_preprocess_interpol_forecast(Metro_preprocess):
         pForecast = self.get_infdata_reference('FORECAST')
         forecast_data = pForecast.get_data_collection()
 
+        # The matrices get their final width at once: Hour and Time in
+        #  the controlled data, FORECAST_TIME, Time, AT, QP, SN, RA, WS,
+        #  TD, AP, PI, CC and FA in the interpolated data.
+        forecast_data.get_controlled_data().reserve_columns(2)
+        forecast_data.get_interpolated_data().reserve_columns(12)
+
         self.__set_attribute(forecast_data.get_original_data(),\
                              forecast_data.get_controlled_data())
         self.__interpolate_FT(forecast_data.get_original_data(), \
@@ -251,9 +257,9 @@ class Metro_preprocess_interpol_forecast(Metro_preprocess):
         npQP = npQP / 3600.0 # Convert by second
         npQP = numpy.where(npQP < 0, 0, npQP)
 
-        wf_interpolated_data.append_matrix_col('QP', npQP)
-        wf_interpolated_data.append_matrix_col('SN', npSN)
-        wf_interpolated_data.append_matrix_col('RA', npRA)
+        wf_interpolated_data.append_matrix_cols({'QP':npQP,
+                                                 'SN':npSN,
+                                                 'RA':npRA})
         
 
     # Wind velocity
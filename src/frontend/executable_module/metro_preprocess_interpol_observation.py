@@ -71,6 +71,9 @@ class Metro_preprocess_interpol_observation(Metro_preprocess):
 
         pObservation = self.get_infdata_reference('OBSERVATION')
         observation_data = pObservation.get_data_collection()
+
+        # Time, AT, TD, WS, ST, SST, PI and SC
+        observation_data.get_interpolated_data().reserve_columns(8)
         
         try: 
             self.__set_time(observation_data.get_controlled_data(), \
@@ -112,7 +115,7 @@ class Metro_preprocess_interpol_observation(Metro_preprocess):
         Functions Called:  numpy.arange, astype
                            numpy.zeros
                            metro_data.set_matrix
-                           metro_data.get_matrix_col
+                           metro_data.get_matrix_col_view
                            metro_data.append_matrix_col
                            observation_data.set_attribute
                            metro_config.get_value('FILE_OBSERVATION_FILENAME')
@@ -127,7 +130,7 @@ class Metro_preprocess_interpol_observation(Metro_preprocess):
         """
 
         # Set the time in the interpolated matrix.
-        npTime =  ro_controlled_data.get_matrix_col('Time')
+        npTime =  ro_controlled_data.get_matrix_col_view('Time')
         self.npTimeInterpolated = numpy.arange(npTime[0], \
                                                npTime[len(npTime)-1],
                                                metro_constant.fTimeStep)
@@ -169,13 +172,13 @@ class Metro_preprocess_interpol_observation(Metro_preprocess):
         Returns: None
 
         Functions Called: metro_util.interpolate,
-                          metro_data.get_matrix_col
+                          metro_data.get_matrix_col_view
                           metro_data.append_matrix_col
 
         Description: Does the interpolation of the air temperature
         """
-        npTimeOrig = ro_controlled_data.get_matrix_col('Time')
-        npAT = ro_controlled_data.get_matrix_col('AT')
+        npTimeOrig = ro_controlled_data.get_matrix_col_view('Time')
+        npAT = ro_controlled_data.get_matrix_col_view('AT')
         npAT = metro_util.interpolate(npTimeOrig, npAT)
         ro_interpolated_data.append_matrix_col('AT', npAT)
 
@@ -192,7 +195,7 @@ class Metro_preprocess_interpol_observation(Metro_preprocess):
         Returns: None
 
         Functions Called: metro_util.interpolate,
-                          metro_data.get_matrix_col
+                          metro_data.get_matrix_col_view
                           metro_data.append_matrix_col
 
         Description: Does the interpolation of the dew point
@@ -202,8 +205,8 @@ class Metro_preprocess_interpol_observation(Metro_preprocess):
         Author		Date		Reason
         Miguel Tremblay      August 5th 2004
         """
-        npTimeOrig = ro_controlled_data.get_matrix_col('Time')
-        npTD = ro_controlled_data.get_matrix_col('TD')
+        npTimeOrig = ro_controlled_data.get_matrix_col_view('Time')
+        npTD = ro_controlled_data.get_matrix_col_view('TD')
         npTD = metro_util.interpolate(npTimeOrig, npTD)
         ro_interpolated_data.append_matrix_col('TD', npTD)
 
@@ -219,7 +222,7 @@ class Metro_preprocess_interpol_observation(Metro_preprocess):
         Returns: None
 
         Functions Called: metro_util.interpolate,
-                          metro_data.get_matrix_col
+                          metro_data.get_matrix_col_view
                           metro_data.append_matrix_col
 
         Description: Does the interpolation of the wind speed.
@@ -231,8 +234,8 @@ class Metro_preprocess_interpol_observation(Metro_preprocess):
         Author		Date		Reason
         Miguel Tremblay      August 11th 2004
         """
-        npTimeOrig = ro_controlled_data.get_matrix_col('Time')
-        npWS = ro_controlled_data.get_matrix_col('WS')*0.2777777
+        npTimeOrig = ro_controlled_data.get_matrix_col_view('Time')
+        npWS = ro_controlled_data.get_matrix_col_view('WS')*0.2777777
         npWS = metro_util.interpolate(npTimeOrig, npWS)
         ro_interpolated_data.append_matrix_col('WS', npWS)
 
@@ -249,7 +252,7 @@ class Metro_preprocess_interpol_observation(Metro_preprocess):
         Returns: None
 
         Functions Called: metro_util.interpolate,
-                          metro_data.get_matrix_col
+                          metro_data.get_matrix_col_view
                           metro_data.append_matrix_col
 
         Description: Does the interpolation of road temperature
@@ -260,8 +263,8 @@ class Metro_preprocess_interpol_observation(Metro_preprocess):
         Miguel Tremblay      August 11th 2004
         """
         
-        npTimeOrig = ro_controlled_data.get_matrix_col('Time')
-        npST = ro_controlled_data.get_matrix_col('ST')
+        npTimeOrig = ro_controlled_data.get_matrix_col_view('Time')
+        npST = ro_controlled_data.get_matrix_col_view('ST')
         npST = metro_util.interpolate(npTimeOrig, npST)
         ro_interpolated_data.append_matrix_col('ST', npST)
 
@@ -276,14 +279,14 @@ class Metro_preprocess_interpol_observation(Metro_preprocess):
         Returns: None
 
         Functions Called: metro_util.interpolate,
-                          metro_data.get_matrix_col
+                          metro_data.get_matrix_col_view
                           metro_data.append_matrix_col
 
         Description: Does the interpolation of road temperature under the surface.
         """
         
-        npTimeOrig = ro_controlled_data.get_matrix_col('Time')
-        npSST = ro_controlled_data.get_matrix_col('SST')
+        npTimeOrig = ro_controlled_data.get_matrix_col_view('Time')
+        npSST = ro_controlled_data.get_matrix_col_view('SST')
 
         npSST = metro_util.interpolate(npTimeOrig, npSST)
         ro_interpolated_data.append_matrix_col('SST', npSST)
@@ -299,15 +302,15 @@ class Metro_preprocess_interpol_observation(Metro_preprocess):
         Returns: None
 
         Functions Called: metro_util.interpolate,
-                          metro_data.get_matrix_col
+                          metro_data.get_matrix_col_view
                           metro_data.append_matrix_col
                           numpy.where, around
 
          Description: Does the interpolation of presence of precipitation.
          """
         
-        npTimeOrig = ro_controlled_data.get_matrix_col('Time')
-        npPI = ro_controlled_data.get_matrix_col('PI')
+        npTimeOrig = ro_controlled_data.get_matrix_col_view('Time')
+        npPI = ro_controlled_data.get_matrix_col_view('PI')
         npPI = numpy.where(npPI != 1, 0, npPI)
         npPI = metro_util.interpolate(npTimeOrig, npPI)
         # Round
@@ -328,7 +331,7 @@ class Metro_preprocess_interpol_observation(Metro_preprocess):
         Returns: None
 
         Functions Called: metro_util.interpolate,
-                          metro_data.get_matrix_col
+                          metro_data.get_matrix_col_view
                           metro_data.append_matrix_col
                           numpy.where, around
 
@@ -342,8 +345,8 @@ class Metro_preprocess_interpol_observation(Metro_preprocess):
           Miguel Tremblay      August 12th 2004
           """
         
-        npTimeOrig = ro_controlled_data.get_matrix_col('Time')
-        npSC = ro_controlled_data.get_matrix_col('SC')
+        npTimeOrig = ro_controlled_data.get_matrix_col_view('Time')
+        npSC = ro_controlled_data.get_matrix_col_view('SC')
         # Convert
         npSC = numpy.where(npSC == 33, 0, 1)
         npSC = numpy.where(npSC < 0, 0, npSC)
@@ -375,7 +378,7 @@ class Metro_preprocess_interpol_observation(Metro_preprocess):
 
         """
         
-        npTimeOrig = ro_controlled_data.get_matrix_col('Time')
+        npTimeOrig = ro_controlled_data.get_matrix_col_view('Time')
         npSST = observation_data.get_attribute('SST_VALID')
         npAT = observation_data.get_attribute('AT_VALID')
         npTD = observation_data.get_attribute('TD_VALID')
@@ -386,11 +389,11 @@ class Metro_preprocess_interpol_observation(Metro_preprocess):
         npAT = metro_util.interpolate(npTimeOrig, npAT)
         npTD = metro_util.interpolate(npTimeOrig, npTD)
         npWS = metro_util.interpolate(npTimeOrig, npWS)
-        # Round
-        npTD = numpy.floor(npTD)
-        npAT = numpy.floor(npAT)
-        npSST = numpy.floor(npSST)
-        npWS = numpy.floor(npWS)
+        # Round, the flags are stored on one byte
+        npTD = numpy.floor(npTD).astype(numpy.int8)
+        npAT = numpy.floor(npAT).astype(numpy.int8)
+        npSST = numpy.floor(npSST).astype(numpy.int8)
+        npWS = numpy.floor(npWS).astype(numpy.int8)
         # Store
         observation_data.set_attribute('TD_VALID_INTERPOLATED', npTD)
         observation_data.set_attribute('AT_VALID_INTERPOLATED', npAT)
@@ -69,8 +69,14 @@ class Metro_preprocess_qa_qc_observation(Metro_preprocess):
         
             Metro_preprocess.start(self)
 
-            self.__check_nan(observation_data.get_controlled_data())
-            self.__remove_bad_surface_temperature_arg(observation_data.get_controlled_data())
+            # The rejected observations are removed all at once
+            ro_controlled_data = observation_data.get_controlled_data()
+            npKeep = numpy.ones(ro_controlled_data.get_nb_matrix_row(),
+                                numpy.bool_)
+            self.__check_nan(ro_controlled_data, npKeep)
+            self.__remove_bad_surface_temperature_arg(ro_controlled_data,
+                                                      npKeep)
+            ro_controlled_data.keep_rows(npKeep)
             self.__set_time(observation_data.get_controlled_data())
             self.__check_time_order(observation_data.get_controlled_data(),\
                                     forecast_data.get_controlled_data())
@@ -143,20 +149,21 @@ class Metro_preprocess_qa_qc_observation(Metro_preprocess):
     
     
 
-    def __check_nan(self, ro_controlled_data):
+    def __check_nan(self, ro_controlled_data, npKeep):
         """
         Name: __check_nan
         Parameters: metro_data controlled_data : controlled observation data
+                    numpy npKeep : False for the rows to remove
         Returns: None
 
         Functions Called: metro_data.get_matrix_col
                           numpy.where, nonzero, isnan
                           metro_logger.print_message
-                          metro_data.del_matrix_row
                           metro_date.get_hour
                           metro_config.get_value
 
-        Description: Remove the observations containing NaN values.
+        Description: Mark the observations containing NaN values
+                     for removal.
 
         Notes: 
 
@@ -182,23 +189,23 @@ class Metro_preprocess_qa_qc_observation(Metro_preprocess):
                         sMessage = _("%dth value in %s is NaN, removing") %  (nIndice, sElement) 
                         metro_logger.print_message(metro_logger.LOGGER_MSG_INFORMATIVE,
                                                sMessage)
-                    ro_controlled_data.del_matrix_row(npBadIndices)
+                    npKeep[npBadIndices] = False
     
-    def __remove_bad_surface_temperature_arg(self, ro_controlled_data):
+    def __remove_bad_surface_temperature_arg(self, ro_controlled_data, npKeep):
         """
         Name: __remove_bad_surface_temperature_arg
         Parameters: metro_data controlled_data : controlled observation data
+                    numpy npKeep : False for the rows to remove
         Returns: None
 
         Functions Called: metro_data.get_matrix_col
                           numpy.where, nonzero
                           metro_logger.print_message
-                          metro_data.del_matrix_row
                           metro_date.get_hour
                           metro_config.get_value
 
-        Description: Remove the wrong measure of surface temperature
-                     in the controlled observations.
+        Description: Mark the wrong measure of surface temperature
+                     in the controlled observations for removal.
 
         Notes: 
 
@@ -225,13 +232,12 @@ class Metro_preprocess_qa_qc_observation(Metro_preprocess):
                     metro_logger.print_message(metro_logger.LOGGER_MSG_INFORMATIVE,
                                                sMessage)
                 
-                ro_controlled_data.del_matrix_row(npBadIndices)
+                npKeep[npBadIndices] = False
         # or less than nRoadTemperatureMin
-        npST = ro_controlled_data.get_matrix_col('ST')
         npBad = numpy.where(npST < metro_constant.nRoadTemperatureMin , 1, 0)
         if len(npBad) > 0:
             npBadIndices = (numpy.nonzero(npBad))[0]
-            ro_controlled_data.del_matrix_row(npBadIndices)
+            npKeep[npBadIndices] = False
 
     def __check_time_order(self, ro_controlled_data, wf_controlled_data):
         """
@@ -245,11 +251,12 @@ class Metro_preprocess_qa_qc_observation(Metro_preprocess):
                           metro_util.get_difference_array
                           numpy.where, nonzero, arange
                           metro_date.get_day, get_hour, get_minute
-                          metro_data.del_matrix_row
+                          metro_data.keep_rows
                           metro_logger.print_message
 
         Description: Check if the time of the observation are in order.  
                      Cut the information that are spaced by more than 240 minutes.
+                     All the rejected observations are removed at the end.
         Notes: 
 
         Revision History:
@@ -258,7 +265,7 @@ class Metro_preprocess_qa_qc_observation(Metro_preprocess):
         """
         
         npTime = ro_controlled_data.get_matrix_col('Time')
-        npCheck = metro_util.get_difference_array(npTime)
+        npKeep = numpy.ones(len(npTime), numpy.bool_)
         # If a gap of more than nGapMinuteObservation
         #  minutes is identify, cut the value before.
         npCheck = metro_util.get_difference_array(npTime)        
@@ -284,9 +291,7 @@ class Metro_preprocess_qa_qc_observation(Metro_preprocess):
                                            sMessage)
 
             
-            toto = numpy.arange(0,npBadIndice[len(npBadIndice)-1]+1) 
-            ro_controlled_data.del_matrix_row(toto)
-        npTime = ro_controlled_data.get_matrix_col('Time')
+            npKeep[:npBadIndice[len(npBadIndice)-1]+1] = False
         npBad = numpy.where( npCheck < 0, 1, 0)
         npBadIndice = (numpy.nonzero(npBad))[0]
         # Accept 1 value under zero because the last value of
@@ -299,14 +304,14 @@ class Metro_preprocess_qa_qc_observation(Metro_preprocess):
         # Remove the values that are equal.
         npBad = numpy.where( npCheck == 0, 1, 0)
         npBadIndice = (numpy.nonzero(npBad))[0]
-        ro_controlled_data.del_matrix_row(npBadIndice)
+        npKeep[npBadIndice] = False
 
 
 ########################################################
 
         npFT = wf_controlled_data.get_matrix_col('FORECAST_TIME')
         
-        npOT = ro_controlled_data.get_matrix_col('Time')
+        npOT = npTime
         nHourStart = metro_date.get_hour(npFT[0])
         npDiff = - npOT + nHourStart*3600
         npBad = numpy.where(npDiff > metro_constant.\
@@ -325,19 +330,19 @@ class Metro_preprocess_qa_qc_observation(Metro_preprocess):
                     sMessage = _("Indice: %d") % (nIndice)
                     metro_logger.print_message(metro_logger.LOGGER_MSG_DEBUG,
                                                sMessage)
-                    ro_controlled_data.del_matrix_row(npBadIndices)
+                npKeep[npBadIndices] = False
             
         # Get start time
         sStart_time = metro_config.get_value('INIT_ROADCAST_START_DATE')
         # If start time is not specified, default will be used
         if sStart_time == "":
+            ro_controlled_data.keep_rows(npKeep)
             return
 
         # Check if the observation are not before the start of the roadcast
         #  if specified.
         fStart_time = metro_date.parse_date_string(sStart_time)
-        npOT = ro_controlled_data.get_matrix_col('Time')\
-               +nHourStart*3600
+        npOT = npTime + nHourStart*3600
         npDiff = - npOT + int(metro_date.get_hour(fStart_time))*3600
         npBad = numpy.where(npDiff > metro_constant\
                                .nHourForExpirationOfObservation*3600, 1, 0)
@@ -359,7 +364,9 @@ class Metro_preprocess_qa_qc_observation(Metro_preprocess):
                                % (npDiff[nIndice])
                     metro_logger.print_message(metro_logger.LOGGER_MSG_DEBUG,\
                                                sMessage)
-                    ro_controlled_data.del_matrix_row(npBadIndices)
+                npKeep[npBadIndices] = False
+
+        ro_controlled_data.keep_rows(npKeep)
 
 
     def __validate(self, ro_controlled_data, observation_data):
@@ -411,27 +418,31 @@ class Metro_preprocess_qa_qc_observation(Metro_preprocess):
                     npSST[i] = fCurrent
 
         ro_controlled_data.set_matrix_col('SST', npSST)
-        observation_data.set_attribute('SST_VALID', numpy.ones(len(npSST)))
+        observation_data.set_attribute('SST_VALID',
+                                       numpy.ones(len(npSST), numpy.int8))
             
         # Check AT ###########################################
         npCheck = numpy.where(npAT > metro_constant.nAirTempHigh , 0, 1)
         npCheck = numpy.where(npAT < metro_constant.nAirTempMin , 0, npCheck)
         if len(npCheck) > 0:
-            observation_data.set_attribute('AT_VALID', npCheck)
+            observation_data.set_attribute('AT_VALID',
+                                           npCheck.astype(numpy.int8))
             
         # Check TD ##########################################
         npCheck = numpy.where(npTD > metro_constant.nAirTempHigh, 0, 1)
         npCheck = numpy.where(npTD < metro_constant.nAirTempMin, 0, npCheck)
         npCheck = numpy.where(npTD > npAT , 0, npCheck)
         if len(npCheck) > 0:
-            observation_data.set_attribute('TD_VALID', npCheck)
+            observation_data.set_attribute('TD_VALID',
+                                           npCheck.astype(numpy.int8))
         
         # Check WS ###########################################
         npCheck = numpy.where(npWS > metro_constant.nMaxWindSpeed, 0, 1)
         npCheck = numpy.where(npWS < 0, 0, npCheck)
 
         if len(npCheck) > 0:
-            observation_data.set_attribute('WS_VALID', npCheck)
+            observation_data.set_attribute('WS_VALID',
+                                           npCheck.astype(numpy.int8))
 
 
     def __set_coupling_instruction(self, ro_controlled_data, \
@@ -0,0 +1,141 @@
+#
+# METRo : Model of the Environment and Temperature of Roads
+# METRo is Free and is proudly provided by the Government of Canada
+# Copyright (C) Her Majesty The Queen in Right of Canada, Environment Canada, 2006
+
+#  Questions or bugs report: metro@ec.gc.ca
+#  METRo repository: https://framagit.org/metroprojects/metro
+#  Documentation: https://framagit.org/metroprojects/metro/wikis/home
+#
+#
+# Code contributed by:
+#  Miguel Tremblay - Canadian meteorological center
+#  Francois Fortin - Canadian meteorological center
+#
+#  $LastChangedDate$
+#  $LastChangedRevision$
+#
+########################################################################
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#
+#
+
+"""
+Name:         metro_preprocess_trim_forecast
+Description:  Remove the forecast after the end of the roadcast.
+               The roadcast end date is given by the option
+               '--roadcast-end-date' or by '--roadcast-max-horizon', in
+               hours after the roadcast start date (or the last observation
+               if no start date is given).  The forecast is cut at the first
+               hour after this date so METRo core does not integrate past
+               what is written in the roadcast.
+"""
+
+import numpy
+
+from metro_preprocess import Metro_preprocess
+
+import metro_logger
+import metro_config
+from toolbox import metro_date
+from toolbox import metro_util
+
+_ = metro_util.init_translation('metro_preprocess_trim_forecast')
+
+class Metro_preprocess_trim_forecast(Metro_preprocess):
+
+    def start(self):
+        Metro_preprocess.start(self)
+
+        fEnd_date = self.__get_roadcast_end_date()
+        if fEnd_date == None:
+            return
+
+        pForecast = self.get_infdata_reference('FORECAST')
+        forecast_data = pForecast.get_data_collection()
+
+        self.__trim_forecast(forecast_data, fEnd_date)
+
+        pForecast.set_data_collection(forecast_data)
+
+    def __get_roadcast_end_date(self):
+        """
+        Return the end date of the roadcast in seconds, None if the
+        roadcast goes up to the end of the forecast.  The date is kept in
+        INIT_ROADCAST_END_DATE for the subsampling of the roadcast.
+        """
+        sEnd_date = metro_config.get_value('INIT_ROADCAST_END_DATE')
+        fMax_horizon = metro_config.get_value('INIT_ROADCAST_MAX_HORIZON')
+
+        if sEnd_date != "":
+            fEnd_date = metro_date.parse_date_string(sEnd_date)
+        else:
+            fEnd_date = None
+
+        if fMax_horizon > 0:
+            sStart_date = metro_config.get_value('INIT_ROADCAST_START_DATE')
+            if sStart_date == "":
+                sStart_date = metro_config.get_value(\
+                    'DATA_ATTRIBUTE_LAST_OBSERVATION')
+            fHorizon_end = metro_date.parse_date_string(sStart_date) + \
+                           fMax_horizon*3600
+            if fEnd_date == None or fHorizon_end < fEnd_date:
+                fEnd_date = fHorizon_end
+
+        if fEnd_date == None:
+            return None
+
+        sLast_observation = \
+            metro_config.get_value('DATA_ATTRIBUTE_LAST_OBSERVATION')
+        if fEnd_date <= metro_date.parse_date_string(sLast_observation):
+            sMessage = _("The roadcast end date '%s' must be after the ") \
+                       % (metro_date.seconds2iso8601(fEnd_date)) + \
+                       _("last observation '%s'.") % (sLast_observation)
+            metro_logger.print_message(metro_logger.LOGGER_MSG_STOP,
+                                       sMessage)
+
+        sEnd_date = metro_date.seconds2iso8601(fEnd_date)
+        metro_config.set_value('INIT_ROADCAST_END_DATE', sEnd_date)
+        sMessage = _("Roadcast end date set to: '%s'") % (sEnd_date)
+        metro_logger.print_message(metro_logger.LOGGER_MSG_INFORMATIVE,
+                                   sMessage)
+
+        return fEnd_date
+
+    def __trim_forecast(self, forecast_data, fEnd_date):
+        """
+        Keep the forecast up to the first hour at or after fEnd_date, and
+        at least two forecasts.  The original data are trimmed too since
+        the interpolation is done on them.
+        """
+        wf_controlled_data = forecast_data.get_controlled_data()
+        npFT = wf_controlled_data.get_matrix_col('FORECAST_TIME')
+
+        nKeep = max(numpy.searchsorted(npFT, fEnd_date) + 1, 2)
+        if nKeep >= len(npFT):
+            return
+
+        sMessage = _("Forecast trimmed to the roadcast end date, ") + \
+                   _("%d of %d hours kept.") % (nKeep, len(npFT))
+        metro_logger.print_message(metro_logger.LOGGER_MSG_INFORMATIVE,
+                                   sMessage)
+
+        wf_controlled_data.set_matrix(wf_controlled_data.get_matrix()[:nKeep])
+
+        wf_original_data = forecast_data.get_original_data()
+        wf_original_data.set_readonly(False)
+        wf_original_data.set_matrix(wf_original_data.get_matrix()[:nKeep])
+        wf_original_data.set_readonly(True)
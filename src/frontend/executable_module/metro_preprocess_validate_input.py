@@ -53,9 +53,7 @@ import metro_logger
 import metro_config
 from toolbox import metro_date
 from toolbox import metro_util
-from toolbox import metro_constant
 
-import numpy
 
 _ = metro_util.init_translation('metro_config')
 
@@ -69,8 +67,6 @@ class Metro_preprocess_validate_input(Metro_preprocess):
         pObservation = self.get_infdata_reference('OBSERVATION')
         observation_data = pObservation.get_data_collection()
 
-        self.__validate_observation_length(observation_data.\
-                                            get_controlled_data())
         self.__validate_forecast_length(forecast_data.get_controlled_data())
         self.__validate_optional_args_forecast(forecast_data.\
                                                get_controlled_data())
@@ -90,7 +86,7 @@ class Metro_preprocess_validate_input(Metro_preprocess):
 
         # Check for solar-flux
         if metro_config.get_value('SF') and  \
-           'SF' not in forecast_data.lMatrix_col_name:
+           'SF' not in forecast_data.dMatrix_col_index:
             sInputAtmosphericForecast = metro_config.\
                                         get_value('FILE_FORECAST_IN_FILENAME')
             sMessage = _("The option '--use-solarflux-forecast' was used\n") +\
@@ -101,7 +97,7 @@ class Metro_preprocess_validate_input(Metro_preprocess):
                 metro_logger.LOGGER_MSG_STOP, sMessage)
         # Check for infra-red
         if metro_config.get_value('IR') and  \
-           'IR' not in forecast_data.lMatrix_col_name:
+           'IR' not in forecast_data.dMatrix_col_index:
             sInputAtmosphericForecast = metro_config.\
                                         get_value('FILE_FORECAST_IN_FILENAME')
             sMessage = _("The option '--use-infrared-forecast' was used\n") +\
@@ -145,53 +141,6 @@ class Metro_preprocess_validate_input(Metro_preprocess):
 
 
 
-    def __validate_observation_length(self, observation_data):
-        """
-        Parameters: controlled observation data
-        
-        Description: Check if the observation is not too long.
-        If so, truncate the beginning of the observation.
-        This limitation is due to an array size hardcoded in the fortran code. 
-        """
-
-        # Check the length of observation
-        npOT = observation_data.get_matrix_col('OBSERVATION_TIME')
-        fLast_observation_date = npOT[len(npOT)-1]
-        fFirst_observation_date  = npOT[0]
-
-        fLenght_observation_seconds = fLast_observation_date -\
-                                      fFirst_observation_date
-        nNbr_30_seconds_step_in_obs = fLenght_observation_seconds/30
-
-        # Check if the length of observation is too high for the fortran code
-        if nNbr_30_seconds_step_in_obs > metro_constant.nNL:
-            nStepsToRemove = nNbr_30_seconds_step_in_obs -  metro_constant.nNL
-
-            # Format the strings for warning message
-            nNumberSecondsToRemove = nStepsToRemove*30
-            fNumberHourToRemove = nNumberSecondsToRemove/3600.0
-            fNewStartTime = fFirst_observation_date + nNumberSecondsToRemove
-            sNewStartTime = metro_date.seconds2iso8601(fNewStartTime)
-            # Retrieve the first time in observation that is after this date
-            #  numpy trick. Put 0 where the time is under fNewStartTime
-            npNumberOfItemToRemove = numpy.where(npOT <fNewStartTime, 1, 0)
-            #  Get the indice of the last indice that is not zero
-            tNonZero = numpy.nonzero(npNumberOfItemToRemove)
-            nRemoveUntilIndice = tNonZero[0][-1]+1
-            
-            sOldStartTime = metro_date.seconds2iso8601(fFirst_observation_date)
-            sMessage = _("Too many observation. Removing the %s seconds ") % \
-                       (nNumberSecondsToRemove) + \
-                       _("i.e. %s hour(s)\n")   % (fNumberHourToRemove) + \
-                       _("Old start time is %s\n") % (sOldStartTime) + \
-                       _("New start time is %s") % (sNewStartTime)
-            metro_logger.print_message(
-                metro_logger.LOGGER_MSG_WARNING, sMessage)
-
-            # Warning is done, remove the data
-            observation_data.del_matrix_row(range(nRemoveUntilIndice))
-
-
     def __validate_last_observation_date(self, observation_data):
         """
         Description: Set the date of the last observation.
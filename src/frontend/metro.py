@@ -40,6 +40,12 @@ import sys
 import os
 import string
 import codecs
+import copy
+import time
+import getopt
+import threading
+import multiprocessing
+from multiprocessing.pool import ThreadPool
 
 # Set encoding to latin-1.  Must reload the sys module because the
 #  setdefaultencoding is deleted after the initialization of python.
@@ -86,14 +92,151 @@ import metro_config
 from toolbox import metro_date
 from toolbox import metro_xml
 from toolbox import metro_util
+from toolbox import metro_config_validation
+from data_module import metro_infdata
+from data_module import metro_infdata_container
+from metro_module import Metro_module
+import metro_error
 
 _ = metro_util.init_translation('metro')
 
-def metro_execute_module(lObject_execution_sequence):
+# METRo used as a library is initialized by the first run of
+#  run_roadcast.
+lockLibrary_init = threading.Lock()
+bLibrary_initialised = False
+
+# Command line options a job of the resident mode can give, the other
+#  ones (files, logger, ...) are those of the server.
+lSERVE_JOB_OPTIONS = ["roadcast-start-date=", "roadcast-end-date=",
+                      "roadcast-max-horizon=",
+                      "use-solarflux-forecast", "use-infrared-forecast",
+                      "use-anthropogenic-flux", "use-sst-sensor-depth",
+                      "output-subsurface-levels"]
+
+# Permissions of the Unix socket of the resident mode, owner only
+iSERVE_SOCKET_MODE = 0600
+
+# Modules of the input stage, their name ends with the input they
+#  work on, e.g. metro_validate_forecast.  The modules of an input do
+#  not depend on those of the other inputs.
+lINPUT_STAGE_PREFIXES = ['metro_read_', 'metro_validate_',
+                         'metro_string2dom_']
+
+# Execution sequences of run_roadcast not in use, by module names
+dRoadcast_sequences = {}
+lockRoadcast_sequences = threading.Lock()
+
+# Execution sequence of a worker process of a batch run
+lBatch_sequence = None
+
+class Metro_input_stage(Metro_module):
+    """
+    Input stage of the execution sequence, executed as one module.  The
+    branches, the module sequences of each input, are executed by a
+    pool of threads, the stage is done when all of them are.
+    """
+
+    def __init__(self, lBranches, iNb_threads):
+        Metro_module.__init__(self)
+        self.lBranches = lBranches
+        self.iNb_threads = iNb_threads
+
+    def start(self):
+        sMessage = _("Input stage: %d branches in %d threads") % \
+                   (len(self.lBranches), self.iNb_threads)
+        metro_logger.print_message(metro_logger.LOGGER_MSG_EXECPRIMARY,
+                                   sMessage)
+        pool = ThreadPool(self.iNb_threads)
+        try:
+            pool.map(self.__execute_branch, self.lBranches)
+        finally:
+            pool.close()
+            pool.join()
+
+    def stop(self):
+        pass
+
+    def get_receive_type(self):
+        return self.lBranches[0][0].get_receive_type()
+
+    def get_send_type(self):
+        return self.lBranches[-1][-1].get_send_type()
+
+    def __execute_branch(self, lBranch):
+        metro_execute_module(lBranch, self.infdata_container)
+
+
+def metro_group_input_stage(lObject_execution_sequence):
+    """
+    Group the modules at the beginning of the execution sequence that
+    are in lINPUT_STAGE_PREFIXES by input.  If there is more than one
+    input, these modules are replaced by a Metro_input_stage.
+    """
+
+    lBranches = []
+    dBranches = {}
+    iInput_stage_end = 0
+    for object in lObject_execution_sequence:
+        lPrefix = [sPrefix for sPrefix in lINPUT_STAGE_PREFIXES
+                   if object.__module__.startswith(sPrefix)]
+        if lPrefix == []:
+            break
+        sInput = object.__module__[len(lPrefix[0]):]
+        if sInput not in dBranches:
+            dBranches[sInput] = []
+            lBranches.append(dBranches[sInput])
+        dBranches[sInput].append(object)
+        iInput_stage_end = iInput_stage_end + 1
+
+    iNb_threads = metro_config.get_value('INIT_INPUT_THREADS')
+    if iNb_threads == 0:
+        iNb_threads = len(lBranches)
+    iNb_threads = min(len(lBranches), iNb_threads)
+    if iNb_threads < 2:
+        return lObject_execution_sequence
+
+    return [Metro_input_stage(lBranches, iNb_threads)] + \
+           lObject_execution_sequence[iInput_stage_end:]
+
+def metro_execute_module(lObject_execution_sequence, infdata_container=None):
     """
     Load the module sequence for METRo execution.
+
+    The data of the run are kept in infdata_container, a new container
+    if none is given, so several runs can be done in the same process.
+    If the container has a configuration, it is the one used by the
+    modules, see metro_config.set_run_config.  Return the container.
     """
-    
+
+    if infdata_container == None:
+        infdata_container = metro_infdata_container.Metro_infdata_container()
+
+    dRun_config = infdata_container.get_config()
+    if dRun_config == None:
+        metro_execute_sequence(lObject_execution_sequence, infdata_container)
+    else:
+        dThread_config = metro_config.get_run_config()
+        metro_config.set_run_config(dRun_config)
+        try:
+            metro_execute_sequence(lObject_execution_sequence,
+                                   infdata_container)
+        finally:
+            metro_config.set_run_config(dThread_config)
+
+    return infdata_container
+
+def metro_execute_sequence(lObject_execution_sequence, infdata_container):
+    """
+    Execute the modules one after the other, each one sending its
+    results to the next.  The inputs are read at the same time, see
+    metro_group_input_stage.
+    """
+
+    lObject_execution_sequence = \
+        metro_group_input_stage(lObject_execution_sequence)
+    if lObject_execution_sequence != []:
+        lObject_execution_sequence[0].receive_data(infdata_container)
+
     i = 0
     iLen_object_execution_sequence = len(lObject_execution_sequence)
     while i < iLen_object_execution_sequence:
@@ -124,29 +267,38 @@ def metro_execute_module(lObject_execution_sequence):
         i = i + 1
 
 
-def metro_get_execution_sequence():
+def metro_create_module_sequence(lModule_names):
     """
-    Fetch the METRo execution sequence.
+    Create an object for each module of lModule_names.
     """
 
-    metro_logger.print_init_message(metro_logger.LOGGER_INIT_MESSAGE,
-                                    _("Construct METRo execution sequence:"))
-    
-    lModule_execution_sequence = metro_config.get_value\
-                                 ("INIT_MODULE_EXECUTION_SEQUENCE")
-
     lObject_sequence = []
 
     # Creation of an object for each module and add everything
     #  in a list
-    for sModule_name in lModule_execution_sequence:
+    for sModule_name in lModule_names:
         module = __import__(sModule_name)
         sClass_name = string.capitalize(sModule_name)
         #print sClass_name
         exec "tmp_object =  module." + sClass_name + "()"
         lObject_sequence.append(tmp_object)
 
+    return lObject_sequence
+
+
+def metro_get_execution_sequence():
+    """
+    Fetch the METRo execution sequence.
+    """
+
+    metro_logger.print_init_message(metro_logger.LOGGER_INIT_MESSAGE,
+                                    _("Construct METRo execution sequence:"))
     
+    lModule_execution_sequence = metro_config.get_value\
+                                 ("INIT_MODULE_EXECUTION_SEQUENCE")
+
+    lObject_sequence = metro_create_module_sequence(lModule_execution_sequence)
+
     metro_logger.print_init_message(metro_logger.LOGGER_INIT_SUCCESS,
                                     _("METRo execution sequence ready"))
     return lObject_sequence
@@ -194,18 +346,673 @@ def metro_init():
 
 
 def metro_start(lObject_execution_sequence):
-    metro_execute_module(lObject_execution_sequence)
+    if metro_config.get_value('INIT_SERVE_ADDRESS') != "":
+        metro_serve()
+    elif metro_config.get_value('FILE_BATCH_MANIFEST_FILENAME') != "":
+        metro_execute_batch()
+    elif metro_config.get_value('FILE_FORECAST_ENSEMBLE_FILENAMES') != []:
+        metro_execute_ensemble(lObject_execution_sequence)
+    else:
+        metro_execute_module(lObject_execution_sequence)
+
+def metro_execute_ensemble(lObject_execution_sequence):
+    """
+    Compute the roadcast of each member of an ensemble forecast.
+
+    The first member goes through the execution sequence up to
+    METRo core.  The station and the observation it has processed are
+    shared by the other members, only their forecast goes through
+    INIT_ENSEMBLE_MEMBER_SEQUENCE, in a pool of threads.  The members
+    are then computed together by METRo core and a roadcast is written
+    for each member and for each percentile of INIT_ENSEMBLE_PERCENTILES.
+    """
+    sForecast_filename = metro_config.get_value('FILE_FORECAST_IN_FILENAME')
+    sRoadcast_filename = metro_config.get_value('FILE_ROADCAST_FILENAME')
+    try:
+        metro_execute_ensemble_members(lObject_execution_sequence)
+    finally:
+        metro_config.set_value('FILE_FORECAST_IN_FILENAME',
+                               sForecast_filename)
+        metro_config.set_value('FILE_ROADCAST_FILENAME', sRoadcast_filename)
+
+def metro_execute_ensemble_members(lObject_execution_sequence):
+    """
+    Body of metro_execute_ensemble, the forecast and roadcast filenames
+    of the configuration are restored by the caller.
+    """
+    lFilenames = metro_config.get_value('FILE_FORECAST_ENSEMBLE_FILENAMES')
+    lModule_names = [object.__module__ for object in lObject_execution_sequence]
+    iModel = lModule_names.index('metro_model')
+
+    # First member, shared data are processed here
+    metro_config.set_value('FILE_FORECAST_IN_FILENAME', lFilenames[0])
+    shared_container = \
+        metro_execute_module(lObject_execution_sequence[:iModel])
+    lShared_infdata = [shared_container.get_infdata_reference(sName)
+                       for sName in ['OBSERVATION', 'OBSERVATION_REF',
+                                     'STATION', 'HORIZON']
+                       if shared_container.infdata_exist(sName)]
+
+    def new_container():
+        container = metro_infdata_container.Metro_infdata_container()
+        for infdata in lShared_infdata:
+            container.add_infdata(infdata)
+        return container
+
+    # Other members, only their forecast is processed.  Each one has
+    #  its own sequence and configuration, the shared data are only read.
+    lMembers = []
+    for sFilename in lFilenames[1:]:
+        dMember_config = copy.deepcopy(metro_config.get_config())
+        dMember_config['FILE_FORECAST_IN_FILENAME']['VALUE'] = sFilename
+        member_container = new_container()
+        member_container.set_config(dMember_config)
+        lMember_sequence = metro_create_module_sequence(
+            metro_config.get_value('INIT_ENSEMBLE_MEMBER_SEQUENCE'))
+        lMembers.append((lMember_sequence, member_container))
+
+    def execute_member(tMember):
+        (lMember_sequence, member_container) = tMember
+        metro_execute_module(lMember_sequence, member_container)
+
+    if lMembers != []:
+        iNb_threads = min(len(lMembers), multiprocessing.cpu_count())
+        pool = ThreadPool(iNb_threads)
+        try:
+            pool.map(execute_member, lMembers)
+        finally:
+            pool.close()
+            pool.join()
+
+    lForecast = [container.get_infdata_reference('FORECAST').\
+                 get_data_collection() for container in
+                 [shared_container] + [tMember[1] for tMember in lMembers]]
+
+    # Checked before METRo core, which computes every member up to the
+    #  longest one
+    lNb_timesteps = [len(forecast.get_interpolated_data().\
+                         get_matrix_col_view('Time'))
+                     for forecast in lForecast]
+    if min(lNb_timesteps) != max(lNb_timesteps):
+        sMessage = _("The forecasts of an ensemble must cover the same ") +\
+                   _("period.")
+        metro_logger.print_message(metro_logger.LOGGER_MSG_STOP, sMessage)
+
+    if metro_config.get_value('T_BYPASS_CORE') == True:
+        metro_logger.print_message(
+            metro_logger.LOGGER_MSG_INFORMATIVE,
+            _("Bypassing METRo core, roadcast not created."))
+        return
+
+    observation = shared_container.get_infdata_reference('OBSERVATION').\
+                  get_data_collection()
+    station = shared_container.get_infdata_reference('STATION').get_data()
+
+    model = lObject_execution_sequence[iModel]
+    iNb_threads = min(len(lForecast), multiprocessing.cpu_count())
+    lRoadcast = model.compute_roadcast_batch(
+        [(forecast, observation, station) for forecast in lForecast],
+        iNb_threads)
+
+    for i in range(0, len(lRoadcast)):
+        if lRoadcast[i] == None:
+            sMessage = _("METRo core failed for the ensemble member '%s'.") \
+                       % (lFilenames[i])
+            metro_logger.print_message(metro_logger.LOGGER_MSG_STOP,
+                                       sMessage)
+
+    # Output of each member and of the percentiles
+    (sRoot, sExtension) = os.path.splitext(
+        metro_config.get_value('FILE_ROADCAST_FILENAME'))
+
+    lOutput = []
+    for i in range(0, len(lRoadcast)):
+        lOutput.append(("%s_m%02d%s" % (sRoot, i, sExtension),
+                        lRoadcast[i]))
+    for fPercentile in metro_config.get_value('INIT_ENSEMBLE_PERCENTILES'):
+        lOutput.append(("%s_p%g%s" % (sRoot, fPercentile, sExtension),
+                        model.compute_percentile_roadcast(lRoadcast,
+                                                          fPercentile)))
+
+    for (sFilename, roadcast) in lOutput:
+        metro_config.set_value('FILE_ROADCAST_FILENAME', sFilename)
+        output_container = new_container()
+        infdata_roadcast = metro_infdata.Metro_infdata(
+            'ROADCAST', metro_infdata.DATATYPE_METRO_DATA_COLLECTION)
+        infdata_roadcast.set_data_collection(roadcast)
+        output_container.add_infdata(infdata_roadcast)
+
+        lOutput_sequence = metro_create_module_sequence(
+            lModule_names[iModel+1:])
+        metro_execute_module(lOutput_sequence, output_container)
+
+def metro_read_batch_manifest(sFilename):
+    """
+    Read the manifest of a batch run.  Each line gives the forecast,
+    observation, station and roadcast filenames of a station, empty
+    lines and lines beginning with '#' are ignored.  Return the list of
+    the (forecast, observation, station, roadcast) tuples.
+    """
+    try:
+        lLines = open(sFilename).readlines()
+    except IOError:
+        sMessage = _("Can't open the batch manifest '%s'.") % (sFilename)
+        metro_logger.print_message(metro_logger.LOGGER_MSG_STOP, sMessage)
+
+    lStations = []
+    for i in range(0, len(lLines)):
+        lFilenames = lLines[i].split()
+        if lFilenames == [] or lFilenames[0].startswith('#'):
+            continue
+        if len(lFilenames) != 4:
+            sMessage = _("Line %d of the batch manifest '%s' must give ") \
+                       % (i+1, sFilename) + \
+                       _("the forecast, observation,\nstation and ") + \
+                       _("roadcast filenames.")
+            metro_logger.print_message(metro_logger.LOGGER_MSG_STOP, sMessage)
+        lStations.append(tuple(lFilenames))
+
+    return lStations
+
+def metro_batch_init_worker():
+    """
+    Initialization of a worker process of a batch run.  The worker
+    has its own log file and creates the execution sequence once, for
+    all its stations.
+    """
+    global lBatch_sequence
+
+    (sRoot, sExtension) = os.path.splitext(
+        metro_config.get_value('FILE_LOGGER_FILENAME'))
+    metro_config.set_value('FILE_LOGGER_FILENAME',
+                           "%s_%d%s" % (sRoot, os.getpid(), sExtension))
+    metro_logger.init()
+
+    lBatch_sequence = metro_get_execution_sequence()
+
+def metro_batch_run_station(tStation):
+    """
+    Compute the roadcast of a station of a batch run in a worker
+    process.  Return the station, whether the roadcast was written and
+    the computation time.
+    """
+    (sForecast, sObservation, sStation, sRoadcast) = tStation
+
+    # The modules set configuration values for their station, e.g.
+    #  INIT_ROADCAST_START_DATE, the next station must not see them.
+    dSaved_config = copy.deepcopy(metro_config.dConfig)
+
+    metro_config.set_value('FILE_FORECAST_IN_FILENAME', sForecast)
+    metro_config.set_value('FILE_OBSERVATION_FILENAME', sObservation)
+    metro_config.set_value('FILE_STATION_FILENAME', sStation)
+    metro_config.set_value('FILE_ROADCAST_FILENAME', sRoadcast)
+
+    sMessage = _("Batch station '%s'") % (sStation)
+    metro_logger.print_message(metro_logger.LOGGER_MSG_EXECPRIMARY, sMessage)
+
+    fStart = time.time()
+    # A station in error must not stop the worker
+    try:
+        try:
+            metro_execute_module(lBatch_sequence)
+            bSuccess = True
+        except metro_error.Metro_stop_error:
+            bSuccess = False
+        except Exception, inst:
+            sMessage = _("Unexpected error: %s") % (inst)
+            metro_logger.print_message(metro_logger.LOGGER_MSG_CRITICAL,
+                                       sMessage)
+            bSuccess = False
+    finally:
+        metro_config.dConfig.clear()
+        metro_config.dConfig.update(dSaved_config)
+    metro_logger.flush()
+
+    return (tStation, bSuccess, time.time() - fStart)
+
+def metro_batch_run_stations(lChunk):
+    """
+    Compute the stations of a chunk of a batch run in a worker process,
+    see metro_batch_run_station.
+    """
+    return [metro_batch_run_station(tStation) for tStation in lChunk]
+
+def metro_execute_batch():
+    """
+    Compute the roadcasts of the stations of the batch manifest with a
+    pool of worker processes.  The status and the computation time of
+    each station are reported as they are done.  The stations of a
+    chunk without result after INIT_BATCH_TIMEOUT seconds per station,
+    its worker died or is stuck, are reported as failed.
+    """
+    sManifest = metro_config.get_value('FILE_BATCH_MANIFEST_FILENAME')
+    lStations = metro_read_batch_manifest(sManifest)
+    if lStations == []:
+        sMessage = _("No station in the batch manifest '%s'.") % (sManifest)
+        metro_logger.print_message(metro_logger.LOGGER_MSG_WARNING, sMessage)
+        return
+
+    iNb_workers = metro_config.get_value('INIT_BATCH_WORKERS')
+    if iNb_workers == 0:
+        iNb_workers = multiprocessing.cpu_count()
+    iNb_workers = min(iNb_workers, len(lStations))
+    iChunksize = metro_config.get_value('INIT_BATCH_CHUNKSIZE')
+    iTimeout = metro_config.get_value('INIT_BATCH_TIMEOUT')
+
+    # The workers are forked, what is still buffered would be written
+    #  by each of them.
+    metro_logger.flush()
+    sys.stdout.flush()
+
+    fStart = time.time()
+    pool = multiprocessing.Pool(iNb_workers, metro_batch_init_worker)
+    iNb_failed = 0
+    # The pool waits forever for the chunk of a dead worker, it is then
+    #  terminated instead of closed.  So it is on an error or Ctrl-C.
+    bTerminate = True
+    try:
+        lChunks = [lStations[i:i+iChunksize]
+                   for i in range(0, len(lStations), iChunksize)]
+        lResults = [pool.apply_async(metro_batch_run_stations, (lChunk,))
+                    for lChunk in lChunks]
+        bLost_chunk = False
+        for i in range(0, len(lChunks)):
+            # A chunk is started once the previous ones are done, at
+            #  the latest
+            if iTimeout == 0:
+                fTimeout = None
+            else:
+                fTimeout = iTimeout*len(lChunks[i])
+            try:
+                lDone = lResults[i].get(fTimeout)
+            except multiprocessing.TimeoutError:
+                bLost_chunk = True
+                lDone = [(tStation, None, fTimeout)
+                         for tStation in lChunks[i]]
+
+            for (tStation, bSuccess, fElapsed) in lDone:
+                if bSuccess:
+                    sMessage = _("Batch station '%s' done in %.2f s, ") \
+                               % (tStation[2], fElapsed) + \
+                               _("roadcast '%s'") % (tStation[3])
+                    metro_logger.print_message(
+                        metro_logger.LOGGER_MSG_EXECPRIMARY, sMessage)
+                    continue
+
+                iNb_failed = iNb_failed + 1
+                if bSuccess == None:
+                    sMessage = _("Batch station '%s' has no result after ") \
+                               % (tStation[2]) + \
+                               _("%d s, its worker died or is stuck") \
+                               % (fElapsed)
+                else:
+                    sMessage = _("Batch station '%s' failed after %.2f s, ") \
+                               % (tStation[2], fElapsed) + \
+                               _("see the log files of the workers")
+                metro_logger.print_message(metro_logger.LOGGER_MSG_CRITICAL,
+                                           sMessage)
+        bTerminate = bLost_chunk
+    finally:
+        if bTerminate:
+            pool.terminate()
+        else:
+            pool.close()
+        pool.join()
+
+    sMessage = _("Batch of %d stations done in %.2f s by %d workers, ") \
+               % (len(lStations), time.time() - fStart, iNb_workers) + \
+               _("%d failed.") % (iNb_failed)
+    metro_logger.print_message(metro_logger.LOGGER_MSG_EXECPRIMARY, sMessage)
 
 def metro_stop():
     metro_xml.stop()
     metro_logger.stop()
 
 
-def main():
+def metro_init_library():
+    """
+    Initialization of METRo used as a library, see run_roadcast.
+    The command line and the configuration file are not read.
+    """
+    global bLibrary_initialised
+
+    metro_config.init()
+    metro_xml.init()
+    metro_config.validating_configuration()
+    metro_logger.init()
+    bLibrary_initialised = True
+
+def metro_get_roadcast_sequence(dInput, bXml_output=False):
+    """
+    Return the module sequence of run_roadcast.  The input documents
+    of dInput are already in memory, the read modules are not needed
+    and neither are the validation and the parsing of the documents
+    given as DOM.  The sequence ends with the roadcast in a
+    Metro_data_collection_output, or in a DOM if bXml_output is True.
+    The roadcast is not written.
+
+    The modules keep the data of the run they execute, a sequence is
+    used by one run at a time.  Return the module names and a sequence
+    not in use, created if needed, to give back with
+    metro_release_roadcast_sequence.
+    """
+    lSkipped_modules = ['metro_write_roadcast']
+    if not bXml_output:
+        lSkipped_modules.append('metro_metro2dom')
+    for (sName, input) in dInput.items():
+        if input is None or not isinstance(input, basestring):
+            sSuffix = string.lower(sName)
+            lSkipped_modules.extend(['metro_validate_' + sSuffix,
+                                     'metro_string2dom_' + sSuffix])
+
+    tModule_names = tuple([sModule_name for sModule_name in
+                     metro_config.get_value('INIT_MODULE_EXECUTION_SEQUENCE')
+                     if not sModule_name.startswith('metro_read_')
+                     and sModule_name not in lSkipped_modules])
+
+    lObject_sequence = None
+    lockRoadcast_sequences.acquire()
+    try:
+        lFree_sequences = dRoadcast_sequences.setdefault(tModule_names, [])
+        if lFree_sequences != []:
+            lObject_sequence = lFree_sequences.pop()
+    finally:
+        lockRoadcast_sequences.release()
+
+    if lObject_sequence == None:
+        lObject_sequence = metro_create_module_sequence(tModule_names)
+    return (tModule_names, lObject_sequence)
+
+def metro_release_roadcast_sequence(tModule_names, lObject_sequence):
+    """
+    Give back a sequence of metro_get_roadcast_sequence once the run
+    is done.
+    """
+    lockRoadcast_sequences.acquire()
+    try:
+        dRoadcast_sequences[tModule_names].append(lObject_sequence)
+    finally:
+        lockRoadcast_sequences.release()
+
+def run_roadcast(forecast, observation, station, config=None,
+                 lOptions=None, observation_ref=None, bXml_output=False):
+    """
+    Compute the roadcast of a station in the current process, without
+    reading or writing any file.
+
+    forecast, observation, station and observation_ref are the XML
+    documents, as strings or already parsed by metro_xml.  A parsed
+    document is left to the caller, it can be given to several runs.
+    config is a dictionary of configuration values (e.g.
+    {'T_BYPASS_CORE': True}) and lOptions a list of command line
+    options (e.g. ['--use-solarflux-forecast']).  They only apply to this run: each
+    call works on its own copy of the configuration and the
+    configuration of METRo is not modified.  run_roadcast can be called
+    by several threads at the same time.  The logger settings are the
+    ones of the first run.
+
+    Return the roadcast (Metro_data_collection_output), or the roadcast
+    XML document as a string if bXml_output is True.  Return None if
+    METRo core is bypassed.  Raise metro_error.Metro_stop_error if
+    METRo stops.
+    """
+
+    dInput = {'FORECAST'        : forecast,
+              'OBSERVATION'     : observation,
+              'STATION'         : station,
+              'OBSERVATION_REF' : observation_ref}
+
+    # The lock is only held by the initialization of the first run
+    if not bLibrary_initialised:
+        lockLibrary_init.acquire()
+        try:
+            if not bLibrary_initialised:
+                metro_init_library()
+        finally:
+            lockLibrary_init.release()
+
+    dRun_config = copy.deepcopy(metro_config.dConfig)
+    dSaved_run_config = metro_config.get_run_config()
+    metro_config.set_run_config(dRun_config)
+    try:
+        return metro_run_roadcast(dInput, config, lOptions, bXml_output,
+                                  dRun_config)
+    except SystemExit:
+        # --help, --version, ... in lOptions
+        sMessage = _("Options not allowed for a roadcast run: %s") \
+                   % (lOptions)
+        raise metro_error.Metro_stop_error(sMessage, 2)
+    finally:
+        metro_config.set_run_config(dSaved_run_config)
+
+def metro_run_roadcast(dInput, config, lOptions, bXml_output, dRun_config):
+    """
+    Body of run_roadcast.  dRun_config is the configuration of the run,
+    already the one of the current thread.
+    """
+    dRun_conf = {}
+    if lOptions != None:
+        dRun_conf = metro_config.save_command_line_parameter(
+            lOptions, metro_config.CFG_SHORT_OPTIONS,
+            metro_config.CFG_LONG_OPTIONS)
+    if config != None:
+        dRun_conf.update(config)
+    if dRun_conf != {}:
+        metro_config.overlay_configuration(None, dRun_conf)
+        metro_config_validation.validate_config(dRun_config)
+
+    # The documents have no file name, the messages use these ones
+    metro_config.set_value('FILE_FORECAST_IN_FILENAME', '<forecast>')
+    metro_config.set_value('FILE_OBSERVATION_FILENAME', '<observation>')
+    metro_config.set_value('FILE_STATION_FILENAME', '<station>')
+    if dInput['OBSERVATION_REF'] is not None:
+        metro_config.set_value('FILE_OBSERVATION_REF_FILENAME',
+                               '<observation_ref>')
+    else:
+        metro_config.set_value('FILE_OBSERVATION_REF_FILENAME', '')
+
+    infdata_container = metro_infdata_container.Metro_infdata_container()
+    infdata_container.set_config(dRun_config)
+    for (sName, input) in dInput.items():
+        if input is None:
+            continue
+        if sName == 'STATION':
+            iData_type = metro_infdata.DATATYPE_METRO_DATA
+        else:
+            iData_type = metro_infdata.DATATYPE_METRO_DATA_COLLECTION
+        infdata = metro_infdata.Metro_infdata(sName, iData_type)
+        infdata.set_input_information(input)
+        # A document given already parsed is the one of the caller
+        infdata.set_input_borrowed(not isinstance(input, basestring))
+        infdata_container.add_infdata(infdata)
+    if dInput['STATION'] is not None and metro_config.get_value('SUNSHADOW'):
+        infdata_container.add_infdata(metro_infdata.Metro_infdata(
+            'HORIZON', metro_infdata.DATATYPE_METRO_DATA))
+
+    (tModule_names, lObject_sequence) = \
+        metro_get_roadcast_sequence(dInput, bXml_output)
+    try:
+        metro_execute_module(lObject_sequence, infdata_container)
+    finally:
+        metro_release_roadcast_sequence(tModule_names, lObject_sequence)
+        metro_free_input_doms(infdata_container)
+
+    if not infdata_container.infdata_exist('ROADCAST'):
+        return None
+    pRoadcast = infdata_container.get_infdata_reference('ROADCAST')
+    if not bXml_output:
+        return pRoadcast.get_data_collection()
+
+    domRoadcast = pRoadcast.get_output_information()
+    pRoadcast.set_output_information(None)
+    if domRoadcast == None:
+        return None
+    sRoadcast = metro_xml.dom_to_string(domRoadcast)
+    metro_xml.free_dom(domRoadcast)
+    return sRoadcast
+
+def metro_free_input_doms(infdata_container):
+    """
+    Free the documents parsed by a run of run_roadcast that are still
+    there, the run stopped before Metro_dom2metro freed them.
+    """
+    for sName in ['FORECAST', 'OBSERVATION', 'OBSERVATION_REF', 'STATION']:
+        if not infdata_container.infdata_exist(sName):
+            continue
+        pInfdata = infdata_container.get_infdata_reference(sName)
+        domInput = pInfdata.get_input_information()
+        if domInput != None and not isinstance(domInput, basestring) and \
+           not pInfdata.is_input_borrowed():
+            metro_xml.free_dom(domInput)
+        pInfdata.set_input_information(None)
+
+def metro_serve():
+    """
+    Resident mode.  METRo is initialized once and then computes the
+    roadcast of each job it receives, with run_roadcast.  A job is an
+    HTTP POST of a form with the fields 'forecast', 'observation',
+    'station' and, optionally, 'observation_ref' and 'option', one for
+    each command line option of the job.  Only the options of
+    lSERVE_JOB_OPTIONS are accepted.  The reply is the roadcast XML
+    document.  The server listens on the Unix socket, readable and
+    writable by its owner only, or the localhost port of
+    INIT_SERVE_ADDRESS.
+    """
+    import BaseHTTPServer
+    import SocketServer
+    import urlparse
+
+    global bLibrary_initialised
+
+    # The configuration of metro_init is the one of the jobs
+    bLibrary_initialised = True
+
+    def get_job_options(lOption_fields):
+        """
+        Return the command line options of a job, rebuilt from the ones
+        getopt found in its 'option' fields.  Raise getopt.GetoptError
+        for an option not in lSERVE_JOB_OPTIONS.
+        """
+        (lOpts, lArgs) = getopt.getopt(lOption_fields, '',
+                                       lSERVE_JOB_OPTIONS)
+        if lArgs != []:
+            raise getopt.GetoptError("not an option: %s" %
+                                     (string.join(lArgs, ' ')))
+        lOptions = []
+        for (o, a) in lOpts:
+            lOptions.append(o)
+            if o[2:] + '=' in lSERVE_JOB_OPTIONS:
+                lOptions.append(a)
+        return lOptions
+
+    class Roadcast_request_handler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+        def do_POST(self):
+            iLength = int(self.headers.getheader('Content-Length', 0))
+            dForm = urlparse.parse_qs(self.rfile.read(iLength))
+
+            lMissing = [sField for sField in
+                        ['forecast', 'observation', 'station']
+                        if sField not in dForm]
+            if lMissing != []:
+                self.send_text_error(400, "Missing field(s): %s" %
+                                     (string.join(lMissing, ', ')))
+                return
+
+            try:
+                lOptions = get_job_options(dForm.get('option', []))
+            except getopt.GetoptError, inst:
+                self.send_text_error(400, "Option not allowed, %s" % (inst))
+                return
+
+            fStart = time.time()
+            try:
+                sRoadcast = run_roadcast(
+                    dForm['forecast'][0], dForm['observation'][0],
+                    dForm['station'][0],
+                    lOptions=lOptions,
+                    observation_ref=dForm.get('observation_ref', [None])[0],
+                    bXml_output=True)
+            except Exception, inst:
+                sMessage = _("Roadcast job failed: %s") % (inst)
+                metro_logger.print_message(metro_logger.LOGGER_MSG_CRITICAL,
+                                           sMessage)
+                self.send_text_error(500, str(inst).strip())
+                return
+
+            sMessage = _("Roadcast job done in %.2f s") % \
+                       (time.time() - fStart)
+            metro_logger.print_message(metro_logger.LOGGER_MSG_EXECPRIMARY,
+                                       sMessage)
+            if sRoadcast == None:
+                self.send_response(204)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/xml; charset=UTF-8')
+            self.send_header('Content-Length', str(len(sRoadcast)))
+            self.end_headers()
+            self.wfile.write(sRoadcast)
+
+        def send_text_error(self, iCode, sMessage):
+            """
+            Reply with the error code and sMessage in a text/plain body.
+            The messages of METRo have several lines, they can not be
+            the reason of the status line like with send_error.
+            """
+            sBody = sMessage + '\n'
+            if isinstance(sBody, unicode):
+                sBody = sBody.encode('ISO-8859-1', 'replace')
+            self.send_response(iCode)
+            self.send_header('Content-Type', 'text/plain; charset=ISO-8859-1')
+            self.send_header('Content-Length', str(len(sBody)))
+            self.end_headers()
+            self.wfile.write(sBody)
+
+        def log_message(self, sFormat, *args):
+            metro_logger.print_message(metro_logger.LOGGER_MSG_EXECSECONDARY,
+                                       sFormat % args)
+
+    sAddress = metro_config.get_value('INIT_SERVE_ADDRESS')
+    if sAddress.isdigit():
+        server = BaseHTTPServer.HTTPServer(('localhost', int(sAddress)),
+                                           Roadcast_request_handler)
+        sMessage = _("Waiting for roadcast jobs on http://localhost:%s/") \
+                   % (sAddress)
+    else:
+        if os.path.exists(sAddress):
+            os.remove(sAddress)
+        # The socket is created without the permissions of the others
+        iUmask = os.umask(0777 & ~iSERVE_SOCKET_MODE)
+        try:
+            server = SocketServer.UnixStreamServer(sAddress,
+                                                   Roadcast_request_handler)
+        finally:
+            os.umask(iUmask)
+        os.chmod(sAddress, iSERVE_SOCKET_MODE)
+        sMessage = _("Waiting for roadcast jobs on the socket '%s'") \
+                   % (sAddress)
+    metro_logger.print_message(metro_logger.LOGGER_MSG_EXECPRIMARY, sMessage)
+
+    try:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    finally:
+        server.server_close()
+        if not sAddress.isdigit():
+            os.remove(sAddress)
+
 
-    lExec_sequence = metro_init()
+def main():
 
-    metro_start(lExec_sequence)
+    # The error has been reported, only the exit status is left
+    try:
+        lExec_sequence = metro_init()
+        metro_start(lExec_sequence)
+    except metro_error.Metro_stop_error, inst:
+        sys.exit(inst.iExit_code)
 
     metro_stop()
 
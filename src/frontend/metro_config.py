@@ -49,8 +49,10 @@ Description: Module that centralize all the metro configuration.
 import os
 import sys
 import getopt
+import threading
 
 import metro_logger
+import metro_error
 from toolbox import metro_config_validation
 from toolbox import metro_xml
 from toolbox import metro_xml_dtd
@@ -87,25 +89,54 @@ CFG_SHORT_OPTIONS = "ho:v:c:l:"
 CFG_LONG_OPTIONS  = ["help","version",
                      "input-observation-ref=",
                      "input-forecast=", "input-observation=",
-                     "input-station=", 
+                     "input-station=", "input-threads=",
                      "output-roadcast=",
                      "bypass-core",
                      "generate-dtd-catalog",
                      "config=","generate-config=","log-file=","verbose-level=",
                      "selftest", "silent", "roadcast-start-date=", "lang=",
+                     "roadcast-end-date=", "roadcast-max-horizon=",
                      "use-solarflux-forecast", "use-infrared-forecast",
                      "use-anthropogenic-flux",
                      "use-sst-sensor-depth",
                      "enable-sunshadow",
                      "sunshadow-method=",
                      "output-subsurface-levels",
-                     "fix-deep-soil-temperature="
+                     "fix-deep-soil-temperature=",
+                     "warm-start-state=",
+                     "input-forecast-ensemble=", "ensemble-percentiles=",
+                     "compact-storage",
+                     "batch=", "batch-workers=", "batch-chunksize=",
+                     "batch-timeout=",
+                     "serve="
                      ]
 
 
 
 dConfig = {}
 
+# Configuration of the run done by the current thread, see set_run_config
+threadRun = threading.local()
+
+def set_run_config( dRun_config ):
+    """
+    Use dRun_config instead of dConfig in the current thread, e.g. for
+    a run of run_roadcast.  None goes back to dConfig.
+    """
+    threadRun.dConfig = dRun_config
+
+def get_run_config( ):
+    return getattr(threadRun, 'dConfig', None)
+
+def get_config( ):
+    """
+    Return the configuration in use in the current thread.
+    """
+    dRun_config = get_run_config()
+    if dRun_config == None:
+        return dConfig
+    return dRun_config
+
 def read_config_file( sFilename ):
 
     try:
@@ -120,7 +151,7 @@ def read_config_file( sFilename ):
         metro_logger.print_init_message(metro_logger.LOGGER_INIT_ERROR,
                                         sIOError)
 
-        sys.exit(2)        
+        raise metro_error.Metro_stop_error(sIOError, 2)
     else:
                 
         plreader = plist_reader.Plist_reader()
@@ -136,7 +167,7 @@ def read_config_file( sFilename ):
                      % ("--generate-config",)
             metro_logger.print_init_message(metro_logger.LOGGER_INIT_ERROR,
                                             sError)
-            sys.exit(2)
+            raise metro_error.Metro_stop_error(sError, 2)
         else:
             sSuccess = _("Configuration file:'%s' loaded with success") \
                        % (sFilename)
@@ -148,13 +179,13 @@ def read_config_file( sFilename ):
 def write_config_file( sFilename, bFull_config=False ):
     plwriter = plist_writer.Plist_writer()
     try:
-        plwriter.write(sFilename,dConfig,True,bFull_config)
+        plwriter.write(sFilename,get_config(),True,bFull_config)
     except IOError, sError:
         sError =  _("Unable to write to file '%s', the following\n") %(sFilename)+ \
                   _("error occured: %s") % (sError)
         metro_logger.print_init_message(metro_logger.LOGGER_INIT_ERROR,
                                         sError)
-        sys.exit(2)
+        raise metro_error.Metro_stop_error(sError, 2)
 
 def overlay_config( dBase, dNew, iConfig_level ):
 
@@ -218,11 +249,11 @@ def read_configuration_file( dCmdline_conf ):
 
 def overlay_configuration( dFile_conf, dCmdline_conf ):
     if dFile_conf != None:
-        overlay_config(dConfig, dFile_conf, CFG_CONFIGFILE)
+        overlay_config(get_config(), dFile_conf, CFG_CONFIGFILE)
 
     if dCmdline_conf != None:
         # Ajoute les valeurs passe sur la ligne de commande
-        overlay_config(dConfig, dCmdline_conf, CFG_COMMANDLINE)
+        overlay_config(get_config(), dCmdline_conf, CFG_COMMANDLINE)
 
 def validating_configuration( ):
     # validation de toute les options
@@ -230,7 +261,7 @@ def validating_configuration( ):
     metro_logger.print_init_message(metro_logger.LOGGER_INIT_MESSAGE,
                                     sMessage)
     
-    metro_config_validation.validate_config(dConfig)
+    metro_config_validation.validate_config(get_config())
 
     metro_logger.print_init_message(metro_logger.LOGGER_INIT_SUCCESS,
                                     _("METRo configuration validated"))
@@ -247,17 +278,17 @@ def get_value( sKey ):
     Return the value (undefined type) of the dictionnary for sKey.
     """
 
-    return dConfig[sKey]['VALUE']
+    return get_config()[sKey]['VALUE']
 
 def set_value( sKey, value ):
-    dConfig[sKey]['VALUE'] = value
+    get_config()[sKey]['VALUE'] = value
 
 
 def get_comment( sKey ):
-    return dConfig[sKey]['COMMENTS']
+    return get_config()[sKey]['COMMENTS']
 
 def key_exist( sKey ):
-    return sKey in dConfig
+    return sKey in get_config()
 
 
 
@@ -273,6 +304,8 @@ def get_metro_version( ):
 
 def save_command_line_parameter( lArgv, sShort_opt, lLong_opt ):
 
+    # Some options change the configuration of the thread directly
+    dConfig = get_config()
     dConf = {}
 
     try:
@@ -282,13 +315,13 @@ def save_command_line_parameter( lArgv, sShort_opt, lLong_opt ):
         # print help information and exit:
         sMessage = _("bad arg: ") + str(sError)
         print sMessage
-        sys.exit(2)
+        raise metro_error.Metro_stop_error(sMessage, 2)
 
     if args != []:
         sMessage = _("problem with arg: ") + str(args) +\
                    _("\nString(s) was not recognized as an argument.")
         print sMessage
-        sys.exit(3)
+        raise metro_error.Metro_stop_error(sMessage, 3)
     
     output = None
     verbose = False
@@ -316,7 +349,7 @@ def save_command_line_parameter( lArgv, sShort_opt, lLong_opt ):
                          _("value mean higher verbosity")
                 metro_logger.print_init_message(metro_logger.LOGGER_INIT_ERROR,
                                                 sError)
-                sys.exit(3)
+                raise metro_error.Metro_stop_error(sError, 3)
                
         if o in ("-l", "--log-file"):
             dConf['FILE_LOGGER_FILENAME'] = a
@@ -334,6 +367,9 @@ def save_command_line_parameter( lArgv, sShort_opt, lLong_opt ):
         if o == "--bypass-core":
             dConf['T_BYPASS_CORE'] = True
 
+        if o == "--compact-storage":
+            dConf['DATA_COMPACT_STORAGE'] = True
+
         if o in ("-h", "--help"):
             sMetro_root_path = metro_util.get_metro_root_path()
             sMetro_man_path = sMetro_root_path + "/usr/share/man/man1/metro.1"
@@ -351,6 +387,12 @@ def save_command_line_parameter( lArgv, sShort_opt, lLong_opt ):
         if o == "--roadcast-start-date":
             dConf['INIT_ROADCAST_START_DATE'] = a
 
+        if o == "--roadcast-end-date":
+            dConf['INIT_ROADCAST_END_DATE'] = a
+
+        if o == "--roadcast-max-horizon":
+            dConf['INIT_ROADCAST_MAX_HORIZON'] = a
+
         if o == "--input-forecast":
             dConf['FILE_FORECAST_IN_FILENAME'] = a
 
@@ -363,9 +405,36 @@ def save_command_line_parameter( lArgv, sShort_opt, lLong_opt ):
         if o == "--input-station":
             dConf['FILE_STATION_FILENAME'] = a
 
+        if o == "--input-threads":
+            dConf['INIT_INPUT_THREADS'] = a
+
         if o == "--output-roadcast":
             dConf['FILE_ROADCAST_FILENAME'] = a
 
+        if o == "--warm-start-state":
+            dConf['FILE_WARM_START_FILENAME'] = a
+
+        if o == "--input-forecast-ensemble":
+            dConf['FILE_FORECAST_ENSEMBLE_FILENAMES'] = a.split(',')
+
+        if o == "--ensemble-percentiles":
+            dConf['INIT_ENSEMBLE_PERCENTILES'] = a.split(',')
+
+        if o == "--batch":
+            dConf['FILE_BATCH_MANIFEST_FILENAME'] = a
+
+        if o == "--batch-workers":
+            dConf['INIT_BATCH_WORKERS'] = a
+
+        if o == "--batch-chunksize":
+            dConf['INIT_BATCH_CHUNKSIZE'] = a
+
+        if o == "--batch-timeout":
+            dConf['INIT_BATCH_TIMEOUT'] = a
+
+        if o == "--serve":
+            dConf['INIT_SERVE_ADDRESS'] = a
+
         if o == "--use-infrared-forecast":
             dConfig['IR']['VALUE'] = True
             # Add extended item based on options in command line.
@@ -514,6 +583,17 @@ def set_default_value( ):
          'FROM'    :CFG_INTERNAL,
          'COMMENTS':_("max version for valid forecast file")}    
 
+    dConfig['FILE_FORECAST_ENSEMBLE_FILENAMES'] = \
+        {'VALUE'   :[],
+         'FROM'    :CFG_HARDCODED,
+         'COMMENTS':_("forecast filenames of the ensemble members")}
+
+    # BATCH
+    dConfig['FILE_BATCH_MANIFEST_FILENAME'] = \
+        {'VALUE'   :"",
+         'FROM'    :CFG_HARDCODED,
+         'COMMENTS':_("file listing the stations of a batch run")}
+
     # OBSERVATION
     dConfig['FILE_OBSERVATION_FILENAME'] = \
         {'VALUE'   :"",
@@ -568,6 +648,11 @@ def set_default_value( ):
          'FROM'    :CFG_INTERNAL,
          'COMMENTS':_("current version for roadcast file")}
 
+    dConfig['FILE_WARM_START_FILENAME'] = \
+        {'VALUE'   :"",
+         'FROM'    :CFG_HARDCODED,
+         'COMMENTS':_("warm start state filename, empty for a cold start")}
+
 # ------------------------------------ misc ------------------------------------
 
     dConfig['FILE_CONFIGMETRO_FILENAME'] = \
@@ -1095,6 +1180,11 @@ def set_default_value( ):
 # Metro data definition
 #===============================================================================
 
+    dConfig['DATA_COMPACT_STORAGE'] = \
+        {'VALUE'    :False,
+         'FROM'     :CFG_HARDCODED,
+         'COMMENTS' :_("store the data matrices in single precision")}
+
 # ---------------------------------- forecast ----------------------------------
     dConfig['DATA_ATTRIBUTE_FORECAST_STANDARD'] = \
         {'VALUE'    :[],
@@ -1185,6 +1275,7 @@ def set_default_value( ):
                      "metro_string2dom_station",
                      "metro_dom2metro",
                      "metro_preprocess_validate_input",
+                     "metro_preprocess_trim_forecast",
                      "metro_preprocess_qa_qc_station",
                      "metro_preprocess_qa_qc_forecast",
                      "metro_preprocess_interpol_forecast",
@@ -1203,11 +1294,68 @@ def set_default_value( ):
          'FROM'    :CFG_HARDCODED,
          'COMMENTS':_("METro module execution sequence")}
 
+    dConfig['INIT_INPUT_THREADS'] = \
+        {'VALUE'   :0,
+         'FROM'    :CFG_HARDCODED,
+         'COMMENTS':_("threads of the input stage, 0 for one per input, ") +\
+                    _("1 for none")}
+
+    dConfig['INIT_ENSEMBLE_MEMBER_SEQUENCE'] = \
+        {'VALUE'   :["metro_read_forecast",
+                     "metro_validate_forecast",
+                     "metro_string2dom_forecast",
+                     "metro_dom2metro_forecast",
+                     "metro_preprocess_validate_input",
+                     "metro_preprocess_trim_forecast",
+                     "metro_preprocess_qa_qc_forecast",
+                     "metro_preprocess_interpol_forecast",
+                     "metro_preprocess_fsint2",
+                     "metro_preprocess_combine",
+                     ],
+         'FROM'    :CFG_HARDCODED,
+         'COMMENTS':_("METro module sequence of the ensemble members")}
+
+    dConfig['INIT_ENSEMBLE_PERCENTILES'] = \
+        {'VALUE'   :[10, 50, 90],
+         'FROM'    :CFG_HARDCODED,
+         'COMMENTS':_("percentiles of the roadcasts of an ensemble forecast")}
+
+    dConfig['INIT_BATCH_WORKERS'] = \
+        {'VALUE'   :0,
+         'FROM'    :CFG_HARDCODED,
+         'COMMENTS':_("worker processes of a batch run, 0 for one per CPU")}
+
+    dConfig['INIT_BATCH_CHUNKSIZE'] = \
+        {'VALUE'   :1,
+         'FROM'    :CFG_HARDCODED,
+         'COMMENTS':_("stations given at once to a worker of a batch run")}
+
+    dConfig['INIT_BATCH_TIMEOUT'] = \
+        {'VALUE'   :600,
+         'FROM'    :CFG_HARDCODED,
+         'COMMENTS':_("seconds allowed to a station of a batch run, ") +\
+                    _("0 for no limit")}
+
+    dConfig['INIT_SERVE_ADDRESS'] = \
+        {'VALUE'   :"",
+         'FROM'    :CFG_HARDCODED,
+         'COMMENTS':_("Unix socket or localhost port of the resident mode")}
+
     dConfig['INIT_ROADCAST_START_DATE'] = \
         {'VALUE'   :"",
          'FROM'    :CFG_HARDCODED,
          'COMMENTS':_("roadcast start time")}    
 
+    dConfig['INIT_ROADCAST_END_DATE'] = \
+        {'VALUE'   :"",
+         'FROM'    :CFG_HARDCODED,
+         'COMMENTS':_("roadcast end time, empty for the end of the forecast")}
+
+    dConfig['INIT_ROADCAST_MAX_HORIZON'] = \
+        {'VALUE'   :0,
+         'FROM'    :CFG_HARDCODED,
+         'COMMENTS':_("roadcast length in hours, 0 for no limit")}
+
     dConfig['INIT_USER_ROADCAST_START_DATE'] = \
         {'VALUE'   :"",
          'FROM'    :CFG_HARDCODED,
@@ -118,3 +118,17 @@ class Metro_data_error(Metro_error):
         self.sError = "\n" + _("Data error: ") +  self.sError
         return self.sError
 
+
+class Metro_stop_error(Metro_error):
+    """
+    Unrecoverable error, METRo can not go on.  The message has already
+    been displayed or logged.  iExit_code is the exit status of the
+    command line.
+    """
+    def __init__(self, inst, iExit_code=1):
+        Metro_error.__init__(self, inst)
+        self.iExit_code = iExit_code
+
+    def __str__(self):
+        return self.sError
+
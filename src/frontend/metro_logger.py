@@ -38,6 +38,7 @@ import sys
 import string
 
 import metro_config
+import metro_error
 from toolbox import metro_date
 from toolbox import metro_util
 
@@ -198,7 +199,17 @@ def init( ):
 
     bIs_initialised = True
 
-        
+
+def flush():
+    """
+    Name: flush
+    Parameter: none
+    Return: none
+    Description: Write the buffered messages in the log file.
+    """
+    if fLogger_file:
+        fLogger_file.flush()
+
 def stop():
     """
     Name: stop
@@ -236,6 +247,8 @@ def print_message( iMessage_category, sMessage ):
     Description: Write a message in the log file. A message is written only
                   if it's verbosity level is superior from the logger verbosity.
                   In option, the message can be displayed in shell.
+                  A message of category LOGGER_MSG_STOP raises a
+                  metro_error.Metro_stop_error.
    """
 
     # Determine the text identifier for the category of the message
@@ -288,7 +301,7 @@ def print_message( iMessage_category, sMessage ):
             print _("Lauching METRo with full logging capability may help you trace the error.")
 
         print "-------------------------------------------------------------------------"
-        sys.exit(1)
+        raise metro_error.Metro_stop_error(sMessage)
 
 def print_blank_line(iMessage_category):
      # Control if the message should be logged.
@@ -36,7 +36,6 @@
 # -*- coding: iso-8859-1 -*-
 
 import string
-import sys
 
 import metro_config
 import metro_logger
@@ -77,7 +76,7 @@ def validate_handler( sHandler, iFrom, sDescription ):
                                        str(inst))
         metro_logger.print_init_message(metro_logger.LOGGER_INIT_ERROR,
                                         sMessage)
-        sys.exit(3)
+        raise metro_error.Metro_stop_error(sMessage, 3)
 
 
 def validate_xml_itemlist_def( sConfig_path, iFrom, lItems, dData_type ):
@@ -93,7 +92,7 @@ def validate_xml_itemlist_def( sConfig_path, iFrom, lItems, dData_type ):
             sMessage = config_error_string(sConfig_path, iFrom, sError)
             metro_logger.print_init_message(metro_logger.LOGGER_INIT_ERROR,
                                             sMessage)
-            sys.exit(3)                    
+            raise metro_error.Metro_stop_error(sMessage, 3)
 
     # validate each child
     for dItem in lItems:
@@ -116,7 +115,7 @@ def validate_xml_itemlist_def( sConfig_path, iFrom, lItems, dData_type ):
             sMessage = config_error_string(sConfig_path, iFrom, sError)
             metro_logger.print_init_message(metro_logger.LOGGER_INIT_ERROR,
                                             sMessage)
-            sys.exit(3)
+            raise metro_error.Metro_stop_error(sMessage, 3)
 
 def validate_xml_file_def( dConf ):
 
@@ -192,8 +191,8 @@ def validate_datatype( dConf ):
     validate_datatype_category( sConfig_item, iFrom,
                                 dExtended_data_type, dAll_data_type )
 
-def validate_execution_sequence( dConf ):
-    sKey = 'INIT_MODULE_EXECUTION_SEQUENCE'
+def validate_execution_sequence( dConf,
+                                 sKey='INIT_MODULE_EXECUTION_SEQUENCE' ):
     lExecutionSequence = dConf[sKey]['VALUE']
     iFrom = dConf[sKey]['FROM']
     for sModule in lExecutionSequence:
@@ -206,7 +205,22 @@ def validate_execution_sequence( dConf ):
                                            str(inst))
             metro_logger.print_init_message(metro_logger.LOGGER_INIT_ERROR,
                                             sMessage)
-            sys.exit(3)
+            raise metro_error.Metro_stop_error(sMessage, 3)
+
+def validate_input_threads( dConf ):
+    sKey = 'INIT_INPUT_THREADS'
+    try:
+        iNb_threads = int(dConf[sKey]['VALUE'])
+    except (ValueError, TypeError):
+        iNb_threads = -1
+    if iNb_threads < 0:
+        sMessage = config_error_string(sKey, dConf[sKey]['FROM'],
+                                       _("'%s' is not a number of threads.") \
+                                       % (dConf[sKey]['VALUE']))
+        metro_logger.print_init_message(metro_logger.LOGGER_INIT_ERROR,
+                                        sMessage)
+        raise metro_error.Metro_stop_error(sMessage, 3)
+    dConf[sKey]['VALUE'] = iNb_threads
 
 def validate_roadcast_start_time( dConf ):
     sKey = 'INIT_ROADCAST_START_DATE'
@@ -222,7 +236,7 @@ def validate_roadcast_start_time( dConf ):
                        _("ISO 8601")
             metro_logger.print_init_message(metro_logger.LOGGER_INIT_ERROR,
                                             sMessage)
-            sys.exit(3)
+            raise metro_error.Metro_stop_error(sMessage, 3)
     else:
         sMessage = _("No roadcast start date provided. The date of the\n") + \
                    _("last observation will be used as the roadcast ") + \
@@ -232,11 +246,128 @@ def validate_roadcast_start_time( dConf ):
     
     
     
+def validate_roadcast_end_time( dConf ):
+    sKey = 'INIT_ROADCAST_END_DATE'
+    sEnd_time = dConf[sKey]['VALUE']
+
+    if sEnd_time != "":
+        try:
+            metro_date.parse_date_string(sEnd_time)
+        except metro_error.Metro_date_error, inst:
+            sMessage = _("Fatal error, the date string '%s' passed to the\n ")\
+                       % (sEnd_time)+\
+                       _("option '--roadcast-end-date' doesn't conform to ") +\
+                       _("ISO 8601")
+            metro_logger.print_init_message(metro_logger.LOGGER_INIT_ERROR,
+                                            sMessage)
+            raise metro_error.Metro_stop_error(sMessage, 3)
+
+    sKey = 'INIT_ROADCAST_MAX_HORIZON'
+    try:
+        fMax_horizon = float(dConf[sKey]['VALUE'])
+    except (ValueError, TypeError):
+        fMax_horizon = -1
+    if fMax_horizon < 0:
+        sMessage = config_error_string(sKey, dConf[sKey]['FROM'],
+                                       _("'%s' is not a number of hours.") \
+                                       % (dConf[sKey]['VALUE']))
+        metro_logger.print_init_message(metro_logger.LOGGER_INIT_ERROR,
+                                        sMessage)
+        raise metro_error.Metro_stop_error(sMessage, 3)
+    dConf[sKey]['VALUE'] = fMax_horizon
+
+def validate_ensemble( dConf ):
+    lFilenames = dConf['FILE_FORECAST_ENSEMBLE_FILENAMES']['VALUE']
+    if lFilenames == []:
+        return
+
+    validate_execution_sequence(dConf, 'INIT_ENSEMBLE_MEMBER_SEQUENCE')
+
+    sKey = 'INIT_ENSEMBLE_PERCENTILES'
+    lPercentiles = []
+    for sPercentile in dConf[sKey]['VALUE']:
+        try:
+            fPercentile = float(sPercentile)
+        except (ValueError, TypeError):
+            fPercentile = -1
+        if fPercentile < 0 or fPercentile > 100:
+            sMessage = config_error_string(sKey, dConf[sKey]['FROM'],
+                                           _("'%s' is not a percentile ") \
+                                           % (sPercentile) + \
+                                           _("between 0 and 100."))
+            metro_logger.print_init_message(metro_logger.LOGGER_INIT_ERROR,
+                                            sMessage)
+            raise metro_error.Metro_stop_error(sMessage, 3)
+        lPercentiles.append(fPercentile)
+    dConf[sKey]['VALUE'] = lPercentiles
+
+def validate_batch( dConf ):
+    if dConf['FILE_BATCH_MANIFEST_FILENAME']['VALUE'] == "":
+        return
+
+    if dConf['FILE_FORECAST_ENSEMBLE_FILENAMES']['VALUE'] != []:
+        sMessage = _("A batch run can not be combined with an ensemble ") +\
+                   _("forecast.")
+        metro_logger.print_init_message(metro_logger.LOGGER_INIT_ERROR,
+                                        sMessage)
+        raise metro_error.Metro_stop_error(sMessage, 3)
+
+    # The stations would share, and overwrite, the same state
+    if dConf['FILE_WARM_START_FILENAME']['VALUE'] != "":
+        sMessage = _("A batch run can not be combined with a warm start ") +\
+                   _("state.")
+        metro_logger.print_init_message(metro_logger.LOGGER_INIT_ERROR,
+                                        sMessage)
+        raise metro_error.Metro_stop_error(sMessage, 3)
+
+    for (sKey, iMin) in [('INIT_BATCH_WORKERS', 0),
+                         ('INIT_BATCH_CHUNKSIZE', 1),
+                         ('INIT_BATCH_TIMEOUT', 0)]:
+        try:
+            iValue = int(dConf[sKey]['VALUE'])
+        except (ValueError, TypeError):
+            iValue = iMin - 1
+        if iValue < iMin:
+            sMessage = config_error_string(sKey, dConf[sKey]['FROM'],
+                                           _("'%s' is not an integer ") \
+                                           % (dConf[sKey]['VALUE']) + \
+                                           _("greater or equal to %d.") \
+                                           % (iMin))
+            metro_logger.print_init_message(metro_logger.LOGGER_INIT_ERROR,
+                                            sMessage)
+            raise metro_error.Metro_stop_error(sMessage, 3)
+        dConf[sKey]['VALUE'] = iValue
+
+def validate_serve( dConf ):
+    if dConf['INIT_SERVE_ADDRESS']['VALUE'] == "":
+        return
+
+    if dConf['FILE_BATCH_MANIFEST_FILENAME']['VALUE'] != "" or \
+       dConf['FILE_FORECAST_ENSEMBLE_FILENAMES']['VALUE'] != []:
+        sMessage = _("The resident mode can not be combined with a batch ") +\
+                   _("run or an ensemble forecast.")
+        metro_logger.print_init_message(metro_logger.LOGGER_INIT_ERROR,
+                                        sMessage)
+        raise metro_error.Metro_stop_error(sMessage, 3)
+
+    # The jobs would share, and overwrite, the same state
+    if dConf['FILE_WARM_START_FILENAME']['VALUE'] != "":
+        sMessage = _("The resident mode can not be combined with a warm ") +\
+                   _("start state.")
+        metro_logger.print_init_message(metro_logger.LOGGER_INIT_ERROR,
+                                        sMessage)
+        raise metro_error.Metro_stop_error(sMessage, 3)
+
 def validate_config( dConf ):
     """
     Execution of the validation of the configuration files.
     """
     validate_datatype(dConf)
     validate_execution_sequence(dConf)
+    validate_input_threads(dConf)
     validate_xml_file_def(dConf)
     validate_roadcast_start_time(dConf)
+    validate_roadcast_end_time(dConf)
+    validate_ensemble(dConf)
+    validate_batch(dConf)
+    validate_serve(dConf)
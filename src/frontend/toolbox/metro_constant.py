@@ -80,10 +80,6 @@ fEps2 = 0.3780199778986
 fTrpl = 273.16
 fTcdk = 273.15
 
-# Used in metro_model to define the size of npSwo, because it finally
-#  goes into fortran...  
-nNL = 11520
-
 # METRo output
 #  Indicates at what will be the time interval between 2 field in the roadcast
 nMinutesForOutput = 20
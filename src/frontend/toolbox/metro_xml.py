@@ -42,7 +42,6 @@ Author     : Francois Fortin
 Date       : 2004
 """
 
-import sys
 import string
 
 import metro_config
@@ -80,7 +79,7 @@ def init( sMetro_xml_lib = ""):
                        "python-libxml2"
             metro_logger.print_init_message(metro_logger.LOGGER_INIT_ERROR,
                                             sMessage)
-            sys.exit(3)
+            raise metro_error.Metro_stop_error(sMessage, 3)
         else:
             metro_logger.print_init_message( \
                     metro_logger.LOGGER_INIT_SUCCESS,
@@ -278,6 +277,9 @@ def set_attribute( node, sAttributeName, sAttributeValue ):
 def write_to_file( domDoc, sFilename ):
     metro_xml_lib.write_xml_file(domDoc, sFilename)
 
+def dom_to_string( domDoc ):
+    return metro_xml_lib.dom_to_string(domDoc)
+
 
 def create_node_tree_from_dict( domDoc, nodeParent, lDefs, dWriteHandlers, dData ):
 
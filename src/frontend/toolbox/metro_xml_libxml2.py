@@ -134,7 +134,10 @@ class Metro_xml_libxml2:
         ctxt = libxml2.createDocParserCtxt(sXml_content)
 
 #        ctxt.validate(1)
-        
+
+        # The last error is the one of the thread, left by its previous
+        #  parse if not reset
+        libxml2.resetLastError()
         ctxt.parseDocument()
 
         # detecte si au moins une erreur c'est produite
@@ -142,12 +145,14 @@ class Metro_xml_libxml2:
             error = libxml2.lastError()
         except:
             error = None
-            
-        if error != None:
+
+        doc = ctxt.doc()
+        if error != None or not ctxt.wellFormed():
+            if doc != None:
+                doc.freeDoc()
             sMessage = _("At least one error occured when validating XML file.")
             raise "metroValidationError", sMessage
-            
-        doc = ctxt.doc()
+
         doc.freeDoc()
 
     #------------------
@@ -185,6 +190,9 @@ class Metro_xml_libxml2:
     
     def write_xml_file( self, domDoc, sFilename ):
         domDoc.saveFormatFileEnc(sFilename,"UTF-8",1);
+
+    def dom_to_string( self, domDoc ):
+        return domDoc.serialize("UTF-8",1)
     
     #------------------
     # autre
@@ -55,11 +55,10 @@
 
       IMPLICIT NONE
       INTEGER i, j
-      INTEGER Nl, n
+      INTEGER n
       REAL DT
-      INTEGER DTMAX
       REAL PADDING
-      COMMON/BUFFER_SIZE/ DTMAX, Nl, DT, PADDING, n
+      COMMON/BUFFER_SIZE/ DT, PADDING, n
 
 ***                 ***
 *     DEFINITIONS     *
@@ -111,23 +110,23 @@
 *     dpConductivity: Thermic conductivy of the road at every level 
 ***
       LOGICAL FLAT
-      INTEGER iref, ir40, NTP, NTFM, TYP(DTMAX)
-      DOUBLE PRECISION FS(DTMAX),  FI(DTMAX), P0(DTMAX)
-      DOUBLE PRECISION TA(DTMAX), QA(DTMAX), VA(DTMAX)
-      DOUBLE PRECISION PR(DTMAX)
+      INTEGER iref, ir40, NTP, NTFM, TYP(NTFM)
+      DOUBLE PRECISION FS(NTFM),  FI(NTFM), P0(NTFM)
+      DOUBLE PRECISION TA(NTFM), QA(NTFM), VA(NTFM)
+      DOUBLE PRECISION PR(NTFM)
       DOUBLE PRECISION ITP(n)
       DOUBLE PRECISION FCOR
       DOUBLE PRECISION ALN, ALR, FP      
       DOUBLE PRECISION  FSCORR, FICORR
       DOUBLE PRECISION EPSILON, ZU, ZT, Z0, Z0T
-      DOUBLE PRECISION dpSN(DTMAX), dpRA(DTMAX)
-      DOUBLE PRECISION dpIR(DTMAX), dpSF(DTMAX)
-      DOUBLE PRECISION dpFC(DTMAX), dpFA(DTMAX)
-      DOUBLE PRECISION dpG(DTMAX), dpBB(DTMAX)
-      DOUBLE PRECISION dpRT(DTMAX), dpFV(DTMAX)
-      DOUBLE PRECISION dpFP(DTMAX), dpSST(DTMAX), dpLT(DTMAX*n)
-      DOUBLE PRECISION dpCapacity(DTMAX), dpConductivity(DTMAX)
-      INTEGER npRC(DTMAX)
+      DOUBLE PRECISION dpSN(NTFM), dpRA(NTFM)
+      DOUBLE PRECISION dpIR(NTFM), dpSF(NTFM)
+      DOUBLE PRECISION dpFC(NTFM), dpFA(NTFM)
+      DOUBLE PRECISION dpG(NTFM), dpBB(NTFM)
+      DOUBLE PRECISION dpRT(NTFM), dpFV(NTFM)
+      DOUBLE PRECISION dpFP(NTFM), dpSST(NTFM), dpLT(NTFM*iref)
+      DOUBLE PRECISION dpCapacity(n), dpConductivity(n)
+      INTEGER npRC(NTFM)
 ***
 *     Output
 *     ---------------
@@ -54,9 +54,8 @@
       
       REAL AS,ASX,CI,BS,BETA,FACTN,HMIN
       LOGICAL bSilent, silent
-      INTEGER Nl, n
+      INTEGER n
       REAL DT
-      INTEGER DTMAX
       COMMON/CTSPHY/  CPD, CPV, RGASD, RGASV, TRPL, TCDK, RAUW,
      *                EPS1, EPS2, DELTA, CAPPA, TGL, CONSOL,
      *                GRAV, RAYT, STEFAN, PI, OMEGA,
@@ -66,13 +65,10 @@
       COMMON /SILENT/ bSilent
       
 
-*     DTMAX -> # de pas de temps maximal
-*     Nl -> nombre de pas de temps maximal de la periode contenant 
-*     les observations (48h + un coussin = 60h)
 *     DT -> pas de temps du modele de bilan energetique
 *     n -> nombre maximal de niveaux des grilles dans le sol
       REAL PADDING
-      COMMON /BUFFER_SIZE/ DTMAX, Nl, DT, PADDING, n
+      COMMON /BUFFER_SIZE/ DT, PADDING, n
 
       INTRINSIC SIGN
 
@@ -119,8 +115,6 @@
       FACTN = 1.2
       HMIN = 35.
 *     Dimension des arrays
-      DTMAX = 12000
-      Nl = 11520
       DT = 30.0
       n = 200
 
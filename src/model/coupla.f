@@ -43,7 +43,7 @@
 *     Date: Aout 1999 / August 1999
 ***
       SUBROUTINE COUPLA ( FS, FI, P0, TA , QA , VA , TYP, PR,
-     *                    PVC , iref, NTP, NTP2, ITP, TSO, FLAT,
+     *                    PVC , iref, NTP, NTP2, NTFM, ITP, TSO, FLAT,
      *                    FCOR, ALN, ALR, FP,
      *                    FSCORR   , FICORR  , ER1, ER2, 
      *                    FAIL, EPSILON, Z0, Z0T, ZU, ZT, ECHEC,
@@ -53,11 +53,10 @@
 
       IMPLICIT NONE
       INTEGER i, j
-      INTEGER Nl, n
+      INTEGER n
       REAL DT
-      INTEGER DTMAX
       REAL PADDING
-      COMMON /BUFFER_SIZE/ DTMAX, Nl, DT, PADDING, n
+      COMMON /BUFFER_SIZE/ DT, PADDING, n
 
 ***                 ***
 *     DEFINITIONS     *
@@ -77,6 +76,7 @@
 *     iref: Number of levels in the grid
 *     NTP: Index for the start of coupling
 *     NTP2: Index for the end of coupling
+*     NTFM: Number of time steps in the forcing arrays
 *     TSO: Road surface temperature
 *     Z0: Roughness length (m)
 *     Z0T: Roughness length (m)
@@ -105,21 +105,21 @@
 *     dpConductivity: Thermic conductivity of the road at every level
 ***
       LOGICAL FLAT
-      INTEGER iref, NTP, NTP2, TYP(DTMAX), PVC(DTMAX)
-      DOUBLE PRECISION  FS(DTMAX), FI(DTMAX), TA(DTMAX)
-      DOUBLE PRECISION QA(DTMAX), PR(DTMAX)
-      DOUBLE PRECISION VA(DTMAX), P0(DTMAX)
+      INTEGER iref, NTP, NTP2, NTFM, TYP(NTFM), PVC(NTFM)
+      DOUBLE PRECISION  FS(NTFM), FI(NTFM), TA(NTFM)
+      DOUBLE PRECISION QA(NTFM), PR(NTFM)
+      DOUBLE PRECISION VA(NTFM), P0(NTFM)
       DOUBLE PRECISION FCOR
       DOUBLE PRECISION ALN, ALR, TSO, FP
       DOUBLE PRECISION EPSILON, ZU, ZT, Z0, Z0T
-      DOUBLE PRECISION dpSN(DTMAX), dpRA(DTMAX)
-      DOUBLE PRECISION dpIR(DTMAX), dpSF(DTMAX)
-      DOUBLE PRECISION dpFC(DTMAX), dpFA(DTMAX)
-      DOUBLE PRECISION dpG(DTMAX), dpBB(DTMAX)
-      DOUBLE PRECISION dpRT(DTMAX), dpFV(DTMAX)
-      DOUBLE PRECISION dpFP(DTMAX)
-      DOUBLE PRECISION dpCapacity(DTMAX), dpConductivity(DTMAX)
-      INTEGER npRC(DTMAX)
+      DOUBLE PRECISION dpSN(NTFM), dpRA(NTFM)
+      DOUBLE PRECISION dpIR(NTFM), dpSF(NTFM)
+      DOUBLE PRECISION dpFC(NTFM), dpFA(NTFM)
+      DOUBLE PRECISION dpG(NTFM), dpBB(NTFM)
+      DOUBLE PRECISION dpRT(NTFM), dpFV(NTFM)
+      DOUBLE PRECISION dpFP(NTFM)
+      DOUBLE PRECISION dpCapacity(n), dpConductivity(n)
+      INTEGER npRC(NTFM)
       INTEGER nCheckBefore, nCheckAfter, n30SecondsStepsIn3Hours
 ***
 *     I/O
@@ -244,10 +244,10 @@
       else
          nCheckBefore = NTP
       end if
-      if (NTP2 + n30SecondsStepsIn3Hours/3 < DTMAX) then
+      if (NTP2 + n30SecondsStepsIn3Hours/3 < NTFM) then
          nCheckAfter = NTP2+n30SecondsStepsIn3Hours/3
       else
-         nCheckAfter = DTMAX
+         nCheckAfter = NTFM
       end if
 
       if(FS(nCheckBefore) > 0.0 .and.
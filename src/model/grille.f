@@ -51,11 +51,10 @@
      *     dpConductivity, dSstDepth)
       IMPLICIT NONE
       INTEGER i, j, k
-      INTEGER Nl, n
+      INTEGER n
       REAL DT
-      INTEGER DTMAX
       REAL PADDING
-      COMMON /BUFFER_SIZE/ DTMAX, Nl, DT, PADDING, n
+      COMMON /BUFFER_SIZE/ DT, PADDING, n
 
 ***               ***
 *     DEFINITIONS   *
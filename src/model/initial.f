@@ -54,11 +54,10 @@
 
       IMPLICIT NONE
       INTEGER i, j
-      INTEGER Nl, n
+      INTEGER n
       REAL DT
-      INTEGER DTMAX
       REAL PADDING
-      COMMON /BUFFER_SIZE/ DTMAX, Nl, DT, PADDING, n
+      COMMON /BUFFER_SIZE/ DT, PADDING, n
 ***                 ***
 *     DEFINITIONS     *
 ***                 ***
@@ -71,13 +70,14 @@
 *     DEB: Start indice of initialization
 *     FIN: End indice of initialization
 *     TSO, TUO, TAO: forcing ( surface, 40 cm, air [under the bridge] )
-*     SWO: temporel serie indicating the hole in the observations
+*     SWO_IN: temporel serie indicating the hole in the observations,
+*             4 flags for each observation
 ***
       LOGICAL FLAT
       INTEGER iref, ir40, DEB, FIN
-      INTEGER SWO(Nl,4), SWO_IN(4*Nl)
-      DOUBLE PRECISION TSO(Nl)
-      DOUBLE PRECISION TUO(Nl), TAO(Nl)
+      INTEGER SWO_IN(4,*)
+      DOUBLE PRECISION TSO(*)
+      DOUBLE PRECISION TUO(*), TAO(*)
       DOUBLE PRECISION dpCapacity(n)
       DOUBLE PRECISION dpConductivity(n)
 ***
@@ -111,7 +111,6 @@
       end if
 
 
-      CALL ARRAY2MATRIXINT(SWO_IN, SWO, Nl, 4)
       next = 1
       now = 2
       do j=1,iref
@@ -128,10 +127,10 @@
          do j=2,iref-1
             T(j,next) = T(j,now)+REAL(DT*(dpCapacity(j)*(G(j)- G(j-1))))
          end do
-         if ( SWO(i,1) .eq. 1 ) then
+         if ( SWO_IN(1,i) .eq. 1 ) then
             T(ir40,next) = REAL(TUO(i))
          end if
-         if ( FLAT .and. SWO(i,2) .eq. 1 ) then
+         if ( FLAT .and. SWO_IN(2,i) .eq. 1 ) then
 *        BC: underside temp. is air temp
             T(iref,next) = REAL(TAO(i))
          else
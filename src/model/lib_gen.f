@@ -49,11 +49,10 @@
      *                   bDeepTemp, dDeepTemp)
       IMPLICIT NONE
       INTEGER j
-      INTEGER Nl, n
+      INTEGER n
       REAL DT
-      INTEGER DTMAX
       REAL PADDING
-      COMMON /BUFFER_SIZE/ DTMAX, Nl, DT, PADDING, n
+      COMMON /BUFFER_SIZE/ DT, PADDING, n
 
 ***                 ***
 *     DEFINITIONS     *
@@ -64,7 +63,8 @@
 *     FLAT: switch pont / route
 *     iref: indice du dernier niveau utilisee par le modele
 *     ir40: indice du niveau le plus pres de 40 cm.
-*     SWO: Serie temporelle de validite des observations (0 ou 1)
+*     SWO_IN: Serie temporelle de validite des observations (0 ou 1),
+*             4 indicateurs par observation
 *     FT: Forecast time
 *     TS: Temperature de surface de la route
 *     TU: Temperature a 40 cm
@@ -78,7 +78,7 @@
       LOGICAL FLAT, bDeepTemp
       DOUBLE PRECISION FT, TS, TU, TA, DIFF, LON
       DOUBLE PRECISION dpTemperatureDepth(n), dDeepTemp
-      INTEGER iref, ir40, SWO_IN(Nl*4), SWO(Nl,4)
+      INTEGER iref, ir40, SWO_IN(4,*)
 
 ***
 *     Sorties
@@ -119,8 +119,6 @@
          WRITE(*,*) "DEBUT MAKTIP"
       end if
 
-*     Conversion du array en matrice
-      CALL ARRAY2MATRIXINT(SWO_IN, SWO, Nl, 4)
       FT = FT*3600.0
       ASURF = 7.5
       ABOTT = 3.75
@@ -128,7 +126,7 @@
       K = SQRT( OMEGA / DIFF )
       B = TS - EXP((-K)*dpTemperatureDepth(1))*ASURF
      *     *SIN(OMEGA*FT - K*dpTemperatureDepth(1) + C)
-      if ( SWO(1,1) .eq. 1 ) then
+      if ( SWO_IN(1,1) .eq. 1 ) then
          E = TU - EXP((-K)*dpTemperatureDepth(ir40))*
      *     ASURF*SIN(OMEGA*FT - K*dpTemperatureDepth(ir40) + C)
      *      - B
@@ -142,7 +140,7 @@
          ITP(j) = REAL(B + Ew + EXP((-K)*dpTemperatureDepth(j))*
      *        ASURF*SIN(OMEGA*FT -K*dpTemperatureDepth(j)+C))
       end do
-      if ( FLAT .and. SWO(1,2) .eq. 1) then
+      if ( FLAT .and. SWO_IN(2,1) .eq. 1) then
          do j=ir40+1,iref
             Ew = (TA - ITP(ir40))/(dpTemperatureDepth(iref)
      *            -dpTemperatureDepth(ir40))
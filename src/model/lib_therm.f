@@ -148,11 +148,10 @@
      *     dpCapacity, dpConductivity)
       IMPLICIT NONE
 
-      INTEGER Nl, n
+      INTEGER n
       REAL DT
-      INTEGER DTMAX
       REAL PADDING
-      COMMON /BUFFER_SIZE/ DTMAX, Nl, DT, PADDING, n
+      COMMON /BUFFER_SIZE/ DT, PADDING, n
 ***                 ***
 *     DEFINITIONS     *
 ***                 ***
@@ -213,11 +212,10 @@
      *                    TS , QA , QG , PR1, PR2, PRG, DX, ETAT )
       IMPLICIT NONE
 
-      INTEGER Nl, n
+      INTEGER n
       REAL DT
-      INTEGER DTMAX
       REAL PADDING
-      COMMON /BUFFER_SIZE/ DTMAX, Nl, DT, PADDING, n
+      COMMON /BUFFER_SIZE/ DT, PADDING, n
 *     MEA -> Water quantity before runoff. MEA(1) : liquid 
 *      MEA(2): solid
       REAL MEA(2) 
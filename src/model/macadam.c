@@ -49,7 +49,9 @@
 
 #include <stdio.h>
 #include <stdlib.h>
+#include <string.h>
 #include <math.h>
+#include <pthread.h>
 #include "macadam.h"
 #define f77name(x) x##_
 
@@ -62,28 +64,24 @@
 #define nNBRARGS 27
 
 
-/* Those variables are declared here because we have to get them in python */
-/* This cannot be perform unless you retrieve one pointer as a return value */
-static struct doubleStruct stRA; /* Liquid accumlation */
-static struct doubleStruct stSN; /* Snow/ice accumulation */
-static struct longStruct   stRC; /* Road condition */
-static struct doubleStruct stRT; /* Road temperature */
-static struct doubleStruct stIR; /* Infra-red flux */
-static struct doubleStruct stSF; /* Solar flux */
-static struct doubleStruct stFV; /* Vapor flux */
-static struct doubleStruct stFC; /* Sensible heat */
-static struct doubleStruct stG;  /* Ground flux */
-static struct doubleStruct stBB; /* Black body radiation */ 
-static struct doubleStruct stFP; /* Phase change energy */
-static struct longStruct   stEc; /* Boolean to know if the execution was a success */
-static struct doubleStruct stSST; /* Subsurface temperature */
-static struct doubleStruct stTemperatureDepth;  /* Depth of temperature grid levels */
-static struct doubleStruct stLT; /* Level temperature */
+/* Context used by the legacy interface (Do_Metro and get_*). New code */
+/* should allocate its own context with new_context so that many stations */
+/* can be computed concurrently in the same process. */
+static struct macadamContext stDefaultContext;
+
+/* The physical constants of the fortran code live in COMMON blocks shared */
+/* by every context.  They are initialized once, under a lock. */
+static pthread_mutex_t mtxConstPhys = PTHREAD_MUTEX_INITIALIZER;
+static BOOL bConstPhysInit = FALSE;
+static BOOL bConstPhysSilent = FALSE;
+static void init_constphys(BOOL bSilent);
  
 /****************************************************************************
- Name: Do_Metro 
+ Name: Do_Metro_context
  
  Parameters:  
+[I/O struct macadamContext* pCtx : context receiving the results of the run.
+  Created with new_context, released with free_context.]
 [I BOOL bFlat : road (FALSE) or bridge (TRUE)] 
 [I double dMLat : Latitude of the RWIS station]
 [I double dMLong : Longitude of the RWIS station]
@@ -112,6 +110,8 @@ static struct doubleStruct stLT; /* Level temperature */
     passed the QA/QC]
 [I long* npSWO4 : Boolean field to check if the wind speed
     passed the QA/QC]
+[  The four fields are interleaved in npSwo, 4 values for each of the
+    nLenObservation observations.]
 [I BOOL* bpNoObs : boolean field to tell the number of observation used]
 [I double dDeltaT : Time diffence, in hours, between the first observation 
   and the start of METRo.]
@@ -146,8 +146,9 @@ Miguel Tremblay  May 2004
  
 ***************************************************************************/
 
-void Do_Metro( BOOL bFlat, double dMLat, double dMLon, double* dpZones,\
-	       long nNbrOfZone,  long* npMateriau, double* dpTA, double* dpQP,\
+void Do_Metro_context(struct macadamContext* pCtx, BOOL bFlat, double dMLat,\
+	       double dMLon, double* dpZones, long nNbrOfZone,\
+	       long* npMateriau, double* dpTA, double* dpQP,\
 	       double* dpFF,  double* dpPS, double* dpFS, double* dpFI, \
 	       double* dpFA, long* npTYP, long* npRC, double* dpTAO, \
 	       double* dpRTO, double* dpDTO, double* dpAH, double* dpTimeO,\
@@ -196,8 +197,10 @@ void Do_Metro( BOOL bFlat, double dMLat, double dMLon, double* dpZones,\
   double dEr2=0;
   double dFp=0.0;
   /* Grid values */
+  struct macadamGrid* pGrid;
+  BOOL bOwnGrid = FALSE;
+  BOOL bWarm;
   long nIR40;
-  double* dpCnt;
   double* dpCapacity;
   double* dpConductivity;
   long i;
@@ -207,66 +210,105 @@ void Do_Metro( BOOL bFlat, double dMLat, double dMLon, double* dpZones,\
 
 
   /* Allocate memory for all structures */
-  init_structure(nNbrTimeSteps, nNGRILLEMAX);
+  init_structure(pCtx, nNbrTimeSteps, nNGRILLEMAX);
   
 
   for (i=0; i<nNbrTimeSteps; i++){
-    stIR.pdArray[i] = dpFI[i];
+    pCtx->stIR.pdArray[i] = dpFI[i];
   }
 
   /* double */ 
   dpItp = (double*)malloc((nNGRILLEMAX)*sizeof(double));
-  dpCnt = (double*)calloc((2*nNGRILLEMAX),sizeof(double));
-  dpCapacity  = (double*)calloc((2*nNGRILLEMAX),sizeof(double));
-  dpConductivity = (double*)calloc((2*nNGRILLEMAX),sizeof(double));
   
   /* Initilization of physical constants in the fortran code */
-  f77name(setconstphys)(&bSilent);
+  init_constphys(bSilent);
 
   /******************************* Station ********************************/
 
-  *stEc.plArray = FALSE;
+  *pCtx->stEc.plArray = FALSE;
   dFCorr = 2.0*dOMEGA*sin(dPI*dMLat/180.0); 
 
-  if(!bFlat){
-    /* Note: In the case of a 'road', a 20 sand meters layer is added at the bottom.*/
-    dpZones[nNbrOfZone] = 20.0;
-    npMateriau[nNbrOfZone]= 4;
-    nNbrOfZone = nNbrOfZone +1;
+  /* Grid creation, unless the context uses a grid already built */
+  /*  for this station configuration. */
+  pGrid = pCtx->pGrid;
+  if(!grid_matches(pGrid, bFlat, dpZones, nNbrOfZone, npMateriau,\
+		   dSstDepth)){
+    pGrid = new_grid(bFlat, dpZones, nNbrOfZone, npMateriau, dSstDepth,\
+		     bSilent);
+    bOwnGrid = TRUE;
   }
-  
-
-  /* Grid creation */
-
-  f77name(grille)(&(stTemperatureDepth.nSize), &nIR40, &bFlat, &nNbrOfZone, \
-		  dpZones, npMateriau, &dDiff, stTemperatureDepth.pdArray, \
-		  stEc.plArray, dpCapacity, dpConductivity, &dSstDepth); 
-  if(*(stEc.plArray)){
+  *(pCtx->stEc.plArray) = pGrid->bEchec;
+  if(*(pCtx->stEc.plArray)){
     goto liberation;
   }
+  nIR40 = pGrid->nIR40;
+  dDiff = pGrid->dDiff;
+  dpCapacity = pGrid->dpCapacity;
+  dpConductivity = pGrid->dpConductivity;
+  pCtx->stTemperatureDepth.nSize = pGrid->nSize;
+  memcpy(pCtx->stTemperatureDepth.pdArray, pGrid->dpTemperatureDepth,\
+	 nNGRILLEMAX*sizeof(double));
+  alloc_lt(pCtx, nNbrTimeSteps);
 
   /* Extraction of observations */
   /*  Those -1 is because it is use in fortran */
   nDeltaTIndice = (dDeltaT)*3600/30.-1;
   nLenObservation = nLenObservation -1;
 
+  /***********************************************************************/
+  /*   Warm start: the profile of a previous run replaces the            */
+  /*   initialization, only the observations received since this run    */
+  /*   are coupled.  Cold start if the coupling fails.                   */
+  /***********************************************************************/
+  nNtp2 = nLenObservation - nDeltaTIndice;
+  bWarm = !bpNoObs[1] &&\
+    pCtx->stWarmItp.nSize == pCtx->stTemperatureDepth.nSize &&\
+    pCtx->nWarmStep >= 1 && pCtx->nWarmStep < nNtp2 &&\
+    nNtp2 - pCtx->nWarmStep <= 28800.0/dDT;
+  if(bWarm){
+    memcpy(dpItp, pCtx->stWarmItp.pdArray,\
+	   pCtx->stWarmItp.nSize*sizeof(double));
+    nNtp = pCtx->nWarmStep;
+    f77name(coupla)(dpFS, dpFI, dpPS, dpTA, dpAH, dpFF, npTYP, dpQP, \
+		    npRC, &pCtx->stTemperatureDepth.nSize, &nNtp, &nNtp2, &nNbrTimeSteps,\
+		    dpItp,\
+		    &(dpRTO[nLenObservation]), &bFlat, &dFCorr, \
+		    &dAln, &dAlr, &dFp, &dFsCorr, &dFiCorr, &dEr1, &dEr2,\
+		    &bFail, &dEpsilon, &dZ0, &dZ0t, &dZu, &dZt, pCtx->stEc.plArray,\
+		    pCtx->stRA.pdArray, pCtx->stSN.pdArray, pCtx->stRC.plArray, pCtx->stRT.pdArray,\
+		    pCtx->stIR.pdArray, pCtx->stSF.pdArray, pCtx->stFV.pdArray, pCtx->stFC.pdArray,\
+		    dpFA, pCtx->stG.pdArray, pCtx->stBB.pdArray, pCtx->stFP.pdArray, \
+		    dpCapacity, dpConductivity);
+    if(*(pCtx->stEc.plArray)){
+      goto liberation;
+    }
+    if(bFail){
+      if(!bSilent)
+	printf("Warm start failed, cold start\n");
+      bWarm = FALSE;
+    }
+  }
    
   /***********************************************************************/
   /*   Coupling is different if there is more or less than 3 hours.     */
   /***********************************************************************/
 
-  if(bpNoObs[1]){
+  if(bWarm){
+    if(!bSilent)
+      printf("Warm start\n");
+  }
+  else if(bpNoObs[1]){
     /* less than 3 hours of observation in the coupling */
     if(!bSilent){
       printf("Less than 3 hours of overlap between the\n");
       printf("forecast and the road observations. Not enough ");
       printf("data for coupling.\n");
     }
-    f77name(makitp)(dpItp, &stTemperatureDepth.nSize, &nIR40, &bFlat, &(dpTimeO[0]),\
+    f77name(makitp)(dpItp, &pCtx->stTemperatureDepth.nSize, &nIR40, &bFlat, &(dpTimeO[0]),\
 		    &(dpRTO[0]), &(dpDTO[0]), &(dpTAO[0]), &dDiff, \
-		    &dMLon, npSwo, stTemperatureDepth.pdArray, &bDeepTemp, &dDeepTemp);
+		    &dMLon, npSwo, pCtx->stTemperatureDepth.pdArray, &bDeepTemp, &dDeepTemp);
     f77name(initial)(dpItp , (dpRTO+1), (dpDTO+1), (dpTAO+1), &nOne,	\
-		     &nLenObservation, &stTemperatureDepth.nSize, &nIR40,\
+		     &nLenObservation, &pCtx->stTemperatureDepth.nSize, &nIR40,\
 		     &bFlat, npSwo, dpCapacity, dpConductivity); 
     nNtp2 = nLenObservation - nDeltaTIndice;
   }
@@ -278,31 +320,32 @@ void Do_Metro( BOOL bFlat, double dMLat, double dMLon, double* dpZones,\
     /* Patch because nNtdcl does not take the value 0 in fortran!*/
     if(nNtdcl == 0) 
       nNtdcl =1;
-    f77name(makitp)(dpItp, &stTemperatureDepth.nSize, &nIR40, &bFlat, &(dpTimeO[nNtdcl]),\
+    f77name(makitp)(dpItp, &pCtx->stTemperatureDepth.nSize, &nIR40, &bFlat, &(dpTimeO[nNtdcl]),\
 		    &(dpRTO[nNtdcl]), &(dpDTO[nNtdcl]), &(dpTAO[nNtdcl]),\
-		    &dDiff, &dMLon, npSwo, stTemperatureDepth.pdArray, \
+		    &dDiff, &dMLon, npSwo, pCtx->stTemperatureDepth.pdArray, \
 		    &bDeepTemp, &dDeepTemp);
     nNtp = - nDeltaTIndice + nNtdcl;
     nNtp2 = nLenObservation - nDeltaTIndice;
     f77name(coupla)(dpFS, dpFI, dpPS, dpTA, dpAH, dpFF, npTYP, dpQP, npRC, \
-		    &stTemperatureDepth.nSize, &nNtp, &nNtp2, dpItp, \
+		    &pCtx->stTemperatureDepth.nSize, &nNtp, &nNtp2, &nNbrTimeSteps,\
+		    dpItp, \
 		    &(dpRTO[nLenObservation]), &bFlat, &dFCorr,   \
 		    &dAln, &dAlr, &dFp, &dFsCorr, &dFiCorr, &dEr1, &dEr2, \
-		    &bFail, &dEpsilon, &dZ0, &dZ0t, &dZu, &dZt, stEc.plArray, \
-		    stRA.pdArray, stSN.pdArray, stRC.plArray, stRT.pdArray,\
-		    stIR.pdArray, stSF.pdArray, stFV.pdArray, stFC.pdArray, \
-		    dpFA, stG.pdArray, stBB.pdArray, stFP.pdArray,\
+		    &bFail, &dEpsilon, &dZ0, &dZ0t, &dZu, &dZt, pCtx->stEc.plArray, \
+		    pCtx->stRA.pdArray, pCtx->stSN.pdArray, pCtx->stRC.plArray, pCtx->stRT.pdArray,\
+		    pCtx->stIR.pdArray, pCtx->stSF.pdArray, pCtx->stFV.pdArray, pCtx->stFC.pdArray, \
+		    dpFA, pCtx->stG.pdArray, pCtx->stBB.pdArray, pCtx->stFP.pdArray,\
 		    dpCapacity, dpConductivity);  
     if(!bSilent)
       printf("coupla 1 \n");
-    if(*(stEc.plArray)){
+    if(*(pCtx->stEc.plArray)){
       goto liberation;
     }
     if(bFail){
       if(!bSilent)
 	printf("fail\n");      
       f77name(initial)(dpItp, (dpRTO+1), (dpDTO+1), (dpTAO+1), &nOne,\
-		       &nLenObservation, &stTemperatureDepth.nSize,\
+		       &nLenObservation, &pCtx->stTemperatureDepth.nSize,\
 		       &nIR40, &bFlat, npSwo, dpCapacity, dpConductivity); 
      }
   }
@@ -310,31 +353,32 @@ void Do_Metro( BOOL bFlat, double dMLat, double dMLon, double* dpZones,\
     if(!bSilent)
       printf("Complete observations\n");
 
-    f77name(makitp)(dpItp, &stTemperatureDepth.nSize, &nIR40, &bFlat,\
+    f77name(makitp)(dpItp, &pCtx->stTemperatureDepth.nSize, &nIR40, &bFlat,\
 		    &(dpTimeO[nDeltaTIndice]),			      \
 		    &(dpRTO[nDeltaTIndice]), &(dpDTO[nDeltaTIndice]), \
 		    &(dpTAO[nDeltaTIndice]), &dDiff, &dMLon, npSwo, \
-		    stTemperatureDepth.pdArray, &bDeepTemp, &dDeepTemp);
+		    pCtx->stTemperatureDepth.pdArray, &bDeepTemp, &dDeepTemp);
     nNtdcl  = nLenObservation - nDeltaTIndice -\
       ((nLenObservation-nDeltaTIndice < 28800.0/dDT)	\
        ? nLenObservation-nDeltaTIndice : 28800.0/dDT);
     f77name(initial)(dpItp , (dpRTO+1), (dpDTO+1), (dpTAO+1), &nOne,	\
-		     &nLenObservation, &stTemperatureDepth.nSize,\
+		     &nLenObservation, &pCtx->stTemperatureDepth.nSize,\
 		     &nIR40, &bFlat, npSwo, dpCapacity, dpConductivity); 
     nNtp = 0 + nNtdcl;
     nNtp2 = nLenObservation - nDeltaTIndice;
     f77name(coupla)(dpFS, dpFI, dpPS, dpTA, dpAH, dpFF, npTYP, dpQP, \
-		    npRC, &stTemperatureDepth.nSize, &nNtp, &nNtp2, dpItp,\
+		    npRC, &pCtx->stTemperatureDepth.nSize, &nNtp, &nNtp2, &nNbrTimeSteps,\
+		    dpItp,\
 		    &(dpRTO[nLenObservation]), &bFlat, &dFCorr, \
 		    &dAln, &dAlr, &dFp, &dFsCorr, &dFiCorr, &dEr1, &dEr2,\
-		    &bFail, &dEpsilon, &dZ0, &dZ0t, &dZu, &dZt, stEc.plArray,\
-		    stRA.pdArray, stSN.pdArray, stRC.plArray, stRT.pdArray,\
-		    stIR.pdArray, stSF.pdArray, stFV.pdArray, stFC.pdArray,\
-		    dpFA, stG.pdArray, stBB.pdArray, stFP.pdArray, \
+		    &bFail, &dEpsilon, &dZ0, &dZ0t, &dZu, &dZt, pCtx->stEc.plArray,\
+		    pCtx->stRA.pdArray, pCtx->stSN.pdArray, pCtx->stRC.plArray, pCtx->stRT.pdArray,\
+		    pCtx->stIR.pdArray, pCtx->stSF.pdArray, pCtx->stFV.pdArray, pCtx->stFC.pdArray,\
+		    dpFA, pCtx->stG.pdArray, pCtx->stBB.pdArray, pCtx->stFP.pdArray, \
 		    dpCapacity, dpConductivity);
     if(!bSilent)
       printf("coupla 2\n");
-    if(*(stEc.plArray)){
+    if(*(pCtx->stEc.plArray)){
        goto liberation;
      }
      if(bFail){
@@ -342,23 +386,29 @@ void Do_Metro( BOOL bFlat, double dMLat, double dMLon, double* dpZones,\
        if(!bSilent)
 	 printf("fail\n");
        f77name(initial)(dpItp, (dpRTO+1), (dpDTO+1), (dpTAO+1), &nOne,\
-			&nLenObservation, &stTemperatureDepth.nSize, \
+			&nLenObservation, &pCtx->stTemperatureDepth.nSize, \
 			&nIR40, &bFlat, npSwo, dpCapacity, dpConductivity);
      }
   }/* End else observation complete */
 
+  /* Profile at the start of the roadcast, for the warm start of the */
+  /*  next run */
+  pCtx->stItp.nSize = pCtx->stTemperatureDepth.nSize;
+  memcpy(pCtx->stItp.pdArray, dpItp, pCtx->stItp.nSize*sizeof(double));
+  pCtx->nItpStep = nNtp2;
+
   /************ roadcast **************************************************/
   f77name(balanc)(dpFS, dpFI, dpPS, dpTA, dpAH, dpFF, npTYP, dpQP,\
-		  &stTemperatureDepth.nSize,					\
+		  &pCtx->stTemperatureDepth.nSize,					\
 		  &nIR40, &nNtp2, &nNbrTimeSteps, dpItp, &bFlat, &dFCorr,\
 		   &dAln, &dAlr, &dFp, &dFsCorr, &dFiCorr, &dEr1,\
-		  &dEr2, &dEpsilon, &dZ0, &dZ0t, &dZu, &dZt, stEc.plArray,\
-		  stRT.pdArray, stRA.pdArray ,stSN.pdArray, stRC.plArray,\
-		  stIR.pdArray, stSF.pdArray, stFV.pdArray, stFC.pdArray,\
-		  dpFA, stG.pdArray, stBB.pdArray, stFP.pdArray,\
-		  stSST.pdArray, stLT.pdArray, dpCapacity, dpConductivity); 
+		  &dEr2, &dEpsilon, &dZ0, &dZ0t, &dZu, &dZt, pCtx->stEc.plArray,\
+		  pCtx->stRT.pdArray, pCtx->stRA.pdArray ,pCtx->stSN.pdArray, pCtx->stRC.plArray,\
+		  pCtx->stIR.pdArray, pCtx->stSF.pdArray, pCtx->stFV.pdArray, pCtx->stFC.pdArray,\
+		  dpFA, pCtx->stG.pdArray, pCtx->stBB.pdArray, pCtx->stFP.pdArray,\
+		  pCtx->stSST.pdArray, pCtx->stLT.pdArray, dpCapacity, dpConductivity); 
 
-  if(*(stEc.plArray)){
+  if(*(pCtx->stEc.plArray)){
     if(!bSilent)
       printf("Failed in balanc\n");
     goto liberation;
@@ -373,15 +423,36 @@ void Do_Metro( BOOL bFlat, double dMLat, double dMLon, double* dpZones,\
   /* double */
   free(dpItp);
   dpItp = NULL;
-  free(dpCnt);
-  dpCnt = NULL;
-  free(dpCapacity);
-  dpCapacity = NULL;
-  free(dpConductivity);
-  dpConductivity = NULL;
+  if(bOwnGrid){
+    free_grid(pGrid);
+  }
 
 }/* End Do_Metro */
 
+/****************************************************************************
+ Name: Do_Metro 
+ 
+ Description: Legacy entry point.  Run the model in the default context
+  whose results are retrieved with get_ra(), get_rt(), etc.  Kept for
+  compatibility, only one station at a time can use it.
+***************************************************************************/
+
+void Do_Metro( BOOL bFlat, double dMLat, double dMLon, double* dpZones,\
+	       long nNbrOfZone,  long* npMateriau, double* dpTA, double* dpQP,\
+	       double* dpFF,  double* dpPS, double* dpFS, double* dpFI, \
+	       double* dpFA, long* npTYP, long* npRC, double* dpTAO, \
+	       double* dpRTO, double* dpDTO, double* dpAH, double* dpTimeO,\
+	       long* npSwo, BOOL* bpNoObs, double dDeltaT,\
+	       long nLenObservation, long nNbrTimeSteps, BOOL bSilent,\
+	       double dSstDepth, BOOL bDeepTemp, double dDeepTemp)
+{
+  Do_Metro_context(&stDefaultContext, bFlat, dMLat, dMLon, dpZones,\
+		   nNbrOfZone, npMateriau, dpTA, dpQP, dpFF, dpPS, dpFS,\
+		   dpFI, dpFA, npTYP, npRC, dpTAO, dpRTO, dpDTO, dpAH,\
+		   dpTimeO, npSwo, bpNoObs, dDeltaT, nLenObservation,\
+		   nNbrTimeSteps, bSilent, dSstDepth, bDeepTemp, dDeepTemp);
+}/* End Do_Metro */
+
 int main(argc, argv) 
      int argc; 
      char *argv[];      
@@ -391,123 +462,734 @@ int main(argc, argv)
  return 0; 
 } 
 
-void init_structure(long nTimeStepMax, long nGrilleLevelMax)
+/****************************************************************************
+ Name: init_constphys
+ 
+ Description: Initialization of the physical constants in the fortran
+  COMMON blocks.  Those blocks are shared by every context: they are
+  only (re)written when the verbosity changes, under a lock, so that
+  the other runs never see them half initialized.
+***************************************************************************/
+
+static void init_constphys(BOOL bSilent)
+{
+  pthread_mutex_lock(&mtxConstPhys);
+  if(!bConstPhysInit || bConstPhysSilent != bSilent){
+    f77name(setconstphys)(&bSilent);
+    bConstPhysInit = TRUE;
+    bConstPhysSilent = bSilent;
+  }
+  pthread_mutex_unlock(&mtxConstPhys);
+}
+
+/****************************************************************************
+ Name: new_context / free_context
+ 
+ Description: Allocation and liberation of a context.  A context holds
+  all the outputs of one execution of the model.  The arrays are
+  allocated by Do_Metro_context and a context can be reused for
+  several runs.
+***************************************************************************/
+
+struct macadamContext* new_context(void)
 {
+  return (struct macadamContext*)calloc(1, sizeof(struct macadamContext));
+}
+
+void free_context(struct macadamContext* pCtx)
+{
+  if(pCtx == NULL || pCtx == &stDefaultContext){
+    return;
+  }
+  free_structure(pCtx);
+  free(pCtx->stWarmItp.pdArray);
+  free(pCtx);
+}
+
+void init_structure(struct macadamContext* pCtx, long nTimeStepMax,\
+		    long nGrilleLevelMax)
+{
+  /* Release the arrays of a previous run made with this context */
+  free_structure(pCtx);
+
   /* Memory allocation */
 
   /* Size */
 
-  stRC.nSize = nTimeStepMax;
-  stRA.nSize = nTimeStepMax;
-  stRT.nSize = nTimeStepMax;
-  stIR.nSize = nTimeStepMax;
-  stSF.nSize = nTimeStepMax;
-  stSN.nSize = nTimeStepMax;
-  stFV.nSize = nTimeStepMax;
-  stFC.nSize = nTimeStepMax;
-  stG.nSize = nTimeStepMax;
-  stBB.nSize = nTimeStepMax;
-  stFP.nSize = nTimeStepMax;
-  stEc.nSize = 1;
-  stSST.nSize = nTimeStepMax;
-  stTemperatureDepth.nSize = 0; /* Will be computed later */
-  stLT.nSize = nTimeStepMax*nGrilleLevelMax;
+  pCtx->stRC.nSize = nTimeStepMax;
+  pCtx->stRA.nSize = nTimeStepMax;
+  pCtx->stRT.nSize = nTimeStepMax;
+  pCtx->stIR.nSize = nTimeStepMax;
+  pCtx->stSF.nSize = nTimeStepMax;
+  pCtx->stSN.nSize = nTimeStepMax;
+  pCtx->stFV.nSize = nTimeStepMax;
+  pCtx->stFC.nSize = nTimeStepMax;
+  pCtx->stG.nSize = nTimeStepMax;
+  pCtx->stBB.nSize = nTimeStepMax;
+  pCtx->stFP.nSize = nTimeStepMax;
+  pCtx->stEc.nSize = 1;
+  pCtx->stSST.nSize = nTimeStepMax;
+  pCtx->stTemperatureDepth.nSize = 0; /* Will be computed later */
+  pCtx->stLT.nSize = 0; /* Allocated by alloc_lt once the grid is known */
   /* Memory alloc */
-  stRC.plArray = (long*)calloc((nTimeStepMax),sizeof(long));
-  stRA.pdArray = (double*)calloc((nTimeStepMax),sizeof(double));
-  stIR.pdArray = (double*)calloc((nTimeStepMax),sizeof(double));
-  stSF.pdArray = (double*)calloc((nTimeStepMax),sizeof(double));
-  stRT.pdArray = (double*)calloc((nTimeStepMax),sizeof(double));
-  stSN.pdArray = (double*)calloc((nTimeStepMax),sizeof(double));
-  stFV.pdArray = (double*)calloc((nTimeStepMax),sizeof(double));
-  stFC.pdArray = (double*)calloc((nTimeStepMax),sizeof(double));
-  stG.pdArray = (double*)calloc((nTimeStepMax),sizeof(double));
-  stBB.pdArray = (double*)calloc((nTimeStepMax),sizeof(double));
-  stFP.pdArray = (double*)calloc((nTimeStepMax),sizeof(double));
-  stEc.plArray = (long*)calloc((1),sizeof(long));
-  stSST.pdArray = (double*)calloc((nTimeStepMax),sizeof(double));
-  stTemperatureDepth.pdArray =  (double*)calloc((nTimeStepMax),sizeof(double));
-  stLT.pdArray = (double*)calloc((nTimeStepMax*nGrilleLevelMax),sizeof(double));
+  pCtx->stRC.plArray = (long*)calloc((nTimeStepMax),sizeof(long));
+  pCtx->stRA.pdArray = (double*)calloc((nTimeStepMax),sizeof(double));
+  pCtx->stIR.pdArray = (double*)calloc((nTimeStepMax),sizeof(double));
+  pCtx->stSF.pdArray = (double*)calloc((nTimeStepMax),sizeof(double));
+  pCtx->stRT.pdArray = (double*)calloc((nTimeStepMax),sizeof(double));
+  pCtx->stSN.pdArray = (double*)calloc((nTimeStepMax),sizeof(double));
+  pCtx->stFV.pdArray = (double*)calloc((nTimeStepMax),sizeof(double));
+  pCtx->stFC.pdArray = (double*)calloc((nTimeStepMax),sizeof(double));
+  pCtx->stG.pdArray = (double*)calloc((nTimeStepMax),sizeof(double));
+  pCtx->stBB.pdArray = (double*)calloc((nTimeStepMax),sizeof(double));
+  pCtx->stFP.pdArray = (double*)calloc((nTimeStepMax),sizeof(double));
+  pCtx->stEc.plArray = (long*)calloc((1),sizeof(long));
+  pCtx->stSST.pdArray = (double*)calloc((nTimeStepMax),sizeof(double));
+  pCtx->stTemperatureDepth.pdArray =  (double*)calloc((nGrilleLevelMax),sizeof(double));
+  pCtx->stItp.nSize = 0; /* Set at the end of the coupling */
+  pCtx->stItp.pdArray = (double*)calloc((nGrilleLevelMax),sizeof(double));
 }
 
-struct doubleStruct get_ra(void){
+void alloc_lt(struct macadamContext* pCtx, long nTimeStepMax)
+{
+  /* Level temperature: one value for each level actually used by the grid */
+  free(pCtx->stLT.pdArray);
+  pCtx->stLT.nSize = nTimeStepMax*pCtx->stTemperatureDepth.nSize;
+  pCtx->stLT.pdArray = (double*)calloc((pCtx->stLT.nSize),sizeof(double));
+}
 
-  return stRA;
+void free_structure(struct macadamContext* pCtx)
+{
+  struct macadamGrid* pGrid;
+  struct doubleStruct stWarmItp;
+  long nWarmStep;
+
+  /* free(NULL) does nothing, a fresh context can be released safely */
+  free(pCtx->stRC.plArray);
+  free(pCtx->stRA.pdArray);
+  free(pCtx->stIR.pdArray);
+  free(pCtx->stSF.pdArray);
+  free(pCtx->stRT.pdArray);
+  free(pCtx->stSN.pdArray);
+  free(pCtx->stFV.pdArray);
+  free(pCtx->stFC.pdArray);
+  free(pCtx->stG.pdArray);
+  free(pCtx->stBB.pdArray);
+  free(pCtx->stFP.pdArray);
+  free(pCtx->stEc.plArray);
+  free(pCtx->stSST.pdArray);
+  free(pCtx->stTemperatureDepth.pdArray);
+  free(pCtx->stLT.pdArray);
+  free(pCtx->stItp.pdArray);
+  /* The inputs of the next runs are kept */
+  pGrid = pCtx->pGrid;
+  stWarmItp = pCtx->stWarmItp;
+  nWarmStep = pCtx->nWarmStep;
+  memset(pCtx, 0, sizeof(struct macadamContext));
+  pCtx->pGrid = pGrid;
+  pCtx->stWarmItp = stWarmItp;
+  pCtx->nWarmStep = nWarmStep;
+}
 
+/****************************************************************************
+ Name: new_grid, free_grid, grid_matches, set_grid_context
+
+ Parameters:
+[I BOOL bFlat, double* dpZones, long nNbrOfZone, long* npMateriau,
+  double dSstDepth : station configuration, as in Do_Metro]
+[I BOOL bSilent : silent mode of the fortran code]
+
+ Description: Creation of the road grid of a station with grille.  The
+  grid only depends on the station configuration, it can be built once
+  and given to every context computing this station with
+  set_grid_context.  Do_Metro_context builds its own grid when the
+  context has none or when it was built for another configuration.
+***************************************************************************/
+
+struct macadamGrid* new_grid(BOOL bFlat, double* dpZones, long nNbrOfZone,\
+			     long* npMateriau, double dSstDepth, BOOL bSilent)
+{
+  struct macadamGrid* pGrid;
+  long nNbrOfGridZone = nNbrOfZone;
+
+  pGrid = (struct macadamGrid*)calloc(1, sizeof(struct macadamGrid));
+  pGrid->bFlat = bFlat;
+  pGrid->nNbrOfZone = nNbrOfZone;
+  pGrid->dSstDepth = dSstDepth;
+  /* One more zone for the sand layer of a road */
+  pGrid->dpZones = (double*)calloc((nNbrOfZone+1),sizeof(double));
+  pGrid->npMateriau = (long*)calloc((nNbrOfZone+1),sizeof(long));
+  memcpy(pGrid->dpZones, dpZones, nNbrOfZone*sizeof(double));
+  memcpy(pGrid->npMateriau, npMateriau, nNbrOfZone*sizeof(long));
+  pGrid->dpTemperatureDepth = (double*)calloc((nNGRILLEMAX),sizeof(double));
+  pGrid->dpCapacity = (double*)calloc((2*nNGRILLEMAX),sizeof(double));
+  pGrid->dpConductivity = (double*)calloc((2*nNGRILLEMAX),sizeof(double));
+
+  /* grille uses the grid size of the physical constants */
+  init_constphys(bSilent);
+
+  if(!bFlat){
+    /* Note: In the case of a 'road', a 20 sand meters layer is added at the bottom.*/
+    pGrid->dpZones[nNbrOfZone] = 20.0;
+    pGrid->npMateriau[nNbrOfZone]= 4;
+    nNbrOfGridZone = nNbrOfZone +1;
+  }
+
+  f77name(grille)(&(pGrid->nSize), &(pGrid->nIR40), &(pGrid->bFlat),\
+		  &nNbrOfGridZone, pGrid->dpZones, pGrid->npMateriau,\
+		  &(pGrid->dDiff), pGrid->dpTemperatureDepth, &(pGrid->bEchec),\
+		  pGrid->dpCapacity, pGrid->dpConductivity, &(pGrid->dSstDepth));
+
+  return pGrid;
 }
 
-struct doubleStruct get_sn(void){
+void free_grid(struct macadamGrid* pGrid)
+{
+  if(pGrid == NULL){
+    return;
+  }
+  free(pGrid->dpZones);
+  free(pGrid->npMateriau);
+  free(pGrid->dpTemperatureDepth);
+  free(pGrid->dpCapacity);
+  free(pGrid->dpConductivity);
+  free(pGrid);
+}
+
+BOOL grid_matches(struct macadamGrid* pGrid, BOOL bFlat, double* dpZones,\
+		  long nNbrOfZone, long* npMateriau, double dSstDepth)
+{
+  if(pGrid == NULL || pGrid->bFlat != bFlat ||\
+     pGrid->nNbrOfZone != nNbrOfZone || pGrid->dSstDepth != dSstDepth){
+    return FALSE;
+  }
+  if(memcmp(pGrid->dpZones, dpZones, nNbrOfZone*sizeof(double)) != 0 ||\
+     memcmp(pGrid->npMateriau, npMateriau, nNbrOfZone*sizeof(long)) != 0){
+    return FALSE;
+  }
+  return TRUE;
+}
+
+BOOL get_grid_echec(struct macadamGrid* pGrid)
+{
+  return pGrid->bEchec;
+}
+
+void set_grid_context(struct macadamContext* pCtx, struct macadamGrid* pGrid)
+{
+  pCtx->pGrid = pGrid;
+}
+
+/****************************************************************************
+ Name: set_warm_start_context
+
+ Parameters:
+[I struct macadamContext* pCtx : context of the next run]
+[I double* dpItp : temperature profile saved from a previous run,
+  see get_itp_context]
+[I long nNbrLevels : number of levels of dpItp, 0 to remove the profile]
+[I long nStep : forecast step of the next run at which dpItp is valid]
+
+ Description: Start the next runs of the context from a temperature
+  profile computed by a previous run instead of building it from the
+  observations.  The profile is only used if it was computed on the
+  same grid and if at most 8 hours of observations have to be coupled
+  since nStep.
+***************************************************************************/
+
+void set_warm_start_context(struct macadamContext* pCtx, double* dpItp,\
+			    long nNbrLevels, long nStep)
+{
+  free(pCtx->stWarmItp.pdArray);
+  pCtx->stWarmItp.pdArray = NULL;
+  pCtx->stWarmItp.nSize = 0;
+  pCtx->nWarmStep = 0;
+  if(nNbrLevels <= 0 || nNbrLevels > nNGRILLEMAX){
+    return;
+  }
+  pCtx->stWarmItp.pdArray = (double*)malloc(nNbrLevels*sizeof(double));
+  memcpy(pCtx->stWarmItp.pdArray, dpItp, nNbrLevels*sizeof(double));
+  pCtx->stWarmItp.nSize = nNbrLevels;
+  pCtx->nWarmStep = nStep;
+}
+
+/* Accessors of a context */
+struct doubleStruct get_ra_context(struct macadamContext* pCtx){
+
+  return pCtx->stRA;
+}
+
+struct doubleStruct get_sn_context(struct macadamContext* pCtx){
+
+  return pCtx->stSN;
+}
+
+struct longStruct get_rc_context(struct macadamContext* pCtx){
+
+  return pCtx->stRC;
+}
+
+struct doubleStruct get_rt_context(struct macadamContext* pCtx){
+
+  return pCtx->stRT;
+}
+
+struct doubleStruct get_ir_context(struct macadamContext* pCtx){
+
+  return pCtx->stIR;
+}
+
+struct doubleStruct get_sf_context(struct macadamContext* pCtx){
+
+  return pCtx->stSF;
+}
+
+struct doubleStruct get_fv_context(struct macadamContext* pCtx){
+
+  return pCtx->stFV;
+}
+
+struct doubleStruct get_fc_context(struct macadamContext* pCtx){
+
+  return pCtx->stFC;
+}
+
+struct doubleStruct get_g_context(struct macadamContext* pCtx){
+
+  return pCtx->stG;
+}
+
+struct doubleStruct get_bb_context(struct macadamContext* pCtx){
+
+  return pCtx->stBB;
+}
+
+struct doubleStruct get_fp_context(struct macadamContext* pCtx){
+
+  return pCtx->stFP;
+}
+
+struct longStruct get_echec_context(struct macadamContext* pCtx){
+
+  return pCtx->stEc;
+}
+
+struct doubleStruct get_sst_context(struct macadamContext* pCtx){
+
+  return pCtx->stSST;
+}
+
+struct doubleStruct get_depth_context(struct macadamContext* pCtx){
+
+  return pCtx->stTemperatureDepth;
+}
+
+long get_nbr_levels_context(struct macadamContext* pCtx){
+
+  return pCtx->stTemperatureDepth.nSize;
+}
+
+struct doubleStruct get_lt_context(struct macadamContext* pCtx){
+
+  return pCtx->stLT;
+}
+
+struct doubleStruct get_itp_context(struct macadamContext* pCtx){
+
+  return pCtx->stItp;
+}
+
+long get_itp_step_context(struct macadamContext* pCtx){
+
+  return pCtx->nItpStep;
+}
+
+/****************************************************************************
+ Name: Do_Metro_batch
+ 
+ Parameters:
+[I long nNbrStations : number of stations to compute]
+[I BOOL* bpFlat : road (FALSE) or bridge (TRUE), one per station]
+[I double* dpMLat, dpMLon : coordinates of each station]
+[I double* dpZones : nNbrStations x nZoneStride depth of the layers]
+[I long* npNbrOfZone : number of layers of each station]
+[I long* npMateriau : nNbrStations x nZoneStride composition of the layers]
+[I long nZoneStride : length of a row of dpZones and npMateriau]
+[I double* dpTA ... dpAH, long* npTYP, npRC : nNbrStations x nNbrTimeSteps
+  interpolated forecast, as in Do_Metro]
+[I long nNbrTimeSteps : number of 30 seconds steps of every forecast]
+[I double* dpTAO, dpRTO, dpDTO, dpTimeO : nNbrStations x nObsStride
+  interpolated observations]
+[I long* npLenObservation : number of valid observations of each station]
+[I long nObsStride : length of a row of the observation arrays]
+[I long* npSwo : nNbrStations x nSwoStride QA/QC flags, as in Do_Metro]
+[I long nSwoStride : length of a row of npSwo]
+[I BOOL* bpNoObs : nNbrStations x 2, as in Do_Metro]
+[I double* dpDeltaT : Time difference of each station, as in Do_Metro]
+[I double* dpSstDepth : SST sensor depth of each station]
+[I BOOL bDeepTemp, double dDeepTemp : as in Do_Metro, for every station]
+[I BOOL bSilent : silent mode of the fortran code]
+[I long nNbrThreads : number of threads used for the computation]
+[O double* dpOutput : nNbrStations x nNbrTimeSteps x nNBRRESULTS results,
+  same layout as get_results_context for each station]
+[O long* npOutput : failure flag of each station]
+
+ Description: Compute several stations in one call.  The stations are
+  shared between nNbrThreads threads, each station being computed in its
+  own context with Do_Metro_context.  The temperature of the grid levels
+  is not returned.
+***************************************************************************/
+
+struct batchArgs
+{
+  long nNbrStations;
+  BOOL* bpFlat;
+  double* dpMLat;
+  double* dpMLon;
+  double* dpZones;
+  long* npNbrOfZone;
+  long* npMateriau;
+  long nZoneStride;
+  double* dpTA;
+  double* dpQP;
+  double* dpFF;
+  double* dpPS;
+  double* dpFS;
+  double* dpFI;
+  double* dpFA;
+  long* npTYP;
+  long* npRC;
+  double* dpAH;
+  long nNbrTimeSteps;
+  double* dpTAO;
+  double* dpRTO;
+  double* dpDTO;
+  double* dpTimeO;
+  long* npLenObservation;
+  long nObsStride;
+  long* npSwo;
+  long nSwoStride;
+  BOOL* bpNoObs;
+  double* dpDeltaT;
+  double* dpSstDepth;
+  BOOL bDeepTemp;
+  double dDeepTemp;
+  BOOL bSilent;
+  double* dpOutput;
+  long* npEchec;
+  /* Next station to compute, shared by the threads */
+  long nNext;
+  pthread_mutex_t mtxNext;
+};
+
+static void* batch_worker(void* pArg)
+{
+  struct batchArgs* pBatch = (struct batchArgs*)pArg;
+  struct macadamContext* pCtx;
+  double* dpZones;
+  long* npMateriau;
+  long nStation;
+  long nForecast;
+  long nObs;
+
+  struct macadamGrid* pGrid = NULL;
+  long nNbrOfZone;
+
+  pCtx = new_context();
+  dpZones = (double*)calloc(pBatch->nZoneStride, sizeof(double));
+  npMateriau = (long*)calloc(pBatch->nZoneStride, sizeof(long));
+
+  while(TRUE){
+    pthread_mutex_lock(&pBatch->mtxNext);
+    nStation = pBatch->nNext;
+    pBatch->nNext = pBatch->nNext + 1;
+    pthread_mutex_unlock(&pBatch->mtxNext);
+    if(nStation >= pBatch->nNbrStations){
+      break;
+    }
+
+    memcpy(dpZones, pBatch->dpZones + nStation*pBatch->nZoneStride,\
+	   pBatch->nZoneStride*sizeof(double));
+    memcpy(npMateriau, pBatch->npMateriau + nStation*pBatch->nZoneStride,\
+	   pBatch->nZoneStride*sizeof(long));
+    nNbrOfZone = pBatch->npNbrOfZone[nStation];
+    nForecast = nStation*pBatch->nNbrTimeSteps;
+    nObs = nStation*pBatch->nObsStride;
+
+    /* Consecutive stations with the same configuration share their grid */
+    if(!grid_matches(pGrid, pBatch->bpFlat[nStation], dpZones, nNbrOfZone,\
+		     npMateriau, pBatch->dpSstDepth[nStation])){
+      free_grid(pGrid);
+      pGrid = new_grid(pBatch->bpFlat[nStation], dpZones, nNbrOfZone,\
+		       npMateriau, pBatch->dpSstDepth[nStation],\
+		       pBatch->bSilent);
+      set_grid_context(pCtx, pGrid);
+    }
+
+    Do_Metro_context(pCtx, pBatch->bpFlat[nStation], pBatch->dpMLat[nStation],\
+		     pBatch->dpMLon[nStation], dpZones,\
+		     nNbrOfZone, npMateriau,\
+		     pBatch->dpTA+nForecast, pBatch->dpQP+nForecast,\
+		     pBatch->dpFF+nForecast, pBatch->dpPS+nForecast,\
+		     pBatch->dpFS+nForecast, pBatch->dpFI+nForecast,\
+		     pBatch->dpFA+nForecast, pBatch->npTYP+nForecast,\
+		     pBatch->npRC+nForecast, pBatch->dpTAO+nObs,\
+		     pBatch->dpRTO+nObs, pBatch->dpDTO+nObs,\
+		     pBatch->dpAH+nForecast, pBatch->dpTimeO+nObs,\
+		     pBatch->npSwo + nStation*pBatch->nSwoStride,\
+		     pBatch->bpNoObs + 2*nStation, pBatch->dpDeltaT[nStation],\
+		     pBatch->npLenObservation[nStation], pBatch->nNbrTimeSteps,\
+		     pBatch->bSilent, pBatch->dpSstDepth[nStation],\
+		     pBatch->bDeepTemp, pBatch->dDeepTemp);
+
+    pBatch->npEchec[nStation] = *(pCtx->stEc.plArray);
+    get_results_context(pCtx, pBatch->dpOutput +\
+			nForecast*nNBRRESULTS, pBatch->nNbrTimeSteps);
+  }
+
+  free(dpZones);
+  free(npMateriau);
+  free_context(pCtx);
+  free_grid(pGrid);
+  return NULL;
+}
+
+void Do_Metro_batch(long nNbrStations, BOOL* bpFlat, double* dpMLat,\
+		    double* dpMLon, double* dpZones, long* npNbrOfZone,\
+		    long* npMateriau, long nZoneStride, double* dpTA,\
+		    double* dpQP, double* dpFF, double* dpPS, double* dpFS,\
+		    double* dpFI, double* dpFA, long* npTYP, long* npRC,\
+		    double* dpAH, long nNbrTimeSteps, double* dpTAO,\
+		    double* dpRTO, double* dpDTO, double* dpTimeO,\
+		    long* npLenObservation, long nObsStride, long* npSwo,\
+		    long nSwoStride, BOOL* bpNoObs, double* dpDeltaT,\
+		    double* dpSstDepth, BOOL bDeepTemp, double dDeepTemp,\
+		    BOOL bSilent, long nNbrThreads, double* dpOutput,\
+		    long* npOutput)
+{
+  struct batchArgs stBatch;
+  pthread_t* ptThreads;
+  pthread_attr_t stAttr;
+  long i;
+
+  stBatch.nNbrStations = nNbrStations;
+  stBatch.bpFlat = bpFlat;
+  stBatch.dpMLat = dpMLat;
+  stBatch.dpMLon = dpMLon;
+  stBatch.dpZones = dpZones;
+  stBatch.npNbrOfZone = npNbrOfZone;
+  stBatch.npMateriau = npMateriau;
+  stBatch.nZoneStride = nZoneStride;
+  stBatch.dpTA = dpTA;
+  stBatch.dpQP = dpQP;
+  stBatch.dpFF = dpFF;
+  stBatch.dpPS = dpPS;
+  stBatch.dpFS = dpFS;
+  stBatch.dpFI = dpFI;
+  stBatch.dpFA = dpFA;
+  stBatch.npTYP = npTYP;
+  stBatch.npRC = npRC;
+  stBatch.dpAH = dpAH;
+  stBatch.nNbrTimeSteps = nNbrTimeSteps;
+  stBatch.dpTAO = dpTAO;
+  stBatch.dpRTO = dpRTO;
+  stBatch.dpDTO = dpDTO;
+  stBatch.dpTimeO = dpTimeO;
+  stBatch.npLenObservation = npLenObservation;
+  stBatch.nObsStride = nObsStride;
+  stBatch.npSwo = npSwo;
+  stBatch.nSwoStride = nSwoStride;
+  stBatch.bpNoObs = bpNoObs;
+  stBatch.dpDeltaT = dpDeltaT;
+  stBatch.dpSstDepth = dpSstDepth;
+  stBatch.bDeepTemp = bDeepTemp;
+  stBatch.dDeepTemp = dDeepTemp;
+  stBatch.bSilent = bSilent;
+  stBatch.dpOutput = dpOutput;
+  stBatch.npEchec = npOutput;
+  stBatch.nNext = 0;
+  pthread_mutex_init(&stBatch.mtxNext, NULL);
+
+  /* A station that is never computed is a failure */
+  for (i=0; i<nNbrStations; i++){
+    npOutput[i] = TRUE;
+  }
+
+  /* Initialized here, before the threads are started */
+  init_constphys(bSilent);
+
+  if(nNbrThreads < 1){
+    nNbrThreads = 1;
+  }
+  if(nNbrThreads > nNbrStations){
+    nNbrThreads = nNbrStations;
+  }
+
+  /* The fortran automatic arrays are on the stack of the threads */
+  pthread_attr_init(&stAttr);
+  pthread_attr_setstacksize(&stAttr, nBATCHSTACKSIZE);
+
+  ptThreads = (pthread_t*)malloc(nNbrThreads*sizeof(pthread_t));
+  for (i=0; i<nNbrThreads; i++){
+    if(pthread_create(&ptThreads[i], &stAttr, batch_worker, &stBatch) != 0){
+      break;
+    }
+  }
+  /* If a thread could not be created, the others do all the work. */
+  /* Without any thread, the stations are computed in this one. */
+  nNbrThreads = i;
+  if(nNbrThreads == 0){
+    batch_worker(&stBatch);
+  }
+  for (i=0; i<nNbrThreads; i++){
+    pthread_join(ptThreads[i], NULL);
+  }
+
+  free(ptThreads);
+  pthread_attr_destroy(&stAttr);
+  pthread_mutex_destroy(&stBatch.mtxNext);
+}
+
+/****************************************************************************
+ Name: get_results_context
+ 
+ Parameters:
+[I struct macadamContext* pCtx : context of the run]
+[O double* dpOutput : row major array of nNbrTimeSteps x nNBRRESULTS]
+[I long nNbrTimeSteps : number of time steps to copy]
 
-  return stSN;
+ Description: Copy all the results of a run in one array, one row per
+  time step, in the order RA, SN, RC, RT, IR, SF, FV, FC, G, BB, FP, SST.
+***************************************************************************/
+
+void get_results_context(struct macadamContext* pCtx, double* dpOutput,\
+			 long nNbrTimeSteps)
+{
+  long i;
+  double* dpRow;
+
+  if(nNbrTimeSteps > pCtx->stRT.nSize){
+    nNbrTimeSteps = pCtx->stRT.nSize;
+  }
+
+  for (i=0; i<nNbrTimeSteps; i++){
+    dpRow = dpOutput + i*nNBRRESULTS;
+    dpRow[0] = pCtx->stRA.pdArray[i];
+    dpRow[1] = pCtx->stSN.pdArray[i];
+    dpRow[2] = (double)pCtx->stRC.plArray[i];
+    dpRow[3] = pCtx->stRT.pdArray[i];
+    dpRow[4] = pCtx->stIR.pdArray[i];
+    dpRow[5] = pCtx->stSF.pdArray[i];
+    dpRow[6] = pCtx->stFV.pdArray[i];
+    dpRow[7] = pCtx->stFC.pdArray[i];
+    dpRow[8] = pCtx->stG.pdArray[i];
+    dpRow[9] = pCtx->stBB.pdArray[i];
+    dpRow[10] = pCtx->stFP.pdArray[i];
+    dpRow[11] = pCtx->stSST.pdArray[i];
+  }
+}
+
+/****************************************************************************
+ Name: get_lt_results_context
+ 
+ Parameters:
+[I struct macadamContext* pCtx : context of the run]
+[O double* dpOutput : row major array of nNbrTimeSteps x number of levels]
+[I long nNbrTimeSteps : number of time steps to copy]
+
+ Description: Copy the temperature of the grid levels, one row per
+  time step.
+***************************************************************************/
+
+void get_lt_results_context(struct macadamContext* pCtx, double* dpOutput,\
+			    long nNbrTimeSteps)
+{
+  long nSize;
+
+  nSize = nNbrTimeSteps*pCtx->stTemperatureDepth.nSize;
+  if(nSize > pCtx->stLT.nSize){
+    nSize = pCtx->stLT.nSize;
+  }
+  memcpy(dpOutput, pCtx->stLT.pdArray, nSize*sizeof(double));
+}
+
+/* Accessors of the default context, used by Do_Metro */
+struct doubleStruct get_ra(void){
+
+  return get_ra_context(&stDefaultContext);
+}
+
+struct doubleStruct get_sn(void){
 
+  return get_sn_context(&stDefaultContext);
 }
 
 struct longStruct get_rc(void){
 
-  return stRC;
+  return get_rc_context(&stDefaultContext);
 }
 
 struct doubleStruct get_rt(void){
 
-  return stRT;
+  return get_rt_context(&stDefaultContext);
 }
 
 struct doubleStruct get_ir(void){
 
-  return stIR;
+  return get_ir_context(&stDefaultContext);
 }
 
 struct doubleStruct get_sf(void){
 
-  return stSF;
+  return get_sf_context(&stDefaultContext);
 }
 
 struct doubleStruct get_fv(void){
 
-  return stFV;
+  return get_fv_context(&stDefaultContext);
 }
 
 struct doubleStruct get_fc(void){
 
-  return stFC;
+  return get_fc_context(&stDefaultContext);
 }
 
 struct doubleStruct get_g(void){
 
-  return stG;
+  return get_g_context(&stDefaultContext);
 }
 
 struct doubleStruct get_bb(void){
 
-  return stBB;
+  return get_bb_context(&stDefaultContext);
 }
 
 struct doubleStruct get_fp(void){
 
-  return stFP;
+  return get_fp_context(&stDefaultContext);
 }
 
 struct longStruct get_echec(void){
 
-  return stEc;
+  return get_echec_context(&stDefaultContext);
 }
 
 struct doubleStruct get_sst(void){
 
-  return stSST;
+  return get_sst_context(&stDefaultContext);
 }
 
 struct doubleStruct get_depth(void){
 
-  return stTemperatureDepth;
+  return get_depth_context(&stDefaultContext);
 }
 
 long get_nbr_levels(void){
 
-  return stTemperatureDepth.nSize;
+  return get_nbr_levels_context(&stDefaultContext);
 }
 
 struct doubleStruct get_lt(void){
 
-  return stLT;
+  return get_lt_context(&stDefaultContext);
 }
@@ -8,9 +8,9 @@
 ** Date:        April 16, 2004
 **
 ** Description: .h qui contient les constantes qui taient autrefois dans 
-**  params.cdk.  L'allocation dynamique tant impossible  faire avec un 
-**  pointeur cr en C et pass au Fortran, l'utilisation de constante comme
-**  DTMAX doit tre maintenu.
+**  params.cdk.  Les tableaux du Fortran sont maintenant dimensionns par
+**  les arguments (nombre de pas de temps de la prvision et des
+**  observations), seul le nombre de niveaux de la grille est constant.
 **
 ** TODO: Enlever les constantes  mesure que le code fortran les utilisant
 **  est remplac par du code en C.
@@ -31,10 +31,64 @@
 /* Maximal number of grid level in the ground*/
 #define nNGRILLEMAX 200
 
+/* Number of fields returned by get_results_context, one column each: */
+/* RA, SN, RC, RT, IR, SF, FV, FC, G, BB, FP, SST */
+#define nNBRRESULTS 12
+
+/* Stack size of the threads created by Do_Metro_batch */
+#define nBATCHSTACKSIZE (32*1024*1024)
+
 /* Physical constants */
 #define dPI  3.141592653590e0  
 #define dOMEGA  0.7292e-4 
 
+/* Road grid built by grille for one station configuration.  The grid */
+/* is only read by the model and can be shared by several contexts.    */
+struct macadamGrid
+{
+  /* Station configuration the grid was built from */
+  BOOL bFlat;
+  long nNbrOfZone;
+  double* dpZones;
+  long* npMateriau;
+  double dSstDepth;
+  /* Grid */
+  long nSize; /* Number of grid levels */
+  long nIR40; /* Level at 40 cm depth */
+  double dDiff;
+  double* dpTemperatureDepth; /* Depth of temperature grid levels */
+  double* dpCapacity;
+  double* dpConductivity;
+  BOOL bEchec; /* Boolean to know if the creation was a success */
+};
+
+/* Outputs of one execution of the model. Each run owns its context so */
+/* that several stations can be computed concurrently in one process. */
+struct macadamContext
+{
+  struct doubleStruct stRA; /* Liquid accumlation */
+  struct doubleStruct stSN; /* Snow/ice accumulation */
+  struct longStruct   stRC; /* Road condition */
+  struct doubleStruct stRT; /* Road temperature */
+  struct doubleStruct stIR; /* Infra-red flux */
+  struct doubleStruct stSF; /* Solar flux */
+  struct doubleStruct stFV; /* Vapor flux */
+  struct doubleStruct stFC; /* Sensible heat */
+  struct doubleStruct stG;  /* Ground flux */
+  struct doubleStruct stBB; /* Black body radiation */ 
+  struct doubleStruct stFP; /* Phase change energy */
+  struct longStruct   stEc; /* Boolean to know if the execution was a success */
+  struct doubleStruct stSST; /* Subsurface temperature */
+  struct doubleStruct stTemperatureDepth;  /* Depth of temperature grid levels */
+  struct doubleStruct stLT; /* Level temperature */
+  struct doubleStruct stItp; /* Temperature profile at the start of the roadcast */
+  long nItpStep; /* Forecast step of stItp */
+  /* Inputs of the next runs, kept by init_structure */
+  struct macadamGrid* pGrid; /* Grid to use, not owned by the context */
+  struct doubleStruct stWarmItp; /* Profile of a previous run to start from */
+  long nWarmStep; /* Forecast step of stWarmItp */
+};
+
 /* Main call from  python */
 void Do_Metro(BOOL bFlat, double dMLat, double dMLon, double* dpZones, \
 	      long nNbrOfZone, long* npMateriau, double* dpTA, double* dpQP,\
@@ -45,7 +99,44 @@ void Do_Metro(BOOL bFlat, double dMLat, double dMLon, double* dpZones, \
 	      long nLenObservation, long nNbrTimeSteps, BOOL bSilent,\
 	      double dSstDepth, BOOL bDeepTemp, double dDeepTemp);
 	      
-void init_structure(long nTimeStepMax, long nGrilleLevelMax);
+void Do_Metro_context(struct macadamContext* pCtx, BOOL bFlat, double dMLat,\
+		      double dMLon, double* dpZones, long nNbrOfZone,\
+		      long* npMateriau, double* dpTA, double* dpQP,\
+		      double* dpFF, double* dpPS, double* dpFsPy, double* dpFI, \
+		      double* dpFA, long* npTYP, long* npRc, double* dpTAO, \
+		      double* dpRTO, double* dpDTO, double* dpAH, double* dpTimeO,\
+		      long* npSWO,  BOOL* bpNoObs, double dDeltaT, \
+		      long nLenObservation, long nNbrTimeSteps, BOOL bSilent,\
+		      double dSstDepth, BOOL bDeepTemp, double dDeepTemp);
+
+void Do_Metro_batch(long nNbrStations, BOOL* bpFlat, double* dpMLat,\
+		    double* dpMLon, double* dpZones, long* npNbrOfZone,\
+		    long* npMateriau, long nZoneStride, double* dpTA,\
+		    double* dpQP, double* dpFF, double* dpPS, double* dpFS,\
+		    double* dpFI, double* dpFA, long* npTYP, long* npRC,\
+		    double* dpAH, long nNbrTimeSteps, double* dpTAO,\
+		    double* dpRTO, double* dpDTO, double* dpTimeO,\
+		    long* npLenObservation, long nObsStride, long* npSwo,\
+		    long nSwoStride, BOOL* bpNoObs, double* dpDeltaT,\
+		    double* dpSstDepth, BOOL bDeepTemp, double dDeepTemp,\
+		    BOOL bSilent, long nNbrThreads, double* dpOutput,\
+		    long* npOutput);
+
+struct macadamContext* new_context(void);
+void free_context(struct macadamContext* pCtx);
+void init_structure(struct macadamContext* pCtx, long nTimeStepMax,\
+		    long nGrilleLevelMax);
+void free_structure(struct macadamContext* pCtx);
+void alloc_lt(struct macadamContext* pCtx, long nTimeStepMax);
+struct macadamGrid* new_grid(BOOL bFlat, double* dpZones, long nNbrOfZone,\
+			     long* npMateriau, double dSstDepth, BOOL bSilent);
+void free_grid(struct macadamGrid* pGrid);
+BOOL grid_matches(struct macadamGrid* pGrid, BOOL bFlat, double* dpZones,\
+		  long nNbrOfZone, long* npMateriau, double dSstDepth);
+BOOL get_grid_echec(struct macadamGrid* pGrid);
+void set_grid_context(struct macadamContext* pCtx, struct macadamGrid* pGrid);
+void set_warm_start_context(struct macadamContext* pCtx, double* dpItp,\
+			    long nNbrLevels, long nStep);
 
 
 /* Fortran functions */ 
@@ -62,7 +153,8 @@ extern void initial_(double* dpItp , double* dpRTO, double* dpDTO, double* dpTAO
 		     BOOL* bFlat, long* npSwo, double* dpCapacity, double* dpConductivity); 
 extern void coupla_(double* dpFS, double* dpFI, double* dpPS, double* dpTA, double* dpAH, \
 		    double* dpFF, long* npTYP,  double* dpQP, long* npRC, \
-		    long* nSize, long* nNtp, long* nNtp2, double* dpItp, double* dpRTO, \
+		    long* nSize, long* nNtp, long* nNtp2, long* nNbrTimeSteps, double* dpItp,\
+		    double* dpRTO, \
 		    BOOL* bFlat, double* dFCorr, double* dAln, double* dAlr, \
 		    double* dFp, double* dFsCorr, double* dFiCorr, double* dEr1, double* dEr2, \
 		    BOOL* bFail, double* dEpsilon, double* dZ0, double* dZ0t, double* dZu, \
@@ -101,3 +193,26 @@ struct doubleStruct get_sst(void);
 struct doubleStruct get_depth(void);
 long get_nbr_levels(void);
 struct doubleStruct get_lt(void);
+
+struct doubleStruct get_ra_context(struct macadamContext* pCtx);
+struct doubleStruct get_sn_context(struct macadamContext* pCtx);
+struct longStruct get_rc_context(struct macadamContext* pCtx);
+struct doubleStruct get_rt_context(struct macadamContext* pCtx);
+struct doubleStruct get_ir_context(struct macadamContext* pCtx);
+struct doubleStruct get_sf_context(struct macadamContext* pCtx);
+struct doubleStruct get_fv_context(struct macadamContext* pCtx);
+struct doubleStruct get_fc_context(struct macadamContext* pCtx);
+struct doubleStruct get_g_context(struct macadamContext* pCtx);
+struct doubleStruct get_bb_context(struct macadamContext* pCtx);
+struct doubleStruct get_fp_context(struct macadamContext* pCtx);
+struct longStruct get_echec_context(struct macadamContext* pCtx);
+struct doubleStruct get_sst_context(struct macadamContext* pCtx);
+struct doubleStruct get_depth_context(struct macadamContext* pCtx);
+long get_nbr_levels_context(struct macadamContext* pCtx);
+struct doubleStruct get_lt_context(struct macadamContext* pCtx);
+struct doubleStruct get_itp_context(struct macadamContext* pCtx);
+long get_itp_step_context(struct macadamContext* pCtx);
+void get_results_context(struct macadamContext* pCtx, double* dpOutput,\
+			 long nNbrTimeSteps);
+void get_lt_results_context(struct macadamContext* pCtx, double* dpOutput,\
+			    long nNbrTimeSteps);
@@ -9,6 +9,46 @@
 %module macadam
 %{
 #include "macadam.h"
+
+/* Get the buffer of a C contiguous array whose items are of one of the */
+/* types in sFormats (struct module codes) and have the size nItemSize. */
+/* The buffer must be released with PyBuffer_Release. */
+static int get_array_buffer(PyObject* pObject, Py_buffer* pView,\
+			    const char* sFormats, Py_ssize_t nItemSize)
+{
+  const char* sFormat;
+
+  if (PyObject_GetBuffer(pObject, pView, PyBUF_C_CONTIGUOUS|PyBUF_FORMAT) == -1){
+    return -1;
+  }
+  /* Skip the byte order, only the native one is used */
+  sFormat = pView->format;
+  if (sFormat != NULL && (*sFormat == '@' || *sFormat == '=')){
+    sFormat++;
+  }
+  if (pView->itemsize != nItemSize || sFormat == NULL || \
+      strlen(sFormat) != 1 || strchr(sFormats, *sFormat) == NULL){
+    PyBuffer_Release(pView);
+    PyErr_Format(PyExc_TypeError,\
+		 "array of type '%s' with items of %d bytes expected",\
+		 sFormats, (int)nItemSize);
+    return -1;
+  }
+  return 0;
+}
+
+/* Check that the buffer of an output array can hold the nNbrItems */
+/* items written in it by the C code. */
+static int check_output_size(Py_buffer* pView, Py_ssize_t nNbrItems)
+{
+  if (pView->len < nNbrItems*pView->itemsize){
+    PyErr_Format(PyExc_ValueError,\
+		 "output array of at least %ld items expected, %ld given",\
+		 (long)nNbrItems, (long)(pView->len/pView->itemsize));
+    return -1;
+  }
+  return 0;
+}
   %}
 
 
@@ -86,10 +126,20 @@
 //////////////////////////////////////////
 // in
 /////////////////////////////////////////
-%typemap(in) double *{
+// NumPy arrays, or any object exporting a C contiguous buffer of
+// float64, are given directly to the C/fortran code without copy.
+// Python lists are still accepted and copied.
+%typemap(in) double *(Py_buffer stView, int bView = 0){
   long i;
+  if (PyObject_CheckBuffer($input)) {
+    if (get_array_buffer($input, &stView, "d", sizeof(double)) == -1){
+      SWIG_fail;
+    }
+    bView = 1;
+    $1 = (double*) stView.buf;
+  }
 // Check if is a list 
-  if (PyList_Check($input)) {
+  else if (PyList_Check($input)) {
     long nSize = PyList_Size($input);
     long i = 0;
     $1 = (double*) malloc((nSize+1)*sizeof(double));
@@ -106,14 +156,34 @@
     }// end for
   }// end if
   else{   
-    PyErr_SetString(PyExc_TypeError,"not a list");
+    PyErr_SetString(PyExc_TypeError,"not a list or a float64 array");
     return NULL;
   }
 }
+// Output arrays: a writable C contiguous float64 array allocated in
+// python is filled directly by the C code.  Its size is checked by the
+// check typemap placed before each function.
+%typemap(in) double *dpOutput(Py_buffer stView, int bView = 0){
+  if (get_array_buffer($input, &stView, "d", sizeof(double)) == -1){
+    SWIG_fail;
+  }
+  bView = 1;
+  if (stView.readonly){
+    PyErr_SetString(PyExc_TypeError,"output array must be writable");
+    SWIG_fail;
+  }
+  $1 = (double*) stView.buf;
+}
+
 %typemap(in) double **{
   printf("pointer of pointer: double.  Not implemented.  See macadam.i\n");
 }
 
+%typemap(freearg) double *dpOutput {
+  if (bView$argnum)
+    PyBuffer_Release(&stView$argnum);
+}
+
 ////////////////////
 // out
 ////////////////////
@@ -126,8 +196,12 @@
 // free
 //////////////////////
 // This cleans up the double * array we malloc'd before the function call
+// or releases the buffer of the array given without copy.
 %typemap(freearg) double * {
-  free((double*)$1);
+  if (bView$argnum)
+    PyBuffer_Release(&stView$argnum);
+  else
+    free((double*)$1);
 }
 
 //////////////////////
@@ -209,10 +283,20 @@
 //////////////////////////////////////////
 // in
 /////////////////////////////////////////
-%typemap(in) long *{
+// NumPy arrays of C long (numpy.int_), or any object exporting a C
+// contiguous buffer of them, are given directly to the C/fortran code
+// without copy.  Python lists are still accepted and copied.
+%typemap(in) long *(Py_buffer stView, int bView = 0){
   long i;
+  if (PyObject_CheckBuffer($input)) {
+    if (get_array_buffer($input, &stView, "lq", sizeof(long)) == -1){
+      SWIG_fail;
+    }
+    bView = 1;
+    $1 = (long*) stView.buf;
+  }
 // Check if is a list 
-  if (PyList_Check($input)) {
+  else if (PyList_Check($input)) {
     long nSize = PyList_Size($input);
     long i = 0;
     $1 = (long*) malloc((nSize+1)*sizeof(long));
@@ -229,11 +313,30 @@
     }// end for
   }// end if
   else{   
-    PyErr_SetString(PyExc_TypeError,"not a list");
+    PyErr_SetString(PyExc_TypeError,"not a list or an integer array");
     return NULL;
   }
 }
 
+// Output arrays: a writable C contiguous array of C long allocated in
+// python is filled directly by the C code.
+%typemap(in) long *npOutput(Py_buffer stView, int bView = 0){
+  if (get_array_buffer($input, &stView, "lq", sizeof(long)) == -1){
+    SWIG_fail;
+  }
+  bView = 1;
+  if (stView.readonly){
+    PyErr_SetString(PyExc_TypeError,"output array must be writable");
+    SWIG_fail;
+  }
+  $1 = (long*) stView.buf;
+}
+
+%typemap(freearg) long *npOutput {
+  if (bView$argnum)
+    PyBuffer_Release(&stView$argnum);
+}
+
 ////////////////////
 // out
 ////////////////////
@@ -245,9 +348,13 @@
 ////////////////////
 // free
 //////////////////////
-// This cleans up the double * array we malloc'd before the function call
+// This cleans up the long * array we malloc'd before the function call
+// or releases the buffer of the array given without copy.
 %typemap(freearg) long * {
-  free((long*)$1);
+  if (bView$argnum)
+    PyBuffer_Release(&stView$argnum);
+  else
+    free((long*)$1);
 }
 
 //////////////////////
@@ -399,6 +506,147 @@ extern void Do_Metro(long, double, double, double*,\
 	 long, long, long, \
 	double, long, double);
 
+// Reentrant interface: each run is made against its own context.
+// The context is an opaque pointer for python.
+struct macadamContext;
+
+// The GIL is released during the computation of the model so that
+// other python threads can run (XML parsing, preprocessing, other
+// stations) while the fortran code integrates a station.  The python
+// lists are converted by the typemaps before the GIL is released.
+%exception Do_Metro_context {
+  Py_BEGIN_ALLOW_THREADS
+  $action
+  Py_END_ALLOW_THREADS
+}
+
+extern struct macadamContext* new_context(void);
+extern void free_context(struct macadamContext*);
+
+extern void Do_Metro_context(struct macadamContext*, long, double, double,\
+	 double*, long, long*, double*, double*,\
+	 double*, double*, double*, double*,\
+	 double*, long*, long*, double*,\
+	 double*, double*, double*, double*,\
+	 long*, long*, double,\
+	 long, long, long, \
+	double, long, double);
+
+extern struct doubleStruct get_ra_context(struct macadamContext*);
+extern struct doubleStruct get_sn_context(struct macadamContext*);
+extern struct longStruct get_rc_context(struct macadamContext*);
+extern struct doubleStruct get_rt_context(struct macadamContext*);
+extern struct doubleStruct get_ir_context(struct macadamContext*);
+extern struct doubleStruct get_sf_context(struct macadamContext*);
+extern struct doubleStruct get_fv_context(struct macadamContext*);
+extern struct doubleStruct get_fc_context(struct macadamContext*);
+extern struct doubleStruct get_g_context(struct macadamContext*);
+extern struct doubleStruct get_bb_context(struct macadamContext*);
+extern struct doubleStruct get_fp_context(struct macadamContext*);
+extern struct longStruct get_echec_context(struct macadamContext*);
+extern struct doubleStruct get_sst_context(struct macadamContext*);
+extern struct doubleStruct get_depth_context(struct macadamContext*);
+extern long get_nbr_levels_context(struct macadamContext*);
+extern struct doubleStruct get_lt_context(struct macadamContext*);
+extern struct doubleStruct get_itp_context(struct macadamContext*);
+extern long get_itp_step_context(struct macadamContext*);
+
+// Road grid of a station configuration, built once and shared by the
+// contexts computing this station.  Opaque pointer for python.
+struct macadamGrid;
+
+extern struct macadamGrid* new_grid(long, double*, long, long*,\
+				    double, long);
+extern void free_grid(struct macadamGrid*);
+extern long get_grid_echec(struct macadamGrid*);
+extern void set_grid_context(struct macadamContext*, struct macadamGrid*);
+
+// Warm start from the temperature profile of a previous run.
+extern void set_warm_start_context(struct macadamContext*, double*, long,\
+				   long);
+
+// Several stations computed in one call by a pool of threads.
+%exception Do_Metro_batch {
+  Py_BEGIN_ALLOW_THREADS
+  $action
+  Py_END_ALLOW_THREADS
+}
+
+// nNbrStations x nNbrTimeSteps x nNBRRESULTS results and one failure
+// flag for each station.
+%typemap(check) double *dpOutput {
+  if (check_output_size(&stView$argnum,\
+			(Py_ssize_t)arg1*arg19*nNBRRESULTS) == -1){
+    SWIG_fail;
+  }
+}
+%typemap(check) long *npOutput {
+  if (check_output_size(&stView$argnum, (Py_ssize_t)arg1) == -1){
+    SWIG_fail;
+  }
+}
+
+extern void Do_Metro_batch(long, long*, double*,\
+	 double*, double*, long*,\
+	 long*, long, double*,\
+	 double*, double*, double*, double*,\
+	 double*, double*, long*, long*,\
+	 double*, long, double*,\
+	 double*, double*, double*,\
+	 long*, long, long*,\
+	 long, long*, double*,\
+	 double*, long, double,\
+	 long, long, double* dpOutput,\
+	 long* npOutput);
+
+// nNbrTimeSteps x nNBRRESULTS results
+%typemap(check) double *dpOutput {
+  if (check_output_size(&stView$argnum,\
+			(Py_ssize_t)arg3*nNBRRESULTS) == -1){
+    SWIG_fail;
+  }
+}
+extern void get_results_context(struct macadamContext*, double* dpOutput,\
+				long);
+
+// nNbrTimeSteps x number of levels temperatures
+%typemap(check) double *dpOutput {
+  if (check_output_size(&stView$argnum,\
+		(Py_ssize_t)arg3*arg1->stTemperatureDepth.nSize) == -1){
+    SWIG_fail;
+  }
+}
+extern void get_lt_results_context(struct macadamContext*, double* dpOutput,\
+				   long);
+
+%pythoncode %{
+import numpy
+
+# Column order of the array returned by get_results.
+lRESULTS_FIELDS = ['RA', 'SN', 'RC', 'RT', 'IR', 'SF', 'FV', 'FC', 'G',
+                   'BB', 'FP', 'SST']
+
+def get_results(pContext, nNbrTimeSteps):
+    """
+    Return the results of the run made with pContext in a float64 array
+    of nNbrTimeSteps rows, one column for each field of lRESULTS_FIELDS.
+    """
+    npResults = numpy.empty((nNbrTimeSteps, len(lRESULTS_FIELDS)))
+    get_results_context(pContext, npResults, nNbrTimeSteps)
+    return npResults
+
+def get_results_lt(pContext, nNbrTimeSteps):
+    """
+    Return the temperature of the grid levels of the run made with
+    pContext in a float64 array of nNbrTimeSteps rows, one column for
+    each level.
+    """
+    npLT = numpy.empty((nNbrTimeSteps, get_nbr_levels_context(pContext)))
+    get_lt_results_context(pContext, npLT, nNbrTimeSteps)
+    return npLT
+%}
+
+// Legacy interface, results of Do_Metro are kept in a default context.
 extern struct doubleStruct get_ra(void);
 extern struct doubleStruct get_sn(void);
 extern struct longStruct get_rc(void);